@@ -25,6 +25,15 @@ from app.db.alembic import metadata  # noqa
 
 target_metadata = metadata
 
+# Created by DDL outside of models (see app.contrib.order.search), autogenerate must not drop them
+UNMAPPED_OBJECTS = {
+    'search_vector', 'ix_order_search_vector', 'ix_order_code_trgm', 'ix_order_phone_trgm',
+}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and name in UNMAPPED_OBJECTS)
+
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -63,6 +72,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -89,7 +99,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,475 @@
+"""initial schema
+
+Schema of the deployed application before revision 3f9c2a7d41b8, earlier
+revisions were never tracked in this repository. A fresh database is created
+from here. A database created before has the tables already and is stamped
+with this revision instead of running it, ``app.alembic_pre_start`` does so
+when the schema exists and alembic_version is empty or names a revision this
+repository does not know:
+
+    alembic stamp --purge 0b7d2e4f6a18
+    alembic upgrade head
+
+Revision ID: 0b7d2e4f6a18
+Revises:
+Create Date: 2026-10-19 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d2e4f6a18'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('order_order_number_seq')))
+    op.create_table('config',
+    sa.Column('support_phone', sa.String(length=255), nullable=True),
+    sa.Column('support_email', sa.String(length=255), nullable=True),
+    sa.Column('phones', postgresql.ARRAY(sa.String(length=255)), nullable=False),
+    sa.Column('emails', postgresql.ARRAY(sa.String(length=255)), nullable=False),
+    sa.Column('regular_shipping_price', sa.DECIMAL(precision=12, scale=2), nullable=False),
+    sa.Column('express_shipping_price', sa.DECIMAL(precision=12, scale=2), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('file',
+    sa.Column('file_type', sa.String(length=25), nullable=False),
+    sa.Column('file_path', sa.Text(), nullable=False),
+    sa.Column('file_host', sa.String(length=255), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('content_type', sa.String(length=50), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=True),
+    sa.Column('height', sa.Integer(), nullable=True),
+    sa.Column('poster', sa.Text(), nullable=True),
+    sa.Column('caption', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('message',
+    sa.Column('full_name', sa.String(length=255), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=True),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('phone', sa.String(length=255), nullable=True),
+    sa.Column('is_read', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('place',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('parent_id', sa.Integer(), nullable=True),
+    sa.Column('location_level', sa.String(length=8), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('slug', sa.String(length=255), nullable=False),
+    sa.Column('tree_id', sa.Integer(), nullable=True),
+    sa.Column('lft', sa.Integer(), nullable=False),
+    sa.Column('rgt', sa.Integer(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['parent_id'], ['place.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_place_level'), 'place', ['level'], unique=False)
+    op.create_index(op.f('ix_place_lft'), 'place', ['lft'], unique=False)
+    op.create_index(op.f('ix_place_rgt'), 'place', ['rgt'], unique=False)
+    op.create_index(op.f('ix_place_slug'), 'place', ['slug'], unique=True)
+    op.create_table('policy_tr',
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('locale', sa.String(length=10), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('locale', 'id'),
+    sa.UniqueConstraint('locale')
+    )
+    op.create_table('thumbnail',
+    sa.Column('original', sa.Text(), nullable=False),
+    sa.Column('path', sa.Text(), nullable=False),
+    sa.Column('crop', sa.String(length=25), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('user',
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('email_verified_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('phone', sa.String(length=255), nullable=True),
+    sa.Column('phone_verified_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('is_superuser', sa.Boolean(), nullable=False),
+    sa.Column('is_staff', sa.Boolean(), nullable=False),
+    sa.Column('user_type', sa.String(length=25), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_email'), 'user', ['email'], unique=True)
+    op.create_index(op.f('ix_user_id'), 'user', ['id'], unique=True)
+    op.create_index(op.f('ix_user_phone'), 'user', ['phone'], unique=True)
+    op.create_table('address',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('full_name', sa.String(length=255), nullable=True),
+    sa.Column('company_name', sa.String(length=255), nullable=True),
+    sa.Column('street_address_1', sa.String(length=255), nullable=True),
+    sa.Column('street_address_2', sa.String(length=255), nullable=True),
+    sa.Column('place_id', sa.Integer(), nullable=False),
+    sa.Column('phone', sa.String(length=255), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('note', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('private_metadata', sa.JSON(), nullable=False),
+    sa.Column('public_metadata', sa.JSON(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['place_id'], ['place.id'], name='fx_u_address_place_id', ondelete='RESTRICT'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_u_address_user_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('config_tr',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('site_name', sa.String(length=255), nullable=False),
+    sa.Column('address', sa.String(length=255), nullable=False),
+    sa.Column('seo_title', sa.String(length=255), nullable=False),
+    sa.Column('seo_description', sa.String(length=255), nullable=False),
+    sa.Column('seo_keywords', sa.String(length=500), nullable=False),
+    sa.Column('locale', sa.String(length=10), nullable=False),
+    sa.ForeignKeyConstraint(['id'], ['config.id'], name='fx_config_config_tr_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'locale'),
+    sa.UniqueConstraint('id', 'locale', name='ux_config_tr_id_locale'),
+    sa.UniqueConstraint('locale')
+    )
+    op.create_table('external_account',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('account_id', sa.String(length=255), nullable=False),
+    sa.Column('username', sa.String(length=255), nullable=False),
+    sa.Column('service_type', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('private_metadata', sa.JSON(), nullable=False),
+    sa.Column('public_metadata', sa.JSON(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_ext_acc_user_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('order',
+    sa.Column('code', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=32), nullable=False),
+    sa.Column('charge_status', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('language_code', sa.String(length=35), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=True),
+    sa.Column('phone', sa.String(length=255), nullable=True),
+    sa.Column('street_address', sa.Text(), nullable=True),
+    sa.Column('place_id', sa.Integer(), nullable=True),
+    sa.Column('place_full_name', sa.Text(), nullable=True),
+    sa.Column('customer_email', sa.String(length=255), nullable=True),
+    sa.Column('origin', sa.String(length=32), nullable=False),
+    sa.Column('currency', sa.String(length=50), nullable=False),
+    sa.Column('shipping_method', sa.String(length=50), nullable=False),
+    sa.Column('shipping_price_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('base_shipping_price_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('un_discounted_base_shipping_price_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('total_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('total_charged_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('subtotal_amount', sa.DECIMAL(precision=12, scale=2), nullable=False),
+    sa.Column('extra_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('note', sa.Text(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('private_metadata', sa.JSON(), nullable=False),
+    sa.Column('public_metadata', sa.JSON(), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.ForeignKeyConstraint(['place_id'], ['place.id'], name='fx_order_place_id', ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_order_user_id', ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code')
+    )
+    op.create_index(op.f('ix_order_id'), 'order', ['id'], unique=True)
+    op.create_table('place_tr',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('full_name', sa.String(length=255), nullable=False),
+    sa.Column('locale', sa.String(length=10), nullable=False),
+    sa.ForeignKeyConstraint(['id'], ['place.id'], name='fx_place_tr_place_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'locale'),
+    sa.UniqueConstraint('id', 'locale', name='ux_place_tr_id')
+    )
+    op.create_table('slider',
+    sa.Column('host', sa.String(length=255), nullable=True),
+    sa.Column('path', sa.String(length=255), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('sort_order', sa.Integer(), nullable=False),
+    sa.Column('file_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['file_id'], ['file.id'], name='fx_slider_file_id', ondelete='RESTRICT'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('file_id')
+    )
+    op.create_table('user_phone',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('phone', sa.String(length=255), nullable=False),
+    sa.Column('verified_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_up_user_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('user_session',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('expire_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('user_agent', sa.String(length=255), nullable=True),
+    sa.Column('ip_address', sa.String(length=255), nullable=True),
+    sa.Column('firebase_device_id', sa.String(length=255), nullable=True),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_session_user_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_session_id'), 'user_session', ['id'], unique=True)
+    op.create_table('wallet',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('currency', sa.String(length=25), nullable=False),
+    sa.Column('amount', sa.DECIMAL(precision=12, scale=2), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_wallet_user_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index(op.f('ix_wallet_id'), 'wallet', ['id'], unique=True)
+    op.create_table('fulfillment',
+    sa.Column('fulfillment_order', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.UUID(), nullable=False),
+    sa.Column('status', sa.String(length=32), nullable=False),
+    sa.Column('shipping_refund_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('total_refund_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('private_metadata', sa.JSON(), nullable=False),
+    sa.Column('public_metadata', sa.JSON(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], name='fx_fulfillment_order_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('order_event',
+    sa.Column('order_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('event_type', sa.String(length=255), nullable=False),
+    sa.Column('parameters', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], name='fx_order_event_order_id', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_order_event_user_id', ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('order_granted_refund',
+    sa.Column('amount_value', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('currency', sa.String(length=50), nullable=False),
+    sa.Column('reason', sa.Text(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('order_id', sa.UUID(), nullable=False),
+    sa.Column('shipping_costs_included', sa.Boolean(), nullable=False),
+    sa.Column('status', sa.String(length=128), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], name='fx_order_gr_order_id', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_order_gr_user_id', ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('order_line',
+    sa.Column('shipping_method_name', sa.String(length=255), nullable=True),
+    sa.Column('shipping_method_id', sa.Integer(), nullable=True),
+    sa.Column('order_id', sa.UUID(), nullable=False),
+    sa.Column('currency', sa.String(length=50), nullable=False),
+    sa.Column('total_price_amount', sa.DECIMAL(precision=12, scale=2), nullable=False),
+    sa.Column('un_discounted_total_price_amount', sa.DECIMAL(precision=12, scale=2), nullable=False),
+    sa.Column('shipping_price_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('freight_price_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('extra_amount', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('note', sa.Text(), nullable=True),
+    sa.Column('private_metadata', sa.JSON(), nullable=False),
+    sa.Column('public_metadata', sa.JSON(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], name='fx_order_line_order_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('order_note',
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('order_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], name='fx_order_note_order_id', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_order_note_user_id', ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('payment',
+    sa.Column('staff_id', sa.UUID(), nullable=True),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('wallet_id', sa.UUID(), nullable=True),
+    sa.Column('payment_type', sa.String(length=25), nullable=False),
+    sa.Column('gateway', sa.String(length=255), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('to_confirm', sa.Boolean(), nullable=False),
+    sa.Column('charge_status', sa.String(length=25), nullable=False),
+    sa.Column('token', sa.Text(), nullable=True),
+    sa.Column('total_amount', sa.DECIMAL(precision=12, scale=2), nullable=False),
+    sa.Column('captured_amount', sa.DECIMAL(precision=10, scale=2), nullable=False),
+    sa.Column('currency', sa.String(length=25), nullable=False),
+    sa.Column('store_payment_method', sa.String(length=11), nullable=False),
+    sa.Column('cc_first_digits', sa.String(length=6), nullable=True),
+    sa.Column('cc_last_digits', sa.String(length=4), nullable=True),
+    sa.Column('cc_brand', sa.String(length=40), nullable=True),
+    sa.Column('cc_exp_month', sa.Integer(), nullable=True),
+    sa.Column('cc_exp_year', sa.Integer(), nullable=True),
+    sa.Column('payment_method_type', sa.String(length=255), nullable=True),
+    sa.Column('customer_ip_address', sa.String(length=50), nullable=True),
+    sa.Column('extra_data', sa.JSON(), nullable=False),
+    sa.Column('return_url', sa.UnicodeText(), nullable=True),
+    sa.Column('psp_reference', sa.Text(), nullable=True),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('private_metadata', sa.JSON(), nullable=False),
+    sa.Column('public_metadata', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['staff_id'], ['user.id'], name='fx_payment_staff_id', ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fx_payment_user_id', ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id'], name='fx_payment_wallet_id', ondelete='RESTRICT'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_payment_id'), 'payment', ['id'], unique=True)
+    op.create_table('slider_tr',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('caption', sa.String(length=255), nullable=False),
+    sa.Column('locale', sa.String(length=10), nullable=False),
+    sa.ForeignKeyConstraint(['id'], ['slider.id'], name='fx_slider_slider_tr_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'locale'),
+    sa.UniqueConstraint('id', 'locale', name='ux_slider_tr_id_locale'),
+    sa.UniqueConstraint('locale')
+    )
+    op.create_table('fulfillment_line',
+    sa.Column('order_line_id', sa.Integer(), nullable=False),
+    sa.Column('fulfillment_id', sa.Integer(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['fulfillment_id'], ['fulfillment.id'], name='fx_full_line_full_id', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['order_line_id'], ['order_line.id'], name='fx_full_line_order_line_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('order_granted_refund_line',
+    sa.Column('order_line_id', sa.Integer(), nullable=False),
+    sa.Column('granted_refund_id', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.Text(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['granted_refund_id'], ['order_granted_refund.id'], name='fx_or_gr_ln_or_gr_id', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['order_line_id'], ['order_line.id'], name='fx_order_gr_ln_order_ln_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('payment_attachment',
+    sa.Column('payment_id', sa.UUID(), nullable=False),
+    sa.Column('file_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['file_id'], ['file.id'], name='fx_pa_file_id', ondelete='RESTRICT'),
+    sa.ForeignKeyConstraint(['payment_id'], ['payment.id'], name='fx_pa_payment_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('file_id')
+    )
+    op.create_table('transaction',
+    sa.Column('staff_id', sa.UUID(), nullable=True),
+    sa.Column('token', sa.Text(), nullable=False),
+    sa.Column('kind', sa.String(length=25), nullable=False),
+    sa.Column('is_success', sa.Boolean(), nullable=False),
+    sa.Column('is_action_required', sa.Boolean(), nullable=False),
+    sa.Column('action_required_data', sa.JSON(), nullable=False),
+    sa.Column('currency', sa.String(length=25), nullable=False),
+    sa.Column('amount', sa.DECIMAL(precision=10, scale=2), nullable=False),
+    sa.Column('error', sa.String(length=255), nullable=True),
+    sa.Column('customer_id', sa.String(length=255), nullable=True),
+    sa.Column('gateway_response', sa.JSON(), nullable=False),
+    sa.Column('is_already_processed', sa.Boolean(), nullable=False),
+    sa.Column('payment_id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['payment_id'], ['payment.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['staff_id'], ['user.id'], name='fx_trn_staff_id', ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('transaction')
+    op.drop_table('payment_attachment')
+    op.drop_table('order_granted_refund_line')
+    op.drop_table('fulfillment_line')
+    op.drop_table('slider_tr')
+    op.drop_table('payment')
+    op.drop_table('order_note')
+    op.drop_table('order_line')
+    op.drop_table('order_granted_refund')
+    op.drop_table('order_event')
+    op.drop_table('fulfillment')
+    op.drop_table('wallet')
+    op.drop_table('user_session')
+    op.drop_table('user_phone')
+    op.drop_table('slider')
+    op.drop_table('place_tr')
+    op.drop_table('order')
+    op.drop_table('external_account')
+    op.drop_table('config_tr')
+    op.drop_table('address')
+    op.drop_table('user')
+    op.drop_table('thumbnail')
+    op.drop_table('policy_tr')
+    op.drop_table('place')
+    op.drop_table('message')
+    op.drop_table('file')
+    op.drop_table('config')
+    op.execute(sa.schema.DropSequence(sa.Sequence('order_order_number_seq')))
@@ -0,0 +1,49 @@
+"""order search index
+
+Revision ID: 3f9c2a7d41b8
+Revises: 0b7d2e4f6a18
+Create Date: 2026-10-19 02:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d41b8'
+down_revision = '0b7d2e4f6a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute(
+        "ALTER TABLE \"order\" ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "to_tsvector('simple', coalesce(code, '') || ' ' || coalesce(phone, '') || ' ' "
+        "|| coalesce(name, '') || ' ' || coalesce(place_full_name, ''))"
+        ") STORED"
+    )
+    op.create_index(
+        'ix_order_search_vector', 'order', ['search_vector'],
+        postgresql_using='gin', if_not_exists=True,
+    )
+    op.create_index(
+        'ix_order_code_trgm', 'order', ['code'],
+        postgresql_using='gin', postgresql_ops={'code': 'gin_trgm_ops'}, if_not_exists=True,
+    )
+    op.create_index(
+        'ix_order_phone_trgm', 'order', ['phone'],
+        postgresql_using='gin', postgresql_ops={'phone': 'gin_trgm_ops'}, if_not_exists=True,
+    )
+    op.create_index('ix_order_status_created_at', 'order', ['status', 'created_at'], if_not_exists=True)
+    op.create_index('ix_order_user_id_created_at', 'order', ['user_id', 'created_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_order_user_id_created_at', table_name='order', if_exists=True)
+    op.drop_index('ix_order_status_created_at', table_name='order', if_exists=True)
+    op.drop_index('ix_order_phone_trgm', table_name='order', if_exists=True)
+    op.drop_index('ix_order_code_trgm', table_name='order', if_exists=True)
+    op.drop_index('ix_order_search_vector', table_name='order', if_exists=True)
+    op.drop_column('order', 'search_vector')
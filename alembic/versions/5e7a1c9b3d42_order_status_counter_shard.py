@@ -0,0 +1,46 @@
+"""order status counter shard
+
+Revision ID: 5e7a1c9b3d42
+Revises: c4d2e8f1a7b3
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e7a1c9b3d42'
+down_revision = 'c4d2e8f1a7b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'order_status_counter',
+        sa.Column('shard', sa.SmallInteger(), server_default='0', nullable=False),
+    )
+    op.drop_constraint('uq_order_status_counter_scope_status', 'order_status_counter', type_='unique')
+    op.create_unique_constraint(
+        'uq_order_status_counter_scope_status_shard', 'order_status_counter', ['scope', 'status', 'shard'],
+    )
+
+
+def downgrade() -> None:
+    # Merge shards back into shard 0
+    op.execute(
+        "INSERT INTO order_status_counter (scope, status, shard, count) "
+        "SELECT DISTINCT scope, status, 0, 0 FROM order_status_counter ON CONFLICT DO NOTHING"
+    )
+    op.execute(
+        "UPDATE order_status_counter AS c SET count = s.count FROM ("
+        "SELECT scope, status, sum(count) AS count FROM order_status_counter GROUP BY scope, status"
+        ") AS s WHERE c.scope = s.scope AND c.status = s.status AND c.shard = 0"
+    )
+    op.execute("DELETE FROM order_status_counter WHERE shard != 0")
+    op.drop_constraint('uq_order_status_counter_scope_status_shard', 'order_status_counter', type_='unique')
+    op.create_unique_constraint(
+        'uq_order_status_counter_scope_status', 'order_status_counter', ['scope', 'status'],
+    )
+    op.drop_column('order_status_counter', 'shard')
@@ -0,0 +1,42 @@
+"""order status counter
+
+Revision ID: 8b1e4c5a9d20
+Revises: 3f9c2a7d41b8
+Create Date: 2026-10-19 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4c5a9d20'
+down_revision = '3f9c2a7d41b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'order_status_counter',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('scope', sa.String(length=36), nullable=False),
+        sa.Column('status', sa.String(length=32), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scope', 'status', name='uq_order_status_counter_scope_status'),
+    )
+    # Initial fill, same as reconcile_counters
+    op.execute(
+        "INSERT INTO order_status_counter (scope, status, count) "
+        "SELECT user_id::text, status, count(*) FROM \"order\" "
+        "WHERE deleted_at IS NULL AND user_id IS NOT NULL GROUP BY user_id, status"
+    )
+    op.execute(
+        "INSERT INTO order_status_counter (scope, status, count) "
+        "SELECT 'all', status, count(*) FROM \"order\" WHERE deleted_at IS NULL GROUP BY status"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('order_status_counter')
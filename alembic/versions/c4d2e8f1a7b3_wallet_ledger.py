@@ -0,0 +1,64 @@
+"""wallet ledger
+
+Revision ID: c4d2e8f1a7b3
+Revises: 8b1e4c5a9d20
+Create Date: 2026-10-19 04:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2e8f1a7b3'
+down_revision = '8b1e4c5a9d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # wallet and its payments exist already, see 0b7d2e4f6a18_initial_schema
+    op.create_table(
+        'wallet_entry',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('wallet_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('entry_type', sa.String(length=25), nullable=False),
+        sa.Column('amount', sa.DECIMAL(precision=12, scale=2), nullable=False),
+        sa.Column('balance', sa.DECIMAL(precision=12, scale=2), nullable=False),
+        sa.Column('payment_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('transaction_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id'], name='fx_wallet_entry_wallet_id', ondelete='RESTRICT'),
+        sa.ForeignKeyConstraint(['payment_id'], ['payment.id'], name='fx_wallet_entry_payment_id', ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(
+            ['transaction_id'], ['transaction.id'], name='fx_wallet_entry_transaction_id', ondelete='SET NULL'
+        ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_wallet_entry_wallet_id_id', 'wallet_entry', ['wallet_id', 'id'])
+    op.create_table(
+        'wallet_balance_snapshot',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('wallet_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('entry_id', sa.Integer(), nullable=False),
+        sa.Column('balance', sa.DECIMAL(precision=12, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['wallet_id'], ['wallet.id'], name='fx_wallet_balance_snapshot_wallet_id', ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_wallet_balance_snapshot_wallet_id_entry_id', 'wallet_balance_snapshot', ['wallet_id', 'entry_id']
+    )
+    # Ledger starts from current balances, otherwise every existing balance is reported as drift
+    op.execute(
+        "INSERT INTO wallet_entry (wallet_id, entry_type, amount, balance) "
+        "SELECT id, 'opening', amount, amount FROM wallet ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('wallet_balance_snapshot')
+    op.drop_table('wallet_entry')
@@ -0,0 +1,50 @@
+"""
+Stamp a database created before migrations were tracked with the initial revision.
+
+Such a database has the tables of ``0b7d2e4f6a18_initial_schema`` and an empty
+or unknown ``alembic_version``, ``alembic upgrade head`` would otherwise try to
+create them again or fail to locate the stamped revision. Run before
+``alembic upgrade head`` (see scripts/prestart.sh), an empty database and one
+already on a known revision are left as they are.
+"""
+import logging
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from alembic.util import CommandError
+from sqlalchemy import inspect
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASELINE_REVISION = '0b7d2e4f6a18'
+
+
+def is_known_revision(script: ScriptDirectory, revision: str) -> bool:
+    try:
+        return script.get_revision(revision) is not None
+    except CommandError:
+        return False
+
+
+def main() -> None:
+    from app.db.session import engine
+
+    config = Config('alembic.ini')
+    script = ScriptDirectory.from_config(config)
+    with engine.connect() as connection:
+        has_schema = inspect(connection).has_table('order')
+        revisions = MigrationContext.configure(connection).get_current_heads()
+    if not has_schema:
+        logger.info("Empty database, migrations create the schema")
+        return
+    if revisions and all(is_known_revision(script, revision) for revision in revisions):
+        return
+    logger.warning(f"Schema exists with untracked revision {revisions or None}, stamping {BASELINE_REVISION}")
+    command.stamp(config, BASELINE_REVISION, purge=True)
+
+
+if __name__ == "__main__":
+    main()
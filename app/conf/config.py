@@ -73,6 +73,29 @@ class Settings(BaseSettings):
         )
 
     REDIS_HOST: Optional[str] = '127.0.0.1'
+    # Pool profile, applied to both async (asyncpg) and sync (psycopg2) engines
+    DATABASE_POOL_SIZE: Optional[int] = 10
+    DATABASE_MAX_OVERFLOW: Optional[int] = 10
+    DATABASE_POOL_TIMEOUT: Optional[float] = 30
+    DATABASE_POOL_RECYCLE: Optional[int] = 60 * 30
+    # Ping on every checkout costs a round trip, recycle and invalidation on disconnect are enough mostly
+    DATABASE_POOL_PRE_PING: Optional[bool] = False
+    DATABASE_POOL_WARMUP: Optional[int] = 5
+    # Set 0 behind pgbouncer in transaction mode
+    DATABASE_PREPARED_STATEMENT_CACHE_SIZE: Optional[int] = 500
+    # Request engine (asyncpg) only, milliseconds, 0 disables
+    DATABASE_STATEMENT_TIMEOUT: Optional[int] = 30000
+    # Sync engine of celery tasks and scripts, bulk jobs run longer than requests, 0 disables.
+    # Migrations connect with their own engine and no timeout
+    DATABASE_TASK_STATEMENT_TIMEOUT: Optional[int] = 0
+    DATABASE_JIT: Optional[bool] = False
+    DATABASE_SERVER_SETTINGS: Optional[dict] = {}
+    # Same form as DATABASE_URL (postgresql+asyncpg://...), reads of safe requests are routed to them
+    DATABASE_REPLICA_URLS: Optional[List[PostgresDsn]] = []
+    DATABASE_REPLICA_MAX_LAG: Optional[float] = 5
+    # Requests of a client that wrote read from the primary for this long (cookie), keep above max lag, 0 disables
+    DATABASE_PRIMARY_PIN_SECONDS: Optional[int] = 10
+
     REDIS_PORT: Optional[int] = 6379
     REDIS_URL: Optional[RedisDsn] = None
 
@@ -83,6 +106,13 @@ class Settings(BaseSettings):
         data = info.data
         return f'redis://{data.get("REDIS_HOST")}:{data.get("REDIS_PORT")}/0'
 
+    # Defaults to REDIS_URL, results are only kept for tasks polled by the API
+    CELERY_RESULT_BACKEND: Optional[str] = None
+    CELERY_RESULT_EXPIRE_SECONDS: Optional[int] = 60 * 60
+    # Default for every task, bulk jobs (exports, reconciliation, repricing) set their own
+    CELERY_TASK_SOFT_TIME_LIMIT: Optional[int] = 60 * 5
+    CELERY_TASK_TIME_LIMIT: Optional[int] = 60 * 6
+
     SMTP_TLS: Optional[bool] = True
     SMTP_PORT: Optional[int] = 587
     SMTP_HOST: Optional[str] = 'smtp.server.example'
@@ -90,6 +120,9 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[EmailStr] = None
     EMAILS_FROM_NAME: Optional[str] = "Mailer"
+    # Idle SMTP connections kept by every worker process, checked with NOOP after SMTP_KEEPALIVE_SECONDS idle
+    SMTP_POOL_SIZE: Optional[int] = 2
+    SMTP_KEEPALIVE_SECONDS: Optional[float] = 30
 
     VERIFICATION_CODE_EXPIRE_SECONDS: Optional[int] = 1800
     VERIFICATION_CODE_LENGTH: Optional[int] = 6
@@ -100,6 +133,53 @@ class Settings(BaseSettings):
     FIRST_SUPERUSER_PASSWORD: Optional[str] = 'change_this'
 
     DEFAULT_CURRENCY: Optional[str] = "TMT"
+    # Dotted paths of plugin classes loaded by PluginsManager
+    PLUGINS: list[str] = []
+    # Loaded plugins are reused for this long before their configuration version is checked in redis
+    PLUGINS_VERSION_CHECK_SECONDS: Optional[float] = 1
+    PLUGIN_HOOK_TIMEOUT_SECONDS: Optional[float] = 5
+    PLACE_CACHE_EXPIRE_SECONDS: Optional[int] = 60 * 10
+    # Order numbers reserved from sequence per round trip, unused numbers of a block are lost on restart
+    ORDER_CODE_BLOCK_SIZE: Optional[int] = 20
+    # Rows of the "all" order status counter, a flush updates one of them picked at random
+    ORDER_COUNTER_SHARDS: Optional[int] = 8
+    # Rows fetched per round trip by repository stream(), exports keep at most this many objects in memory
+    EXPORT_YIELD_PER: Optional[int] = 1000
+    # Exports contain personal data, keep outside of MEDIA_DIR, files are downloaded by staff through export-file
+    EXPORT_DIR: Optional[str] = 'exports'
+    # Export files older than this are removed by cleanup_expired_exports_task
+    EXPORT_EXPIRE_SECONDS: Optional[int] = 60 * 60 * 24 * 7
+
+    FILE_CHUNK_SIZE: Optional[int] = 1024 * 1024
+    RESUMABLE_UPLOAD_MAX_SIZE: Optional[int] = 2 * 1024 ** 3
+    RESUMABLE_UPLOAD_EXPIRE_SECONDS: Optional[int] = 60 * 60 * 24
+    RESUMABLE_UPLOAD_LOCK_SECONDS: Optional[int] = 60 * 10
+
+    # Route names accepting Idempotency-Key header, see app.core.idempotency
+    IDEMPOTENT_ROUTES: tuple = (
+        'payment-deposit-manual', 'payment-refund', 'payment-append-attachment', 'order-my-create',
+    )
+    IDEMPOTENCY_EXPIRE_SECONDS: Optional[int] = 60 * 60 * 24
+    # In-flight lock expiry, refreshed while the request runs, a crashed worker frees the key after it
+    IDEMPOTENCY_LOCK_SECONDS: Optional[int] = 60
+    IDEMPOTENCY_WAIT_SECONDS: Optional[float] = 30
+    # Unfinished payment operation older than this is aborted by payment reconciliation
+    PAYMENT_INTENT_STALE_SECONDS: Optional[int] = 60 * 30
+
+    # Networks allowed to scrape /metrics without token, e.g. ["10.0.0.0/8"], anyone else must be staff
+    METRICS_ALLOWED_NETWORKS: Optional[List[str]] = []
+
+    SYSTEM_SAMPLER_INTERVAL: Optional[float] = 5
+    SYSTEM_SAMPLER_HISTORY_SIZE: Optional[int] = 60
+
+    QUERY_INSTRUMENTATION_ENABLED: Optional[bool] = False
+    QUERY_COUNT_WARNING_THRESHOLD: Optional[int] = 50
+    QUERY_TIME_WARNING_THRESHOLD: Optional[float] = 0.5
+    QUERY_N_PLUS_ONE_THRESHOLD: Optional[int] = 5
+
+    SLOW_QUERY_THRESHOLD: Optional[float] = 0.2
+    SLOW_QUERY_EXPLAIN: Optional[bool] = True
+    SLOW_QUERY_LOG_SIZE: Optional[int] = 200
 
     LOCALE_PATH: Optional[str] = 'app/locale'
     USE_I18N: Optional[bool] = True
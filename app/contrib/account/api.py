@@ -20,7 +20,7 @@ from app.contrib.account import ServiceTypeChoices
 from app.utils.security import lazy_jwt_settings
 from app.routers.dependency import (
     get_async_db, get_current_user, get_commons,
-    get_staff_user, get_token_payload, get_aioredis, get_redis
+    get_staff_user, get_token_payload, get_aioredis, get_redis, get_session_cache_key
 )
 from app.core.schema import IResponseBase, IPaginationDataBase, CommonsModel
 from app.utils.datetime.timezone import now
@@ -28,6 +28,7 @@ from app.utils.translation import gettext as _
 from app.utils.jose import jwt
 from app.conf.config import settings
 from app.contrib.config.repository import config_repo
+from app.contrib.plugins.manager import get_plugins_manager
 
 from .tasks import send_email_verification_task, send_password_change_verification_task, send_reset_password_email_task
 from .schema import (
@@ -118,7 +119,7 @@ async def get_verification_code(
 async def revoke_session(async_db, db_obj, aioredis_instance):
     revoked_at = now()
 
-    session_key = f'session:{db_obj.id.hex}'
+    session_key = get_session_cache_key(db_obj.user_id, db_obj.id)
 
     await aioredis_instance.delete(session_key)
 
@@ -723,6 +724,7 @@ async def update_user(
             )
 
     result = await user_repo.update(async_db, db_obj=db_obj, obj_in=data)
+    await get_plugins_manager().customer_updated(async_db, result)
     return {
         "message": "User updated",
         "data": result
@@ -808,6 +810,7 @@ async def user_profile_update(
     )
     for k in redis_instance.scan_iter(f"session-{user.id.__str__()}:*"):
         redis_instance.delete(k)
+    await get_plugins_manager().customer_updated(async_db, result)
 
     return {
         "message": "Profile updated",
@@ -1,32 +1,54 @@
+from celery.signals import worker_process_shutdown
+
 from app.core.celery_app import celery_app
-from app.utils.emails import send_reset_password_email, send_email_verification, send_password_change_verification
+from app.utils.emails import (
+    smtp_pool, send_emails, send_reset_password_email, send_email_verification, send_password_change_verification,
+)
+
+
+@worker_process_shutdown.connect
+def close_smtp_connections(**kwargs) -> None:
+    smtp_pool.close()
 
 
 @celery_app.task(
     acks_late=True,
     max_retries=3, countdown=10, retry_backoff=True, retry_backoff_max=120,
-    retry=True,
+    retry=True, soft_time_limit=30, time_limit=60,
 )
 def send_reset_password_email_task(
         email: str,
         code: str,
-) -> None:
+) -> bool:
     return send_reset_password_email(email=email, verification_code=code)
 
 
 @celery_app.task(
     acks_late=True,
     max_retries=3, countdown=10, retry_backoff=True, retry_backoff_max=120,
-    retry=True,
+    retry=True, soft_time_limit=30, time_limit=60,
 )
-def send_email_verification_task(email: str, code: str) -> None:
+def send_email_verification_task(email: str, code: str) -> bool:
     return send_email_verification(email, verification_code=code)
 
 
 @celery_app.task(
     acks_late=True,
     max_retries=3, countdown=10, retry_backoff=True, retry_backoff_max=120,
-    retry=True,
+    retry=True, soft_time_limit=30, time_limit=60,
 )
-def send_password_change_verification_task(email: str, code: str) -> None:
+def send_password_change_verification_task(email: str, code: str) -> bool:
     return send_password_change_verification(email, verification_code=code)
+
+
+@celery_app.task(bind=True, acks_late=True, max_retries=3, soft_time_limit=120, time_limit=150)
+def send_emails_task(self, messages: list[dict]) -> int:
+    """
+    Send messages built by app.utils.emails get_*_message over one connection,
+    only rejected ones are retried
+    :return: count of sent messages
+    """
+    failed = send_emails(messages)
+    if failed:
+        raise self.retry(args=(failed,), countdown=min(10 * 2 ** self.request.retries, 120))
+    return len(messages)
@@ -13,6 +13,7 @@ from app.core.schema import IResponseBase, IPaginationDataBase, CommonsModel
 from app.utils.translation import gettext as _
 from app.core.exceptions import HTTP404
 from app.conf.config import settings
+from app.contrib.order.tasks import reprice_orders_shipping_task
 
 from .schema import (
     ConfigCreate,
@@ -56,7 +57,10 @@ async def config_manage(
             "message": "Config created",
             "data": result
         }
+    shipping_prices = (db_obj.regular_shipping_price, db_obj.express_shipping_price)
     result = await config_repo.update(async_db=async_db, obj_in=obj_in, db_obj=db_obj)
+    if shipping_prices != (result.regular_shipping_price, result.express_shipping_price):
+        reprice_orders_shipping_task.delay()
     return {
         'data': result,
         'message': "Config updated"
@@ -0,0 +1,14 @@
+from app.core.enums import TextChoices
+from app.utils.translation import gettext_lazy as _
+
+
+class ExportFormatChoices(TextChoices):
+    csv = "csv", _("CSV")
+    xlsx = "xlsx", _("Excel")
+
+
+class ExportResourceChoices(TextChoices):
+    order = "order", _("Orders")
+    payment = "payment", _("Payments")
+    transaction = "transaction", _("Transactions")
+    user = "user", _("Users")
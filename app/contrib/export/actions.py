@@ -0,0 +1,105 @@
+import os
+import time
+from datetime import datetime
+from typing import Optional, BinaryIO
+from uuid import uuid4
+
+from app.conf.config import settings
+
+from . import ExportFormatChoices
+from .resources import ExportResource
+from .writers import write_csv, write_xlsx
+
+
+def get_export_filename(resource: ExportResource, export_format: str) -> str:
+    return f'{resource.name}-{datetime.now():%Y%m%d-%H%M%S}-{uuid4().hex}.{export_format}'
+
+
+def get_export_path(filename: str) -> Optional[str]:
+    """
+    Return path of export file in EXPORT_DIR, None for names outside of it
+    """
+    if not filename or os.path.basename(filename) != filename or filename.startswith('.'):
+        return None
+    return os.path.join(settings.EXPORT_DIR, filename)
+
+
+def get_export_url(filename: str) -> str:
+    # Staff only download, see export-file
+    return f'{settings.SERVER_HOST}{settings.API_V1_STR}/export/file/{filename}/'
+
+
+def write_xlsx_export(
+        db,
+        fs: BinaryIO,
+        resource: ExportResource,
+        expressions: Optional[list] = None,
+) -> None:
+    """
+    Write xlsx export into fs, blocking, run in a thread or a worker
+    :param db: sqlalchemy.orm.Session
+    :param fs: binary file object
+    :param resource:
+    :param expressions:
+    :return:
+    """
+    rows = (resource.get_row(obj) for obj in resource.repo_sync.stream(db, expressions=expressions))
+    write_xlsx(fs, resource.name, resource.fields, rows)
+
+
+def export_to_file(
+        db,
+        resource: ExportResource,
+        export_format: str,
+        expressions: Optional[list] = None,
+) -> str:
+    """
+    Write export into EXPORT_DIR, return file name
+    :param db: sqlalchemy.orm.Session
+    :param resource:
+    :param export_format: ExportFormatChoices value
+    :param expressions:
+    :return:
+    """
+    filename = get_export_filename(resource, export_format)
+    file_path = get_export_path(filename)
+    os.makedirs(settings.EXPORT_DIR, mode=0o700, exist_ok=True)
+
+    # Finished file only appears under its final name
+    tmp_path = f'{file_path}.part'
+    try:
+        if export_format == ExportFormatChoices.xlsx.value:
+            with open(tmp_path, 'wb') as fs:
+                write_xlsx_export(db, fs, resource, expressions=expressions)
+        else:
+            rows = (resource.get_row(obj) for obj in resource.repo_sync.stream(db, expressions=expressions))
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as fs:
+                write_csv(fs, resource.fields, rows)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return filename
+
+
+def cleanup_expired_exports(now: Optional[float] = None) -> int:
+    """
+    Remove files of EXPORT_DIR, including leftover part files, older than EXPORT_EXPIRE_SECONDS
+    :param now:
+    :return: number of removed files
+    """
+    if now is None:
+        now = time.time()
+    if not os.path.isdir(settings.EXPORT_DIR):
+        return 0
+    removed = 0
+    with os.scandir(settings.EXPORT_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.stat().st_mtime > now - settings.EXPORT_EXPIRE_SECONDS:
+                continue
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+    return removed
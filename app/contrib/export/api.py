@@ -0,0 +1,137 @@
+import os
+import tempfile
+from datetime import datetime
+from typing import Optional, AsyncIterator
+
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic_core import ErrorDetails
+from starlette.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse, FileResponse
+
+from app.routers.dependency import get_staff_user
+from app.core.schema import IResponseBase
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.utils.translation import gettext as _
+from app.contrib.account.schema import UserSession
+
+from . import ExportFormatChoices, ExportResourceChoices
+from .actions import get_export_filename, get_export_url, get_export_path, write_xlsx_export
+from .resources import EXPORT_RESOURCES, ExportResource
+from .tasks import export_task
+from .writers import openpyxl, CONTENT_TYPES, aiter_csv, iter_file
+
+api = APIRouter()
+
+
+def get_export_format(
+        export_format: ExportFormatChoices = Query(ExportFormatChoices.csv, alias='format'),
+) -> str:
+    if export_format == ExportFormatChoices.xlsx and openpyxl is None:
+        raise RequestValidationError(
+            [ErrorDetails(
+                msg=_("Excel export is not available"),
+                loc=("query", "format",),
+                type='value_error',
+                input=export_format.value
+            )]
+        )
+    return export_format.value
+
+
+async def stream_rows(resource: ExportResource, expressions: list) -> AsyncIterator[list]:
+    # Request scoped session is closed before the response body is sent,
+    # the stream owns its session for the whole cursor lifetime
+    async with AsyncSessionLocal() as async_db:
+        async for obj in resource.repo.stream(async_db, expressions=expressions):
+            yield resource.get_row(obj)
+
+
+def build_xlsx_export(fs, resource: ExportResource, expressions: list) -> None:
+    with SessionLocal() as db:
+        write_xlsx_export(db, fs, resource, expressions=expressions)
+
+
+@api.get('/{resource}/', name='export-download', dependencies=[Depends(get_staff_user)])
+async def download_export(
+        resource: ExportResourceChoices,
+        export_format: str = Depends(get_export_format),
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+) -> StreamingResponse:
+    export_resource = EXPORT_RESOURCES[resource.value]
+    expressions = export_resource.get_expressions(created_from=created_from, created_to=created_to)
+    headers = {
+        'Content-Disposition': f'attachment; filename="{get_export_filename(export_resource, export_format)}"'
+    }
+    if export_format == ExportFormatChoices.csv.value:
+        return StreamingResponse(
+            aiter_csv(export_resource.fields, stream_rows(export_resource, expressions)),
+            media_type=CONTENT_TYPES[export_format], headers=headers,
+        )
+
+    # Workbook is built by a worker thread, the event loop only streams the finished file.
+    # iter_file closes fs once sent, the background task covers responses never iterated
+    fs = tempfile.TemporaryFile()
+    try:
+        await run_in_threadpool(build_xlsx_export, fs, export_resource, expressions)
+    except BaseException:
+        fs.close()
+        raise
+    return StreamingResponse(
+        iter_file(fs), media_type=CONTENT_TYPES[export_format], headers=headers,
+        background=BackgroundTask(fs.close),
+    )
+
+
+@api.post(
+    '/{resource}/job/', name='export-job-create', response_model=IResponseBase[str],
+    status_code=202,
+)
+async def create_export_job(
+        resource: ExportResourceChoices,
+        export_format: str = Depends(get_export_format),
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        user: UserSession = Depends(get_staff_user),
+) -> dict:
+    result = export_task.delay(
+        resource=resource.value,
+        export_format=export_format,
+        user_id=str(user.id),
+        created_from=created_from.isoformat() if created_from else None,
+        created_to=created_to.isoformat() if created_to else None,
+    )
+    return {
+        'data': result.id,
+        'message': _("Export started, you will be notified when the file is ready"),
+    }
+
+
+@api.get(
+    '/job/{job_id}/', name='export-job-detail', response_model=IResponseBase[Optional[str]],
+    dependencies=[Depends(get_staff_user)],
+)
+async def retrieve_export_job(job_id: str) -> dict:
+    """
+    Poll export job, data is export-file url once the job succeeded, message is task state.
+    Unknown and expired jobs are PENDING
+    """
+    result = export_task.AsyncResult(job_id)
+    state = await run_in_threadpool(lambda: result.state)
+    return {
+        'data': get_export_url(result.result) if state == 'SUCCESS' else None,
+        'message': state,
+    }
+
+
+@api.get(
+    '/file/{filename}/', name='export-file', response_class=FileResponse,
+    dependencies=[Depends(get_staff_user)],
+)
+async def download_export_file(filename: str) -> FileResponse:
+    path = get_export_path(filename)
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File does not exist")
+    return FileResponse(path, filename=filename)
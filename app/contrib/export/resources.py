@@ -0,0 +1,108 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+from uuid import UUID
+
+from app.db.repository import CRUDBase, CRUDBaseSync
+from app.contrib.account.repository import user_repo, user_repo_sync
+from app.contrib.order.repository import order_repo, order_repo_sync
+from app.contrib.payment.repository import (
+    payment_repo, payment_repo_sync, transaction_repo, transaction_repo_sync
+)
+
+from . import ExportResourceChoices
+
+# Spreadsheet apps evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+PHONE_RE = re.compile(r'^\+\d{5,15}$')
+
+
+def format_value(value: Any) -> Any:
+    """
+    Convert column value to a type both csv and openpyxl write as is,
+    text that could be read as a formula is prefixed with '
+    """
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        # openpyxl rejects timezone aware datetimes
+        return value.isoformat()
+    if not isinstance(value, str) or PHONE_RE.match(value):
+        return value
+    if value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+@dataclass(frozen=True)
+class ExportResource:
+    name: str
+    repo: CRUDBase
+    repo_sync: CRUDBaseSync
+    fields: tuple[str, ...]
+
+    @property
+    def model(self):
+        return self.repo.model
+
+    def get_expressions(
+            self,
+            created_from: Optional[datetime] = None,
+            created_to: Optional[datetime] = None,
+    ) -> list:
+        expressions = []
+        if created_from:
+            expressions.append(self.model.created_at >= created_from)
+        if created_to:
+            expressions.append(self.model.created_at < created_to)
+        return expressions
+
+    def get_row(self, obj) -> list:
+        return [format_value(getattr(obj, field)) for field in self.fields]
+
+
+EXPORT_RESOURCES: dict[str, ExportResource] = {
+    ExportResourceChoices.order.value: ExportResource(
+        name=ExportResourceChoices.order.value,
+        repo=order_repo,
+        repo_sync=order_repo_sync,
+        fields=(
+            'id', 'code', 'status', 'charge_status', 'origin', 'user_id', 'name', 'phone',
+            'customer_email', 'place_full_name', 'street_address', 'shipping_method', 'currency',
+            'shipping_price_amount', 'subtotal_amount', 'total_amount', 'total_charged_amount',
+            'note', 'created_at', 'completed_at',
+        ),
+    ),
+    ExportResourceChoices.payment.value: ExportResource(
+        name=ExportResourceChoices.payment.value,
+        repo=payment_repo,
+        repo_sync=payment_repo_sync,
+        fields=(
+            'id', 'user_id', 'wallet_id', 'payment_type', 'gateway', 'charge_status', 'is_active',
+            'currency', 'total_amount', 'captured_amount', 'payment_method_type', 'psp_reference',
+            'created_at',
+        ),
+    ),
+    ExportResourceChoices.transaction.value: ExportResource(
+        name=ExportResourceChoices.transaction.value,
+        repo=transaction_repo,
+        repo_sync=transaction_repo_sync,
+        fields=(
+            'id', 'payment_id', 'kind', 'is_success', 'currency', 'amount', 'token', 'error',
+            'created_at',
+        ),
+    ),
+    ExportResourceChoices.user.value: ExportResource(
+        name=ExportResourceChoices.user.value,
+        repo=user_repo,
+        repo_sync=user_repo_sync,
+        fields=(
+            'id', 'name', 'email', 'phone', 'user_type', 'is_active', 'is_staff', 'is_superuser',
+            'email_verified_at', 'phone_verified_at', 'created_at',
+        ),
+    ),
+}
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from app.core.celery_app import celery_app
+from app.db.session import SessionLocal
+from app.contrib.notification.models import Notification
+
+from .resources import EXPORT_RESOURCES
+from .actions import export_to_file, get_export_url, cleanup_expired_exports
+
+
+# Polled by export-job-detail
+@celery_app.task(acks_late=True, ignore_result=False, track_started=True, soft_time_limit=60 * 30, time_limit=60 * 31)
+def export_task(
+        resource: str,
+        export_format: str,
+        user_id: Optional[str] = None,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None,
+) -> str:
+    export_resource = EXPORT_RESOURCES[resource]
+    expressions = export_resource.get_expressions(
+        created_from=datetime.fromisoformat(created_from) if created_from else None,
+        created_to=datetime.fromisoformat(created_to) if created_to else None,
+    )
+    with SessionLocal() as db:
+        filename = export_to_file(db, export_resource, export_format, expressions=expressions)
+        db.add(Notification(
+            user=UUID(user_id) if user_id else None,
+            title=f"Export of {resource} is ready",
+            body=get_export_url(filename),
+            only_staff=True,
+        ))
+        db.commit()
+    return filename
+
+
+@celery_app.task(acks_late=True)
+def cleanup_expired_exports_task() -> int:
+    return cleanup_expired_exports()
@@ -0,0 +1,92 @@
+"""
+Export writers.
+
+CSV is produced in chunks of ``CSV_CHUNK_SIZE`` characters while rows are
+streamed from the database, so memory does not depend on row count. XLSX
+uses openpyxl write-only workbook which keeps rows in temporary files until
+saved, the zip archive can only be sent once the last row is written.
+openpyxl is optional, without it only CSV is available.
+"""
+import csv
+import io
+from typing import Iterable, AsyncIterator, Iterator, IO, BinaryIO
+
+try:
+    import openpyxl
+except ImportError:  # pragma: nocover
+    openpyxl = None  # type: ignore
+
+from . import ExportFormatChoices
+
+__all__ = (
+    'openpyxl', 'CONTENT_TYPES', 'CSV_CHUNK_SIZE',
+    'iter_csv', 'aiter_csv', 'write_csv', 'write_xlsx', 'new_xlsx_workbook', 'iter_file',
+)
+
+CSV_CHUNK_SIZE = 64 * 1024
+FILE_CHUNK_SIZE = 64 * 1024
+# Excel detects utf-8 only with BOM, names and addresses are mostly non latin
+CSV_BOM = '\ufeff'
+
+CONTENT_TYPES = {
+    ExportFormatChoices.csv.value: 'text/csv; charset=utf-8',
+    ExportFormatChoices.xlsx.value: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def iter_csv(header: Iterable[str], rows: Iterable[list]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write(CSV_BOM)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def aiter_csv(header: Iterable[str], rows: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write(CSV_BOM)
+    writer.writerow(header)
+    async for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def write_csv(fs: IO[str], header: Iterable[str], rows: Iterable[list]) -> None:
+    for chunk in iter_csv(header, rows):
+        fs.write(chunk)
+
+
+def new_xlsx_workbook(title: str, header: Iterable[str]):
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=title)
+    worksheet.append(list(header))
+    return workbook, worksheet
+
+
+def write_xlsx(fs: BinaryIO, title: str, header: Iterable[str], rows: Iterable[list]) -> None:
+    workbook, worksheet = new_xlsx_workbook(title, header)
+    for row in rows:
+        worksheet.append(row)
+    workbook.save(fs)
+
+
+def iter_file(fs: BinaryIO) -> Iterator[bytes]:
+    try:
+        fs.seek(0)
+        while chunk := fs.read(FILE_CHUNK_SIZE):
+            yield chunk
+    finally:
+        fs.close()
@@ -17,3 +17,4 @@ class ThumbnailCropChoices(TextChoices):
 
 class ContentTypeChoices(TextChoices):
     slider = "slider"
+    gallery = "gallery"
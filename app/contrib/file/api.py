@@ -1,13 +1,25 @@
-from typing import Optional, Literal
+import os
+import uuid
+import zipfile
+from email.utils import formatdate
+from typing import Optional, Literal, Union
 
-from fastapi import APIRouter, Depends, UploadFile, Form
+from fastapi import APIRouter, Depends, UploadFile, Form, Header, HTTPException, Request, Response
 
+from app.conf.config import settings, structure_settings
 from app.core.schema import IPaginationDataBase, CommonsModel, IResponseBase
-from app.routers.dependency import get_active_user, get_async_db, get_commons
+from app.contrib.account.schema import UserSession
+from app.routers.dependency import get_active_user, get_async_db, get_commons, get_aioredis
 from app.contrib.file import ContentTypeChoices
+from app.utils.file import upload_to, is_zip, get_release_path, find_release_path, RELEASE_DIR
 
 from .schema import FileVisible, FileBase
-from .repository import file_repo
+from .repository import file_repo, get_file_type
+from .exceptions import UpsupportedFileType
+from .upload import (
+    TUS_VERSION, TUS_EXTENSIONS, CHECKSUM_ALGORITHMS, UploadError, ResumableUploadStore,
+    parse_upload_metadata, parse_upload_checksum, write_chunk, part_path,
+)
 
 api = APIRouter()
 
@@ -131,3 +143,203 @@ async def get_media_list(
         'limit': commons.limit,
         'rows': obj_list,
     }
+
+
+def get_tus_headers(**headers) -> dict:
+    return {"Tus-Resumable": TUS_VERSION} | {k.replace('_', '-').title(): str(v) for k, v in headers.items()}
+
+
+async def get_user_upload(
+        upload_id: str,
+        user: UserSession,
+        store: ResumableUploadStore,
+) -> dict:
+    state = await store.get(upload_id)
+    if state is None or state['user_id'] != str(user.id):
+        raise HTTPException(status_code=404, detail="Upload does not exist")
+    return state
+
+
+@api.options('/resumable/', name='file-resumable-options', status_code=204)
+async def resumable_upload_options():
+    return Response(status_code=204, headers=get_tus_headers(
+        tus_version=TUS_VERSION,
+        tus_extension=TUS_EXTENSIONS,
+        tus_max_size=settings.RESUMABLE_UPLOAD_MAX_SIZE,
+        tus_checksum_algorithm=",".join(CHECKSUM_ALGORITHMS),
+    ))
+
+
+@api.post('/resumable/', name='file-resumable-create', status_code=201)
+async def create_resumable_upload(
+        request: Request,
+        upload_length: int = Header(..., alias="Upload-Length", ge=0),
+        upload_metadata: Optional[str] = Header(None, alias="Upload-Metadata"),
+        user: UserSession = Depends(get_active_user),
+        aioredis_instance=Depends(get_aioredis),
+):
+    """
+    Create upload, metadata keys: filename, filetype, caption, target (file or release),
+    release_os and version for release target
+    """
+    if upload_length > settings.RESUMABLE_UPLOAD_MAX_SIZE:
+        raise HTTPException(status_code=413, detail="Upload is too large")
+    try:
+        metadata = parse_upload_metadata(upload_metadata)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    target = metadata.get('target', 'file')
+    if target == 'release':
+        if not (user.is_staff or user.is_superuser):
+            raise HTTPException(status_code=403, detail="Staff member required")
+        release_os = metadata.get('release_os')
+        version = metadata.get('version', '')
+        if release_os not in ("android", "ios"):
+            raise HTTPException(status_code=400, detail="Invalid release os")
+        if not version or len(version) > 10 or '/' in version or '..' in version:
+            raise HTTPException(status_code=400, detail="Invalid version")
+        if not is_zip(metadata.get('filetype')):
+            raise HTTPException(status_code=400, detail="Unsupported file type.")
+        base_dir = RELEASE_DIR
+        file_path = get_release_path(release_os, version)
+        if find_release_path(release_os, version):
+            raise HTTPException(status_code=400, detail="File already exists")
+        os.makedirs(os.path.dirname(f'{base_dir}/{file_path}'), exist_ok=True)
+    elif target == 'file':
+        try:
+            file_type = get_file_type(metadata.get('filetype'))
+        except UpsupportedFileType as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        base_dir = structure_settings.MEDIA_DIR
+        extension = os.path.splitext(metadata.get('filename', ''))[1]
+        file_path = upload_to(uuid.uuid4().hex, extension, file_dir=file_type.value)
+    else:
+        raise HTTPException(status_code=400, detail="Invalid upload target")
+
+    store = ResumableUploadStore(aioredis_instance)
+    state = await store.create(
+        user_id=str(user.id),
+        length=upload_length,
+        file_path=file_path,
+        base_dir=base_dir,
+        target=target,
+        metadata=metadata,
+    )
+    open(part_path(f'{base_dir}/{file_path}'), 'wb').close()
+    return Response(status_code=201, headers=get_tus_headers(
+        location=request.url_for('file-resumable-detail', upload_id=state['id']),
+        upload_expires=formatdate(state['expires_at'], usegmt=True),
+    ))
+
+
+@api.head('/resumable/{upload_id}/', name='file-resumable-detail')
+async def get_resumable_upload(
+        upload_id: str,
+        user: UserSession = Depends(get_active_user),
+        aioredis_instance=Depends(get_aioredis),
+):
+    state = await get_user_upload(upload_id, user, ResumableUploadStore(aioredis_instance))
+    return Response(status_code=200, headers=get_tus_headers(
+        upload_offset=state['offset'],
+        upload_length=state['length'],
+        upload_expires=formatdate(state['expires_at'], usegmt=True),
+        cache_control="no-store",
+    ))
+
+
+@api.patch(
+    '/resumable/{upload_id}/', name='file-resumable-update',
+    response_model=IResponseBase[Union[FileVisible, str]]
+)
+async def update_resumable_upload(
+        upload_id: str,
+        request: Request,
+        response: Response,
+        upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+        upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
+        content_type: Optional[str] = Header(None, alias="Content-Type"),
+        user: UserSession = Depends(get_active_user),
+        aioredis_instance=Depends(get_aioredis),
+        async_db=Depends(get_async_db),
+):
+    """
+    Append chunk at offset, the finished upload is registered as file or release
+    """
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Unsupported content type")
+    store = ResumableUploadStore(aioredis_instance)
+    state = await get_user_upload(upload_id, user, store)
+    if upload_offset != state['offset']:
+        raise HTTPException(status_code=409, detail="Upload offset mismatch")
+    if not await store.acquire(upload_id):
+        raise HTTPException(status_code=409, detail="Upload is in progress")
+
+    try:
+        # Another request may have appended a chunk before the lock was taken
+        state = await get_user_upload(upload_id, user, store)
+        if upload_offset != state['offset']:
+            raise HTTPException(status_code=409, detail="Upload offset mismatch")
+        try:
+            checksum = parse_upload_checksum(upload_checksum)
+            path = f"{state['base_dir']}/{state['file_path']}"
+            offset = await write_chunk(
+                part_path(path), state['offset'], request.stream(), state['length'], checksum
+            )
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        expires_at = await store.set_offset(upload_id, offset)
+        if offset < state['length']:
+            return Response(status_code=204, headers=get_tus_headers(
+                upload_offset=offset,
+                upload_expires=formatdate(expires_at, usegmt=True),
+            ))
+
+        if state['target'] == 'release':
+            if not zipfile.is_zipfile(part_path(path)):
+                os.remove(part_path(path))
+                await store.delete(upload_id)
+                raise HTTPException(status_code=400, detail="Unsupported file type.")
+            if find_release_path(state['metadata']['release_os'], state['metadata']['version']):
+                os.remove(part_path(path))
+                await store.delete(upload_id)
+                raise HTTPException(status_code=400, detail="File already exists")
+            os.replace(part_path(path), path)
+            await store.delete(upload_id)
+            message, data = "Release uploaded", state['file_path']
+        else:
+            os.replace(part_path(path), path)
+            await store.delete(upload_id)
+            data = await file_repo.create_from_path(
+                async_db,
+                file_path=state['file_path'],
+                file_type=get_file_type(state['metadata']['filetype']),
+                obj_in={
+                    "content_type": ContentTypeChoices.gallery,
+                    "caption": state['metadata'].get('caption') or None,
+                }
+            )
+            message = "File created"
+    finally:
+        await store.release(upload_id)
+
+    response.headers.update(get_tus_headers(upload_offset=offset))
+    return {
+        "message": message,
+        "data": data,
+    }
+
+
+@api.delete('/resumable/{upload_id}/', name='file-resumable-delete', status_code=204)
+async def delete_resumable_upload(
+        upload_id: str,
+        user: UserSession = Depends(get_active_user),
+        aioredis_instance=Depends(get_aioredis),
+):
+    store = ResumableUploadStore(aioredis_instance)
+    state = await get_user_upload(upload_id, user, store)
+    path = part_path(f"{state['base_dir']}/{state['file_path']}")
+    if os.path.exists(path):
+        os.remove(path)
+    await store.delete(upload_id)
+    return Response(status_code=204, headers=get_tus_headers())
@@ -45,7 +45,10 @@ def is_gif(content_type):
 
 
 def get_file_content_type(upload_file: "UploadFile") -> FileTypeChoices:
-    content_type = upload_file.content_type
+    return get_file_type(upload_file.content_type)
+
+
+def get_file_type(content_type: Optional[str]) -> FileTypeChoices:
     if is_image(content_type):
         return FileTypeChoices.image
     elif is_pdf(content_type):
@@ -75,15 +78,35 @@ class CRUDFile(CRUDBase[File]):
         file_type = get_file_content_type(upload_file)
 
         original_file = save_file(upload_file, file_dir=file_type.value)
+        return await self.create_from_path(
+            async_db, file_path=original_file, file_type=file_type, obj_in=data, commit=commit, flush=flush
+        )
+
+    async def create_from_path(
+            self,
+            async_db: "AsyncSession",
+            file_path: str,
+            file_type: FileTypeChoices,
+            obj_in: Optional[dict] = None,
+            commit: Optional[bool] = True,
+            flush: Optional[bool] = False,
+    ) -> File:
+        """
+        Create file row for a file already stored in media dir, file is removed if creation fails
+        """
+        if obj_in is None:
+            data = dict()
+        else:
+            data = jsonable_encoder(obj_in, custom_encoder={Choices: lambda x: x.value})
         try:
             data = data | {
                 'file_type': file_type.value,
-                'file_path': original_file,
+                'file_path': file_path,
             }
             db_obj = await self.create(async_db, obj_in=data, commit=commit, flush=flush)
 
         except Exception as e:
-            delete_file(original_file)
+            delete_file(file_path)
             raise e
         return db_obj
 
@@ -0,0 +1,16 @@
+import redis
+
+from app.conf.config import settings
+from app.core.celery_app import celery_app
+
+from .upload import cleanup_expired_uploads
+
+
+@celery_app.task(acks_late=True)
+def cleanup_expired_uploads_task() -> int:
+    redis_instance = redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        encoding='utf8',
+    )
+    return cleanup_expired_uploads(redis_instance)
@@ -0,0 +1,261 @@
+"""
+Resumable (tus-style) uploads.
+
+The upload state lives in redis, the bytes are appended in place to
+``<final path>.part`` and the part file is renamed once ``Upload-Length``
+bytes have been received, so a finished upload is never copied.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import time
+import uuid
+from typing import Optional, AsyncIterator
+
+from app.conf.config import settings
+
+__all__ = (
+    'TUS_VERSION', 'TUS_EXTENSIONS', 'CHECKSUM_ALGORITHMS', 'RESUMABLE_UPLOAD_HEADERS',
+    'UploadError', 'ChecksumMismatch', 'ResumableUploadStore',
+    'parse_upload_metadata', 'parse_upload_checksum', 'write_chunk',
+    'part_path', 'cleanup_expired_uploads',
+)
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,checksum,expiration,termination'
+RESUMABLE_UPLOAD_HEADERS = [
+    'Location', 'Tus-Resumable', 'Upload-Offset', 'Upload-Length', 'Upload-Expires',
+]
+CHECKSUM_ALGORITHMS = {
+    'md5': hashlib.md5,
+    'sha1': hashlib.sha1,
+    'sha256': hashlib.sha256,
+}
+
+UPLOAD_KEY = 'resumable-upload:{upload_id}'
+UPLOAD_LOCK_KEY = 'resumable-upload-lock:{upload_id}'
+UPLOAD_EXPIRY_KEY = 'resumable-upload:expiry'
+
+
+class UploadError(Exception):
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class ChecksumMismatch(UploadError):
+    def __init__(self, detail: str = "Checksum mismatch"):
+        # 460 is the status reserved by the tus checksum extension
+        super().__init__(detail, status_code=460)
+
+
+def parse_upload_metadata(value: Optional[str]) -> dict:
+    """
+    Parse ``Upload-Metadata`` header: comma separated ``key base64value`` pairs
+    :param value:
+    :return:
+    """
+    metadata = {}
+    if not value:
+        return metadata
+    for pair in value.split(','):
+        pair = pair.strip()
+        if not pair:
+            continue
+        key, _, encoded = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(encoded, validate=True).decode() if encoded else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f"Invalid metadata value for {key}")
+    return metadata
+
+
+def parse_upload_checksum(value: Optional[str]) -> Optional[tuple[str, bytes]]:
+    """
+    Parse ``Upload-Checksum`` header: ``<algorithm> <base64 digest>``
+    :param value:
+    :return:
+    """
+    if not value:
+        return None
+    algorithm, _, encoded = value.strip().partition(' ')
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError("Unsupported checksum algorithm")
+    try:
+        digest = base64.b64decode(encoded, validate=True)
+    except binascii.Error:
+        raise UploadError("Invalid checksum value")
+    return algorithm, digest
+
+
+def part_path(file_path: str) -> str:
+    return f'{file_path}.part'
+
+
+async def write_chunk(
+        path: str,
+        offset: int,
+        stream: AsyncIterator[bytes],
+        length: int,
+        checksum: Optional[tuple[str, bytes]] = None,
+) -> int:
+    """
+    Append request body to the part file starting at offset and return new offset.
+
+    The part file is truncated back to offset if the checksum does not match,
+    if the chunk overflows upload length or if the stream is interrupted
+    while a checksum was requested.
+    :param path: part file path
+    :param offset: current upload offset
+    :param stream: request body stream
+    :param length: total upload length
+    :param checksum: parsed Upload-Checksum header
+    :return:
+    """
+    hasher = CHECKSUM_ALGORITHMS[checksum[0]]() if checksum else None
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as fs:
+        fs.seek(offset)
+        fs.truncate()
+        try:
+            async for chunk in stream:
+                if not chunk:
+                    continue
+                if offset + written + len(chunk) > length:
+                    raise UploadError("Chunk exceeds upload length", status_code=413)
+                fs.write(chunk)
+                if hasher:
+                    hasher.update(chunk)
+                written += len(chunk)
+            if hasher and hasher.digest() != checksum[1]:
+                raise ChecksumMismatch()
+        except UploadError:
+            fs.truncate(offset)
+            raise
+        except Exception:
+            # Connection dropped: keep what was received unless it can not be verified
+            if hasher:
+                fs.truncate(offset)
+                raise
+            fs.truncate(offset + written)
+            fs.flush()
+            return offset + written
+    return offset + written
+
+
+class ResumableUploadStore:
+    """
+    Keep upload state in redis hash, expiry in sorted set for cleanup
+    """
+    __slots__ = ('redis',)
+
+    def __init__(self, aioredis_instance):
+        self.redis = aioredis_instance
+
+    async def create(
+            self,
+            *,
+            user_id: str,
+            length: int,
+            file_path: str,
+            base_dir: str,
+            target: str,
+            metadata: dict,
+    ) -> dict:
+        upload_id = uuid.uuid4().hex
+        expires_at = int(time.time()) + settings.RESUMABLE_UPLOAD_EXPIRE_SECONDS
+        state = {
+            'id': upload_id,
+            'user_id': user_id,
+            'offset': 0,
+            'length': length,
+            'file_path': file_path,
+            'base_dir': base_dir,
+            'target': target,
+            'expires_at': expires_at,
+        } | {f'meta:{k}': v for k, v in metadata.items()}
+        key = UPLOAD_KEY.format(upload_id=upload_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=state)
+            # Keep the hash a bit longer than expiry so cleanup can still find the part file
+            pipe.expireat(key, expires_at + settings.RESUMABLE_UPLOAD_EXPIRE_SECONDS)
+            pipe.zadd(UPLOAD_EXPIRY_KEY, {upload_id: expires_at})
+            await pipe.execute()
+        return self.load(state)
+
+    async def get(self, upload_id: str) -> Optional[dict]:
+        state = await self.redis.hgetall(UPLOAD_KEY.format(upload_id=upload_id))
+        if not state:
+            return None
+        state = self.load(state)
+        if state['expires_at'] < time.time():
+            return None
+        return state
+
+    async def set_offset(self, upload_id: str, offset: int) -> int:
+        expires_at = int(time.time()) + settings.RESUMABLE_UPLOAD_EXPIRE_SECONDS
+        key = UPLOAD_KEY.format(upload_id=upload_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={'offset': offset, 'expires_at': expires_at})
+            pipe.expireat(key, expires_at + settings.RESUMABLE_UPLOAD_EXPIRE_SECONDS)
+            pipe.zadd(UPLOAD_EXPIRY_KEY, {upload_id: expires_at})
+            await pipe.execute()
+        return expires_at
+
+    async def delete(self, upload_id: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(UPLOAD_KEY.format(upload_id=upload_id))
+            pipe.zrem(UPLOAD_EXPIRY_KEY, upload_id)
+            await pipe.execute()
+
+    async def acquire(self, upload_id: str) -> bool:
+        return bool(await self.redis.set(
+            UPLOAD_LOCK_KEY.format(upload_id=upload_id), 1, nx=True,
+            ex=settings.RESUMABLE_UPLOAD_LOCK_SECONDS,
+        ))
+
+    async def release(self, upload_id: str) -> None:
+        await self.redis.delete(UPLOAD_LOCK_KEY.format(upload_id=upload_id))
+
+    @staticmethod
+    def load(state: dict) -> dict:
+        metadata = {k[5:]: v for k, v in state.items() if k.startswith('meta:')}
+        return {
+            'id': state['id'],
+            'user_id': state['user_id'],
+            'offset': int(state['offset']),
+            'length': int(state['length']),
+            'file_path': state['file_path'],
+            'base_dir': state['base_dir'],
+            'target': state['target'],
+            'expires_at': int(state['expires_at']),
+            'metadata': metadata,
+        }
+
+
+def cleanup_expired_uploads(redis_instance, now: Optional[float] = None) -> int:
+    """
+    Remove part files and state of uploads whose expiry has passed
+    :param redis_instance: sync redis client
+    :param now:
+    :return: number of removed uploads
+    """
+    if now is None:
+        now = time.time()
+    removed = 0
+    for upload_id in redis_instance.zrangebyscore(UPLOAD_EXPIRY_KEY, '-inf', now):
+        key = UPLOAD_KEY.format(upload_id=upload_id)
+        file_path, base_dir = redis_instance.hmget(key, 'file_path', 'base_dir')
+        if file_path:
+            path = part_path(f'{base_dir}/{file_path}')
+            if os.path.exists(path):
+                os.remove(path)
+        pipe = redis_instance.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.zrem(UPLOAD_EXPIRY_KEY, upload_id)
+        pipe.execute()
+        removed += 1
+    return removed
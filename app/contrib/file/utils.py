@@ -9,6 +9,7 @@ from typing import Optional
 from fractions import Fraction
 
 from app.conf.config import settings
+from app.core.metrics import record_cache
 from app.db.session import SessionLocal
 from app.utils.file import delete_file, convert_image
 
@@ -30,6 +31,7 @@ def get_image_thumbnail(
         hash_object = hashlib.sha224(f'{image_path} {width}x{height} {file_format}'.encode('ascii'))
         hex_dig = hash_object.hexdigest()
         thumbnail = redis_instance.get(hex_dig, )
+        record_cache('thumbnail', hit=bool(thumbnail))
         if not thumbnail:
             data = {
                 'original': image_path,
@@ -10,7 +10,7 @@ from fastapi.exceptions import RequestValidationError
 from pydantic_core import ErrorDetails
 
 from app.core.schema import IPaginationDataBase, CommonsModel, IResponseBase
-from app.routers.dependency import get_commons, get_db, get_locale, get_staff_user
+from app.routers.dependency import get_commons, get_db, get_locale, get_staff_user, get_redis
 from app.utils.translation import gettext as _
 from app.db.repository import prepare_data_with_slug, prepare_data_with_slug_sync
 from app.conf import LanguagesChoices
@@ -21,6 +21,7 @@ from .schema import (
 )
 from .models import Place, PlaceTranslation
 from .repository import place_repo_sync, place_tr_repo_sync
+from .cache import invalidate_place_cache
 
 api = APIRouter()
 
@@ -141,6 +142,7 @@ async def update_place(
         obj_id: int,
         obj_in: PlaceBase,
         db=Depends(get_db),
+        redis_instance=Depends(get_redis),
 ):
     db_obj = place_repo_sync.get(db, obj_id=obj_id)
     if obj_in.parent_id is not None and db_obj.parent_id != obj_in.parent_id:
@@ -166,6 +168,7 @@ async def update_place(
     result = place_repo_sync.update(
         db, db_obj=db_obj, obj_in=data
     )
+    invalidate_place_cache(redis_instance, obj_id)
 
     return {
         "message": _("PLace updated"),
@@ -211,6 +214,7 @@ def create_place_translation(
         obj_id: int,
         obj_in: PlaceTranslationCreate,
         db=Depends(get_db),
+        redis_instance=Depends(get_redis),
 ):
     place_exists = place_repo_sync.exists(db, params={"id": obj_id})
 
@@ -233,6 +237,7 @@ def create_place_translation(
         "full_name": obj_in.full_name,
         "locale": obj_in.locale,
     })
+    invalidate_place_cache(redis_instance, obj_id)
     return {
         "message": f"Place translation created: {obj_in.locale}",
         "data": result
@@ -264,11 +269,13 @@ def update_place_translation(
         obj_locale: str,
         obj_in: PlaceTranslationBase,
         db=Depends(get_db),
+        redis_instance=Depends(get_redis),
 ) -> dict:
     db_obj = place_tr_repo_sync.get_by_params(db, params={'id': obj_id, "locale": obj_locale})
     result = place_tr_repo_sync.update(
         db, db_obj=db_obj, obj_in=obj_in.model_dump(exclude_unset=True)
     )
+    invalidate_place_cache(redis_instance, obj_id)
     return {
         "message": "Place translation updated: %(locale)s" % {"locale": obj_locale},
         "data": result
@@ -286,11 +293,13 @@ def delete_place_translation(
         obj_id: int,
         locale: str,
         db=Depends(get_db),
+        redis_instance=Depends(get_redis),
 ):
     place_tr_repo_sync.remove(
         db,
         expressions=(PlaceTranslation.id == obj_id, PlaceTranslation.locale == locale,)
     )
+    invalidate_place_cache(redis_instance, obj_id)
 
 
 @api.get(
@@ -0,0 +1,45 @@
+import json
+from typing import Optional
+
+from sqlalchemy.orm import joinedload
+
+from app.conf.config import settings
+from app.core.metrics import record_cache
+
+from .models import Place, PlaceTranslation
+from .repository import place_repo
+
+PLACE_CACHE_KEY = 'place:{place_id}:{locale}'
+
+
+def get_place_cache_key(place_id: int, locale: str) -> str:
+    return PLACE_CACHE_KEY.format(place_id=place_id, locale=locale)
+
+
+async def get_cached_place(async_db, aioredis_instance, place_id: int, locale: str) -> Optional[dict]:
+    """
+    Return place summary (id, name, full_name) in locale, cached in redis
+    :return: None if place does not exist
+    """
+    key = get_place_cache_key(place_id, locale)
+    cached = await aioredis_instance.get(key)
+    record_cache('place', hit=cached is not None)
+    if cached is not None:
+        return json.loads(cached)
+
+    options = (joinedload(Place.current_translation.and_(PlaceTranslation.locale == locale)),)
+    db_place = await place_repo.first(async_db, params={'id': place_id}, options=options)
+    if db_place is None:
+        return None
+    translation = db_place.current_translation
+    data = {
+        'id': db_place.id,
+        'name': translation.name if translation else None,
+        'full_name': translation.full_name if translation else None,
+    }
+    await aioredis_instance.setex(key, settings.PLACE_CACHE_EXPIRE_SECONDS, json.dumps(data))
+    return data
+
+
+def invalidate_place_cache(redis_instance, place_id: int) -> None:
+    redis_instance.delete(*(get_place_cache_key(place_id, locale) for locale, _ in settings.LANGUAGES))
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING, Optional
 from sqlalchemy import update
-from app.db.repository import CRUDBaseSync, prepare_data_with_slug_sync
+from app.db.repository import CRUDBase, CRUDBaseSync, prepare_data_with_slug_sync
 
 from .models import Place, PlaceTranslation
 
@@ -87,5 +87,10 @@ class CRUDPlaceTranslationSync(CRUDBaseSync[PlaceTranslation]):
     pass
 
 
+class CRUDPlace(CRUDBase[Place]):
+    pass
+
+
 place_repo_sync = CRUDPlaceSync(Place)
 place_tr_repo_sync = CRUDPlaceTranslationSync(PlaceTranslation)
+place_repo = CRUDPlace(Place)
@@ -0,0 +1,71 @@
+from decimal import Decimal
+from uuid import uuid4
+
+from app.conf.config import settings
+from app.contrib.order import OrderOriginChoices, OrderEventChoices
+from app.contrib.config.repository import config_repo
+from app.contrib.plugins.manager import get_plugins_manager
+
+from .batch_calculations import get_shipping_prices, price_order
+from .models import Order, OrderLine, OrderEvent
+from .schema import OrderCheckout
+from .tasks import notify_order_placed_task
+from .utils import order_code_allocator
+
+
+async def place_order(async_db, *, user, obj_in: OrderCheckout, place: dict, locale: str) -> Order:
+    """
+    Insert order, its lines and "placed" event in one transaction, notify staff and plugins after commit
+    :param async_db:
+    :param user: customer
+    :param obj_in: checkout data
+    :param place: place summary from location cache
+    :param locale:
+    :return: committed order
+    """
+    currency = settings.DEFAULT_CURRENCY
+    config = await config_repo.first(async_db)
+    shipping_prices = get_shipping_prices(config) if config else {}
+    amounts = price_order(
+        [line.price for line in obj_in.lines], shipping_prices.get(obj_in.shipping_method.value), currency
+    )
+    order = Order(
+        # Primary key is set here so lines and event need no flush round trip before commit
+        id=uuid4(),
+        code=await order_code_allocator.next(async_db),
+        user_id=user.id,
+        language_code=locale,
+        name=obj_in.name,
+        phone=obj_in.phone,
+        street_address=obj_in.street_address,
+        place_id=place['id'],
+        place_full_name=place['full_name'],
+        customer_email=user.email,
+        origin=OrderOriginChoices.checkout,
+        currency=currency,
+        shipping_method=obj_in.shipping_method,
+        note=obj_in.note or "",
+        **amounts,
+    )
+    async_db.add(order)
+    async_db.add_all([
+        OrderLine(
+            order_id=order.id,
+            currency=currency,
+            total_price_amount=line.price or Decimal(0),
+            un_discounted_total_price_amount=line.price or Decimal(0),
+            note=line.note,
+            public_metadata={'name': line.name, 'phone': line.phone},
+        )
+        for line in obj_in.lines
+    ])
+    async_db.add(OrderEvent(order_id=order.id, user_id=user.id, event_type=OrderEventChoices.placed, parameters={}))
+    order_id = order.id
+    try:
+        await async_db.commit()
+    except Exception:
+        await async_db.rollback()
+        raise
+    notify_order_placed_task.delay(order_id=str(order_id))
+    await get_plugins_manager().order_created(async_db, order)
+    return order
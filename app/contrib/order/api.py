@@ -1,7 +1,9 @@
+from datetime import datetime
 from typing import Optional, Literal
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.exceptions import RequestValidationError
+from loguru import logger
 from pydantic_core import ErrorDetails
 
 from sqlalchemy.orm import joinedload
@@ -9,22 +11,38 @@ from sqlalchemy.orm import joinedload
 from app.routers.dependency import (
     get_commons, get_async_db, get_active_user,
     get_staff_user, get_current_user, get_db,
-    get_locale
+    get_locale, get_aioredis
 )
 from app.core.schema import CommonsModel, IPaginationDataBase, IResponseBase
 from app.utils.translation import gettext as _
 from app.contrib.account.models import User
 from app.contrib.order import OrderStatusChoices, OrderOriginChoices
-from app.contrib.location.models import PlaceTranslation, Place
-from app.contrib.location.repository import place_repo_sync
+from app.contrib.location.cache import get_cached_place
 
-from .repository import order_repo
+from .repository import order_repo, order_status_counter_repo
+from .actions import place_order
+from .search import ilike_contains
 from .schema import OrderVisible, OrderCheckout, OrderLineCheckout
 from .models import Order
 
 api = APIRouter()
 
 
+def get_order_filters(
+        status: Optional[OrderStatusChoices] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+) -> list:
+    expressions = []
+    if status:
+        expressions.append(Order.status == status)
+    if created_from:
+        expressions.append(Order.created_at >= created_from)
+    if created_to:
+        expressions.append(Order.created_at < created_to)
+    return expressions
+
+
 @api.get(
     '/', name='order-list', response_model=IPaginationDataBase[OrderVisible],
     dependencies=[Depends(get_staff_user)]
@@ -34,15 +52,27 @@ async def get_order_list(
         commons: CommonsModel = Depends(get_commons),
         order_by: Optional[Literal[
             "created_at", "-created_at"
-        ]] = "-created_at"
+        ]] = "-created_at",
+        search: Optional[str] = Query(None, max_length=255),
+        expressions: list = Depends(get_order_filters),
 ) -> dict:
-    rows = await order_repo.get_all(
-        async_db=async_db,
-        limit=commons.limit,
-        offset=commons.offset,
-        order_by=(order_by,),
-        # expressions=expressions
-    )
+    if search:
+        rows = await order_repo.search(
+            async_db,
+            search,
+            limit=commons.limit,
+            offset=commons.offset,
+            order_by=(order_by,),
+            expressions=expressions,
+        )
+    else:
+        rows = await order_repo.get_all(
+            async_db=async_db,
+            limit=commons.limit,
+            offset=commons.offset,
+            order_by=(order_by,),
+            expressions=expressions
+        )
     return {
         'page': commons.page,
         'limit': commons.limit,
@@ -56,9 +86,24 @@ async def get_order_list(
     dependencies=[Depends(get_staff_user)]
 )
 async def count_orders(
-        async_db=Depends(get_async_db)
+        async_db=Depends(get_async_db),
+        search: Optional[str] = Query(None, max_length=255),
+        expressions: list = Depends(get_order_filters),
+):
+    if search:
+        return await order_repo.count_search(async_db, search, expressions=expressions)
+    return await order_repo.count(async_db, expressions=expressions)
+
+
+@api.get(
+    "/status-counts/", name="order-status-counts",
+    response_model=dict[str, int],
+    dependencies=[Depends(get_staff_user)]
+)
+async def get_orders_status_counts(
+        async_db=Depends(get_async_db),
 ):
-    return await order_repo.count(async_db)
+    return await order_status_counter_repo.get_counts(async_db)
 
 
 @api.get(
@@ -129,7 +174,8 @@ async def get_my_orders_list(
         q['status'] = status
     expressions = None
     if code:
-        expressions = (Order.code.ilike(f'%{code}%'),)
+        # Served by the trigram index on code
+        expressions = (ilike_contains(Order.code, code),)
     obj_list = await order_repo.get_all(
         async_db=async_db,
         limit=commons.limit,
@@ -151,15 +197,18 @@ async def get_my_orders_count(
         async_db=Depends(get_async_db),
         status: Optional[OrderStatusChoices] = None
 ):
-    params = {"user_id": user.id, "deleted_at": None}
+    counts = await order_status_counter_repo.get_counts(async_db, scope=str(user.id))
     if status:
-        params['status'] = status
-    count = await order_repo.count(
-        async_db=async_db,
-        params=params,
-        # expressions=expressions
-    )
-    return count
+        return counts[status.value]
+    return sum(counts.values())
+
+
+@api.get('/my/status-counts/', name="order-my-status-counts", response_model=dict[str, int])
+async def get_my_orders_status_counts(
+        user=Depends(get_current_user),
+        async_db=Depends(get_async_db),
+):
+    return await order_status_counter_repo.get_counts(async_db, scope=str(user.id))
 
 
 @api.post(
@@ -172,60 +221,28 @@ async def create_my_order(
         obj_in: OrderCheckout,
         user=Depends(get_active_user),
         async_db=Depends(get_async_db),
-        db=Depends(get_db),
+        aioredis_instance=Depends(get_aioredis),
         locale: Optional[str] = Depends(get_locale),
 ):
-
-    options = joinedload(Place.current_translation.and_(PlaceTranslation.locale == locale))
-    db_place = place_repo_sync.get_by_params(db=db, params={"id": obj_in.place_id}, options=options)
-    if db_place is None:
+    place = await get_cached_place(async_db, aioredis_instance, obj_in.place_id, locale)
+    if place is None:
         raise RequestValidationError(
             [ErrorDetails(
                 msg=_("Place does not exist"),
                 loc=("body", "placeId",),
                 type='value_error',
-                input=obj_in.placeId
+                input=obj_in.place_id
             )]
         )
-    data = {
-        "place_id": obj_in.place_id,
-        "place_full_name": db_place.full_name,
-        "language_code": locale,
-        "user_id": user.id,
-        "name": obj_in.name,
-        "phone": obj_in.phone,
-        "street_address": obj_in.street_address,
-        "user_email": user.email,
-        "origin": OrderOriginChoices.checkout,
-        "shipping_method": obj_in.shipping_method,
-        "note": obj_in.note,
-    }
     try:
-        # data = {
-        #     "user_id": user.id,
-        #     "sender_name": obj_in.sender_name,
-        #     "sender_phone": obj_in.sender_phone,
-        #     "billing_address": obj_in.billing_address,
-        #     "shipping_address": obj_in.shipping_address,
-        #     "receiver_name": obj_in.receiver_name,
-        #     "receiver_phone": obj_in.receiver_phone,
-        #     "price": obj_in.price,
-        #     "weight": obj_in.weight,
-        #     "note": obj_in.note,
-        #     "shipping_type": obj_in.shipping_type
-        # }
-        result = await order_repo.create(
-            async_db, obj_in=data, commit=False, flush=True
-        )
-        return {
-            "message": _("Order successfully created"),
-            "data": result
-        }
-
+        order = await place_order(async_db, user=user, obj_in=obj_in, place=place, locale=locale)
     except Exception as e:
-        print(e)
-        db.rollback()
+        logger.exception(e)
         raise HTTPException(status_code=500, detail=_("Something went wrong"))
+    return {
+        "message": _("Order successfully created"),
+        "data": str(order.id)
+    }
 
 
 @api.get(
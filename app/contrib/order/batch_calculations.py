@@ -0,0 +1,217 @@
+"""
+Batch order pricing on integer minor units.
+
+Per order helpers in ``base_calculations`` build a ``Money`` per line and
+re-check currency on every operation, fine for one order but slow for
+repricing thousands of them. Functions here take parallel lists of int minor
+units (cents for 2 digits currencies), one item per order or line, and return
+new lists, rounding rules are the same as ``app.utils.prices``: amounts are
+quantized half up when converted to minor units and discounts are rounded
+down. Order total is subtotal + shipping price + extra amount (``get_totals``),
+``place_order`` prices new orders with ``price_order`` and
+``reprice_orders_shipping`` recalculates open orders from their lines with
+current ``Config`` shipping prices, writing changed ones back with an
+executemany UPDATE per batch, each batch is locked and committed on its own.
+Orders carry no discounts before confirmation, neither applies the discount
+helpers.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+from typing import Iterable, Optional, Sequence, TYPE_CHECKING
+
+from sqlalchemy import select, update
+
+from app.conf.config import settings
+from app.utils.prices import get_currency_precision
+from app.contrib.order import OrderStatusChoices, ShippingMethodChoices
+
+from .models import Order, OrderLine
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+# Orders nobody confirmed yet follow current shipping prices
+REPRICE_STATUSES = (OrderStatusChoices.draft, OrderStatusChoices.unconfirmed)
+
+
+def get_minor_factor(currency: str) -> int:
+    return 10 ** get_currency_precision(currency)
+
+
+def to_minor(amounts: Iterable[Optional[Decimal]], currency: str) -> list[int]:
+    """
+    Convert decimal amounts to minor units, None is zero
+    """
+    factor = get_minor_factor(currency)
+    return [
+        int((amount * factor).to_integral_value(ROUND_HALF_UP)) if amount else 0
+        for amount in amounts
+    ]
+
+
+def from_minor(values: Iterable[int], currency: str) -> list[Decimal]:
+    exponent = -get_currency_precision(currency)
+    return [Decimal(value).scaleb(exponent) for value in values]
+
+
+def sum_by_order(order_indexes: Sequence[int], amounts: Sequence[int], size: int) -> list[int]:
+    """
+    Sum line amounts per order
+    :param order_indexes: order position of every line
+    :param amounts: line amounts
+    :param size: number of orders
+    :return: order subtotals
+    """
+    totals = [0] * size
+    for index, amount in zip(order_indexes, amounts):
+        totals[index] += amount
+    return totals
+
+
+def sum_columns(*columns: Sequence[int]) -> list[int]:
+    return [sum(values) for values in zip(*columns)]
+
+
+def apply_fixed_discounts(amounts: Sequence[int], discounts: Sequence[int]) -> list[int]:
+    return [max(amount - discount, 0) for amount, discount in zip(amounts, discounts)]
+
+
+def apply_percentage_discounts(amounts: Sequence[int], percentages: Sequence[Decimal]) -> list[int]:
+    """
+    Same result as ``percentage_discount`` on quantized ``Money``, the discount is rounded down
+    """
+    result = []
+    for amount, percentage in zip(amounts, percentages):
+        ratio = Fraction(percentage) / 100
+        discount = amount * ratio.numerator // ratio.denominator
+        result.append(max(amount - discount, 0))
+    return result
+
+
+def get_totals(subtotals: Sequence[int], shipping_prices: Sequence[int], extra_amounts: Sequence[int]) -> list[int]:
+    return sum_columns(subtotals, shipping_prices, extra_amounts)
+
+
+def get_amount_columns(subtotal: Decimal, shipping_price: Decimal, total: Decimal) -> dict:
+    return {
+        'subtotal_amount': subtotal,
+        'base_shipping_price_amount': shipping_price,
+        'un_discounted_base_shipping_price_amount': shipping_price,
+        'shipping_price_amount': shipping_price,
+        'total_amount': total,
+    }
+
+
+def price_order(
+        line_amounts: Sequence[Optional[Decimal]],
+        shipping_price: Optional[Decimal],
+        currency: str,
+        extra_amount: Optional[Decimal] = None,
+) -> dict:
+    """
+    Return amount columns of one order, same result as calculate_shipping
+    """
+    [subtotal] = sum_by_order([0] * len(line_amounts), to_minor(line_amounts, currency), 1)
+    [price], [extra] = to_minor([shipping_price], currency), to_minor([extra_amount], currency)
+    [total] = get_totals([subtotal], [price], [extra])
+    return get_amount_columns(*from_minor((subtotal, price, total), currency))
+
+
+def get_shipping_prices(config) -> dict[str, Decimal]:
+    return {
+        ShippingMethodChoices.regular.value: config.regular_shipping_price,
+        ShippingMethodChoices.express.value: config.express_shipping_price,
+    }
+
+
+def calculate_shipping(rows: Sequence, lines: Sequence, shipping_prices: dict[str, Decimal]) -> list[dict]:
+    """
+    Recalculate subtotal from lines and total with shipping price, return update params of changed orders
+    :param rows: (id, currency, shipping_method, subtotal_amount, extra_amount, shipping_price_amount, total_amount)
+    :param lines: (order_id, total_price_amount) of rows lines
+    :param shipping_prices: shipping method value -> price
+    :return:
+    """
+    lines_by_order: dict = {}
+    for line in lines:
+        lines_by_order.setdefault(line.order_id, []).append(line.total_price_amount)
+    by_currency: dict[str, list] = {}
+    for row in rows:
+        by_currency.setdefault(row.currency, []).append(row)
+
+    params = []
+    for currency, group in by_currency.items():
+        order_indexes, line_amounts = [], []
+        for index, row in enumerate(group):
+            amounts = lines_by_order.get(row.id, ())
+            order_indexes.extend([index] * len(amounts))
+            line_amounts.extend(amounts)
+        subtotals = sum_by_order(order_indexes, to_minor(line_amounts, currency), len(group))
+        prices = to_minor([shipping_prices.get(row.shipping_method.value) for row in group], currency)
+        totals = get_totals(subtotals, prices, to_minor([row.extra_amount for row in group], currency))
+        current = zip(
+            to_minor([row.subtotal_amount for row in group], currency),
+            to_minor([row.shipping_price_amount for row in group], currency),
+            to_minor([row.total_amount for row in group], currency),
+        )
+        changed = [
+            index for index, values in enumerate(current)
+            if values != (subtotals[index], prices[index], totals[index])
+            or group[index].shipping_price_amount is None
+        ]
+        columns = zip(
+            from_minor((subtotals[index] for index in changed), currency),
+            from_minor((prices[index] for index in changed), currency),
+            from_minor((totals[index] for index in changed), currency),
+        )
+        for index, (subtotal, price, total) in zip(changed, columns):
+            params.append({'id': group[index].id, **get_amount_columns(subtotal, price, total)})
+    return params
+
+
+def reprice_orders_shipping(
+        db: "Session",
+        shipping_prices: dict[str, Decimal],
+        batch_size: Optional[int] = None,
+) -> int:
+    """
+    Apply shipping prices to open orders, every batch is read with FOR UPDATE, costs one lines query and
+    one executemany UPDATE and is committed on its own
+    :param db: sqlalchemy.orm.Session, committed after every batch
+    :param shipping_prices: see get_shipping_prices
+    :param batch_size: default EXPORT_YIELD_PER
+    :return: number of updated orders
+    """
+    batch_size = batch_size or settings.EXPORT_YIELD_PER
+    # An order confirmed by a concurrent transaction is re-checked against the filter after its lock is
+    # released and left out, so it is never written with prices read before the confirmation
+    stmt = select(
+        Order.id, Order.currency, Order.shipping_method, Order.subtotal_amount,
+        Order.extra_amount, Order.shipping_price_amount, Order.total_amount,
+    ).filter(
+        Order.status.in_(REPRICE_STATUSES), Order.deleted_at.is_(None),
+    ).order_by(Order.id).limit(batch_size).with_for_update(of=Order)
+
+    updated, last_id = 0, None
+    while True:
+        # Keyset pages, a cursor would not survive the commit of the previous batch
+        batch = db.execute(stmt if last_id is None else stmt.filter(Order.id > last_id)).all()
+        if not batch:
+            break
+        lines = db.execute(
+            select(OrderLine.order_id, OrderLine.total_price_amount)
+            .filter(OrderLine.order_id.in_([row.id for row in batch]))
+        ).all()
+        params = calculate_shipping(batch, lines, shipping_prices)
+        if params:
+            # Bulk UPDATE by primary key does not run column onupdate
+            updated_at = datetime.now(timezone.utc)
+            db.execute(update(Order), [{**values, 'updated_at': updated_at} for values in params])
+            updated += len(params)
+        # Releases the batch locks
+        db.commit()
+        if len(batch) < batch_size:
+            break
+        last_id = batch[-1].id
+    return updated
@@ -0,0 +1,168 @@
+"""
+Incremental order status counters.
+
+``after_flush`` turns status, owner and soft deletion changes of flushed
+orders into +1/-1 deltas of ``OrderStatusCounter`` rows (per user and "all")
+and upserts them on the flushing connection, so counters commit or roll back
+together with the orders. Every order write touches the "all" counter, its
+deltas go to one of ``ORDER_COUNTER_SHARDS`` rows picked at random so
+concurrent transactions rarely wait for each other. Bulk ``update()``/``delete()``
+statements bypass the ORM and are not counted, ``reconcile_counters`` corrects
+the counters from orders and runs periodically.
+"""
+import random
+from collections import Counter
+from typing import Optional, Iterable
+
+from sqlalchemy import event, inspect, select, func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.conf.config import settings
+from app.contrib.order import OrderStatusChoices
+
+from .models import Order, OrderStatusCounter
+
+__all__ = (
+    'GLOBAL_SCOPE', 'get_counter_key', 'get_order_deltas', 'get_counter_differences', 'reconcile_counters',
+    'fill_counts',
+)
+
+GLOBAL_SCOPE = 'all'
+
+_dialect_insert = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def _value(state, key: str, *, old: bool):
+    history = state.attrs[key].history
+    if old and history.deleted:
+        return history.deleted[0]
+    if not old and history.added:
+        return history.added[0]
+    return state.attrs[key].value
+
+
+def get_counter_key(status, user_id, deleted_at) -> Optional[tuple[Optional[str], str]]:
+    if status is None or deleted_at is not None:
+        return None
+    return str(user_id) if user_id else None, str(getattr(status, 'value', status))
+
+
+def get_order_deltas(new: Iterable[Order], dirty: Iterable[Order], deleted: Iterable[Order]) -> Counter:
+    """
+    Return (scope, status) -> delta for flushed orders, call before flush history is reset
+    """
+    deltas = Counter()
+
+    def apply(key, delta):
+        if key is None:
+            return
+        user_scope, status = key
+        deltas[(GLOBAL_SCOPE, status)] += delta
+        if user_scope:
+            deltas[(user_scope, status)] += delta
+
+    for order in new:
+        apply(get_counter_key(order.status, order.user_id, order.deleted_at), 1)
+    for order in dirty:
+        state = inspect(order)
+        old = get_counter_key(*(_value(state, key, old=True) for key in ('status', 'user_id', 'deleted_at')))
+        current = get_counter_key(*(_value(state, key, old=False) for key in ('status', 'user_id', 'deleted_at')))
+        if old != current:
+            apply(old, -1)
+            apply(current, 1)
+    for order in deleted:
+        state = inspect(order)
+        apply(get_counter_key(*(_value(state, key, old=True) for key in ('status', 'user_id', 'deleted_at'))), -1)
+    return Counter({key: delta for key, delta in deltas.items() if delta})
+
+
+def upsert_deltas(connection, deltas: Counter, global_shard: Optional[int] = None) -> None:
+    """
+    Add deltas to counters, "all" ones to global_shard, random shard by default
+    """
+    insert = _dialect_insert[connection.dialect.name]
+    table = OrderStatusCounter.__table__
+    if global_shard is None:
+        global_shard = random.randrange(settings.ORDER_COUNTER_SHARDS)
+    # Sorted to take row locks in the same order in concurrent transactions
+    rows = [
+        {'scope': scope, 'status': status, 'shard': global_shard if scope == GLOBAL_SCOPE else 0, 'count': delta}
+        for (scope, status), delta in sorted(deltas.items())
+    ]
+    stmt = insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.scope, table.c.status, table.c.shard],
+        set_={'count': table.c.count + stmt.excluded.count},
+    )
+    connection.execute(stmt)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Expired orders (after commit) would lose the replaced value, active history loads it before set
+for _attribute in (Order.status, Order.user_id, Order.deleted_at):
+    event.listen(_attribute, 'set', _load_old_value, active_history=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_order_statuses(session, flush_context):
+    orders = [
+        [obj for obj in objects if isinstance(obj, Order)]
+        for objects in (session.new, session.dirty, session.deleted)
+    ]
+    if not any(orders):
+        return
+    deltas = get_order_deltas(*orders)
+    if deltas:
+        upsert_deltas(session.connection(), deltas)
+
+
+def fill_counts(rows: Iterable[tuple[str, int]]) -> dict[str, int]:
+    counts = {status.value: 0 for status in OrderStatusChoices}
+    for status, count in rows:
+        counts[status] = count
+    return counts
+
+
+def get_counter_differences(db: Session) -> Counter:
+    """
+    Return (scope, status) -> order count minus stored counter, orders and counters are read
+    by one statement each, call in a snapshot shared by both
+    """
+    not_deleted = Order.deleted_at.is_(None)
+    per_user = select(Order.user_id, Order.status, func.count()).filter(
+        not_deleted, Order.user_id.is_not(None)
+    ).group_by(Order.user_id, Order.status)
+    total = select(literal(GLOBAL_SCOPE), Order.status, func.count()).filter(not_deleted).group_by(Order.status)
+    differences = Counter()
+    for query in (per_user, total):
+        for scope, status, count in db.execute(query):
+            differences[(str(scope), str(getattr(status, 'value', status)))] += count
+    stored = select(OrderStatusCounter.scope, OrderStatusCounter.status, func.sum(OrderStatusCounter.count)).group_by(
+        OrderStatusCounter.scope, OrderStatusCounter.status
+    )
+    for scope, status, count in db.execute(stored):
+        differences[(scope, status)] -= count
+    return Counter({key: difference for key, difference in differences.items() if difference})
+
+
+def reconcile_counters(db: Session) -> int:
+    """
+    Correct counters from orders without locking them, call before sync session starts a transaction
+    and commit afterward. Differences are read in a repeatable read snapshot, where orders and counters
+    committed together agree, then added as increments, which keep deltas committed meanwhile.
+    Return number of corrected counters
+    """
+    if db.bind.dialect.name == 'postgresql':
+        db.connection(execution_options={'isolation_level': 'REPEATABLE READ', 'postgresql_readonly': True})
+    differences = get_counter_differences(db)
+    db.rollback()
+    if differences:
+        upsert_deltas(db.connection(), differences, global_shard=0)
+    return len(differences)
@@ -5,7 +5,8 @@ from datetime import datetime
 
 from sqlalchemy_utils import ChoiceType
 from sqlalchemy import (
-    String, ForeignKey, Text, DECIMAL, DateTime, select, Sequence, Integer, JSON, Boolean
+    String, ForeignKey, Text, DECIMAL, DateTime, select, Sequence, Integer, JSON, Boolean, DDL, Index, event,
+    UniqueConstraint, SmallInteger
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -23,6 +24,20 @@ from app.utils.prices import Money
 
 order_code_seq = Sequence('order_order_number_seq', metadata=metadata)
 
+# Postgres only search column and indexes, see app.contrib.order.search
+ORDER_SEARCH_DDL = (
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'),
+    DDL(
+        "ALTER TABLE \"order\" ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "to_tsvector('simple', coalesce(code, '') || ' ' || coalesce(phone, '') || ' ' "
+        "|| coalesce(name, '') || ' ' || coalesce(place_full_name, ''))"
+        ") STORED"
+    ),
+    DDL('CREATE INDEX IF NOT EXISTS ix_order_search_vector ON "order" USING gin (search_vector)'),
+    DDL('CREATE INDEX IF NOT EXISTS ix_order_code_trgm ON "order" USING gin (code gin_trgm_ops)'),
+    DDL('CREATE INDEX IF NOT EXISTS ix_order_phone_trgm ON "order" USING gin (phone gin_trgm_ops)'),
+)
+
 
 def generate_order_code() -> str:
     """
@@ -36,6 +51,11 @@ def generate_order_code() -> str:
 
 
 class Order(CreationModificationDateBase, ModelWithMetadataBase, UUIDBase):
+    __table_args__ = (
+        Index('ix_order_status_created_at', 'status', 'created_at'),
+        Index('ix_order_user_id_created_at', 'user_id', 'created_at'),
+    )
+
     code: Mapped[Optional[str]] = mapped_column(
         String(255), unique=True, nullable=False, default=generate_order_code,
     )
@@ -110,22 +130,21 @@ class Order(CreationModificationDateBase, ModelWithMetadataBase, UUIDBase):
 
     user = relationship("User", lazy="noload", viewonly=True)
 
-    voucher = relationship("Voucher", lazy="noload")
-
     @hybrid_property
     def base_shipping_price(self):
         return Money(self.base_shipping_price_amount, self.currency)
 
 
+for order_search_ddl in ORDER_SEARCH_DDL:
+    event.listen(Order.__table__, 'after_create', order_search_ddl.execute_if(dialect='postgresql'))
+
+
 class OrderLine(ModelWithMetadataBase):
     shipping_method_name: Mapped[Optional[str]] = mapped_column(
         String(255), nullable=True,
     )
-    shipping_method_id: Mapped[Optional[int]] = mapped_column(
-        Integer,
-        ForeignKey('shipping_method.id', name="fx_order_ln_sh_method_id", ondelete="SET NULL"),
-        nullable=True
-    )
+    # No shipping_method table yet, plain column until shipping methods are modelled
+    shipping_method_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     order_id: Mapped[UUID] = mapped_column(
         SUUID(as_uuid=True),
         ForeignKey('order.id', ondelete='CASCADE', name='fx_order_line_order_id'),
@@ -190,8 +209,9 @@ class FulfillmentLine(Base):
         Integer, ForeignKey('order_line.id', name='fx_full_line_order_line_id', ondelete="CASCADE"),
         nullable=False
     )
-    fulfillment_id: Mapped[UUID] = mapped_column(
-        SUUID(as_uuid=True),
+    # Fulfillment has an integer primary key, a uuid column cannot reference it
+    fulfillment_id: Mapped[Optional[int]] = mapped_column(
+        Integer,
         ForeignKey('fulfillment.id', ondelete='CASCADE', name='fx_full_line_full_id'),
         nullable=True,
     )
@@ -215,8 +235,9 @@ class OrderEvent(CreationModificationDateBase):
         ForeignKey('user.id', ondelete='SET NULL', name='fx_order_event_user_id'),
         nullable=True,
     )
-    event_type: Mapped[OrderEventChoices] = ChoiceType(
-        choices=OrderEventChoices, impl=String(255),
+    event_type: Mapped[OrderEventChoices] = mapped_column(
+        ChoiceType(choices=OrderEventChoices, impl=String(255)),
+        nullable=False,
     )
     parameters: Mapped[dict] = mapped_column(JSON, default={}, nullable=False)
 
@@ -272,3 +293,18 @@ class OrderNote(CreationModificationDateBase):
         ForeignKey('user.id', ondelete='SET NULL', name='fx_order_note_user_id'),
         nullable=True,
     )
+
+
+class OrderStatusCounter(Base):
+    """
+    Number of not deleted orders per status, maintained in the flush that changes orders
+    (see app.contrib.order.counters). Scope is user id or "all", count of a scope and status
+    is the sum over its shards, "all" is spread over ORDER_COUNTER_SHARDS rows
+    """
+    __table_args__ = (
+        UniqueConstraint('scope', 'status', 'shard', name='uq_order_status_counter_scope_status_shard'),
+    )
+    scope: Mapped[str] = mapped_column(String(36), nullable=False)
+    status: Mapped[str] = mapped_column(String(32), nullable=False)
+    shard: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, server_default='0')
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,16 +1,81 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Sequence
 
-from app.db.repository import CRUDBase
+from sqlalchemy import select, func
+
+from app.db.repository import CRUDBase, CRUDBaseSync
 
 from .models import (
-    Order, OrderLine,
+    Order, OrderLine, OrderStatusCounter,
 )
+from .search import get_search_criteria
+from .counters import GLOBAL_SCOPE, fill_counts
 
-class CRUDOrder(CRUDBase[Order]):
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class CRUDOrderSync(CRUDBaseSync[Order]):
     pass
 
+
+class CRUDOrder(CRUDBase[Order]):
+    async def search(
+            self,
+            async_db: "AsyncSession",
+            query: str,
+            *,
+            offset: int = 0,
+            limit: Optional[int] = None,
+            q: Optional[dict] = None,
+            order_by: Optional[Sequence[str]] = None,
+            options: Optional[Sequence] = None,
+            expressions: Optional[Sequence] = None,
+    ) -> Sequence[Order]:
+        """
+        Full text and substring search ordered by rank, then by order_by
+        :param async_db:
+        :param query: user input, words are matched as prefixes
+        :return:
+        """
+        criteria = get_search_criteria(query)
+        if criteria is None:
+            return []
+        condition, rank = criteria
+        stmt = select(self.model).filter(condition).order_by(rank.desc())
+        return await self.get_all(
+            async_db, stmt=stmt, offset=offset, limit=limit, q=q,
+            order_by=order_by, options=options, expressions=expressions,
+        )
+
+    async def count_search(
+            self,
+            async_db: "AsyncSession",
+            query: str,
+            params: Optional[dict] = None,
+            expressions: Optional[Sequence] = None,
+    ) -> int:
+        criteria = get_search_criteria(query)
+        if criteria is None:
+            return 0
+        return await self.count(async_db, params=params, expressions=(*(expressions or ()), criteria[0]))
+
+
 class CrudOrderLine(CRUDBase[OrderLine]):
     pass
 
 
+class CRUDOrderStatusCounter(CRUDBase[OrderStatusCounter]):
+    async def get_counts(self, async_db: "AsyncSession", scope: Optional[str] = GLOBAL_SCOPE) -> dict[str, int]:
+        """
+        Return order count of every status for scope, user id or "all"
+        """
+        stmt = select(self.model.status, func.sum(self.model.count)).filter(
+            self.model.scope == scope
+        ).group_by(self.model.status)
+        result = await self._execute(async_db, stmt, 'get_counts')
+        return fill_counts(result.all())
+
+
+order_repo_sync = CRUDOrderSync(Order)
 order_repo = CRUDOrder(Order)
+order_status_counter_repo = CRUDOrderStatusCounter(OrderStatusCounter)
@@ -0,0 +1,63 @@
+"""
+Order search over code, phone, customer name and place.
+
+``order.search_vector`` is a stored generated tsvector ('simple' config, names
+are in several languages) with a GIN index, code and phone have trigram GIN
+indexes for substring lookups. They are postgres only, so they are created by
+``ORDER_SEARCH_DDL`` (see models) after ``order`` table creation and by the
+alembic migration for existing databases instead of being mapped on the model.
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import func, or_, literal_column, ColumnElement
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from .models import Order
+
+__all__ = ('search_vector', 'build_prefix_tsquery', 'get_search_criteria', 'ilike_contains')
+
+SEARCH_CONFIG = 'simple'
+MIN_SUBSTRING_LENGTH = 3
+
+search_vector = literal_column('"order".search_vector', type_=TSVECTOR)
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+
+def build_prefix_tsquery(query: str) -> Optional[str]:
+    """
+    Convert user input to tsquery matching every word as prefix: "ashg mag" -> "ashg:* & mag:*".
+    Only word characters are kept, so tsquery operators from input never reach to_tsquery
+    """
+    tokens = _token_re.findall(query.lower())
+    if not tokens:
+        return None
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def ilike_contains(column, value: str) -> ColumnElement:
+    """
+    ``column ILIKE '%value%'`` with wildcards of value escaped. Pattern is a single bound
+    literal (not concatenation like ``icontains``), so trigram index can serve it
+    """
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return column.ilike(f'%{escaped}%', escape='\\')
+
+
+def get_search_criteria(query: str) -> Optional[tuple[ColumnElement, ColumnElement]]:
+    """
+    Return (where clause, rank) for query, None when query has nothing to search
+    """
+    tsquery_text = build_prefix_tsquery(query)
+    if tsquery_text is None:
+        return None
+    tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+    conditions = [search_vector.op('@@')(tsquery)]
+    query = query.strip()
+    if len(query) >= MIN_SUBSTRING_LENGTH:
+        conditions.append(ilike_contains(Order.code, query))
+    digits = re.sub(r'\D', '', query)
+    if len(digits) >= MIN_SUBSTRING_LENGTH:
+        conditions.append(Order.phone.like(f'%{digits}%'))
+    return or_(*conditions), func.ts_rank(search_vector, tsquery)
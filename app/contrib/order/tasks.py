@@ -0,0 +1,48 @@
+from uuid import UUID
+
+from sqlalchemy import select
+
+from app.core.celery_app import celery_app
+from app.db.session import SessionLocal
+from app.contrib.notification.models import Notification
+from app.contrib.config.models import Config
+
+from .models import Order
+from .counters import reconcile_counters
+from .batch_calculations import reprice_orders_shipping, get_shipping_prices
+
+
+@celery_app.task(
+    acks_late=True,
+    max_retries=3, countdown=10, retry_backoff=True, retry_backoff_max=120,
+    retry=True,
+)
+def notify_order_placed_task(order_id: str) -> None:
+    with SessionLocal() as db:
+        order = db.get(Order, UUID(order_id))
+        if order is None:
+            return
+        db.add(Notification(
+            title=f"New order {order.code}",
+            body=f"{order.name}, {order.phone}, {order.place_full_name or ''} {order.street_address or ''}".strip(),
+            only_staff=True,
+        ))
+        db.commit()
+
+
+# Bulk jobs scan whole tables, the global CELERY_TASK_TIME_LIMIT is for request driven tasks
+@celery_app.task(acks_late=True, soft_time_limit=60 * 60, time_limit=60 * 61)
+def reconcile_order_status_counters_task() -> int:
+    with SessionLocal() as db:
+        rows = reconcile_counters(db)
+        db.commit()
+    return rows
+
+
+@celery_app.task(acks_late=True, soft_time_limit=60 * 30, time_limit=60 * 31)
+def reprice_orders_shipping_task() -> int:
+    with SessionLocal() as db:
+        config = db.execute(select(Config)).scalars().first()
+        if config is None:
+            return 0
+        return reprice_orders_shipping(db, get_shipping_prices(config))
@@ -1 +1,40 @@
+from collections import deque
+
+from sqlalchemy import select, func
+
+from app.conf.config import settings
 from app.contrib.notification import repository
+
+from .models import order_code_seq
+
+ORDER_CODE_FORMAT = 'ORD-{:06}'
+
+
+def format_order_code(number: int) -> str:
+    return ORDER_CODE_FORMAT.format(number)
+
+
+class OrderCodeAllocator:
+    """
+    Hand out order codes from blocks of ``order_order_number_seq`` values,
+    one round trip per block instead of a sync session per order.
+    Numbers come from the sequence, so workers never collide, codes are unique but not ordered in time
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._numbers: deque[int] = deque()
+
+    async def fetch_block(self, async_db) -> list[int]:
+        stmt = select(order_code_seq.next_value()).select_from(func.generate_series(1, self.block_size))
+        result = await async_db.execute(stmt)
+        return list(result.scalars())
+
+    async def next(self, async_db) -> str:
+        if not self._numbers:
+            # Concurrent callers may fetch a block each, numbers are only wasted, never repeated
+            self._numbers.extend(await self.fetch_block(async_db))
+        return format_order_code(self._numbers.popleft())
+
+
+order_code_allocator = OrderCodeAllocator(block_size=settings.ORDER_CODE_BLOCK_SIZE)
@@ -66,6 +66,8 @@ class TransactionKindChoices(TextChoices):
     REFUND_REVERSED = "REFUND_REVERSED"
     CONFIRM = "CONFIRM", _('Confirm')
     CANCEL = "CANCEL", _('Cancel')
+    # Operation started by the payment engine, waiting for the gateway response
+    IN_PROGRESS = "IN_PROGRESS", _("In progress")
     # FIXME we could use another status like WAITING_FOR_AUTH for transactions
     # Which were authorized, but needs to be confirmed manually by staff
     # eg. Braintree with "submit_for_settlement" enabled
@@ -94,5 +96,16 @@ class ChargeStatusChoices(TextChoices):
     CANCELLED = "CANCELLED", _('Cancelled')
 
 
+class PaymentOperationChoices(TextChoices):
+    """Represents operations of the payment engine, see engine.TRANSITIONS."""
+
+    AUTHORIZE = "AUTHORIZE", _("Authorize")
+    PROCESS = "PROCESS", _("Process")
+    CONFIRM = "CONFIRM", _("Confirm")
+    CAPTURE = "CAPTURE", _("Capture")
+    REFUND = "REFUND", _("Refund")
+    VOID = "VOID", _("Void")
+
+
 class CustomPaymentChoices(Enum):
     MANUAL = "MANUAL"
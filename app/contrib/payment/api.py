@@ -3,6 +3,7 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
 from fastapi.exceptions import RequestValidationError
+from loguru import logger
 
 from pydantic import condecimal
 from pydantic_core import ErrorDetails
@@ -11,12 +12,15 @@ from sqlalchemy.orm import joinedload, selectinload
 from app.contrib.account.models import User
 from app.core.schema import IResponseBase, IPaginationDataBase, CommonsModel
 from app.routers.dependency import get_async_db, get_staff_user, get_commons, get_current_user, get_active_user
+from app.contrib.wallet import WalletEntryTypeChoices
+from app.contrib.wallet.exceptions import WalletError
+from app.contrib.wallet.ledger import apply_entry
 from app.contrib.wallet.repository import wallet_repo
 from app.contrib.account.repository import user_repo
 from app.contrib.file.repository import file_repo
 from app.utils.file import delete_file
 
-from .exceptions import PaymentError
+from .exceptions import PaymentError, PaymentFollowUpError
 from .schema import (
     PaymentVisible,
     TransactionVisible, PaymentDeposit,
@@ -119,11 +123,7 @@ async def payment_deposit_manual(
         user=Depends(get_staff_user),
         async_db=Depends(get_async_db),
 ):
-    options = [joinedload(user_repo.model.wallet)]
-    customer_user = await user_repo.first(
-        async_db, params={"id": receiver_user_id},
-        options=options,
-    )
+    customer_user = await user_repo.first(async_db, params={"id": receiver_user_id})
     file_path = None
     if not customer_user:
         raise RequestValidationError(
@@ -143,13 +143,9 @@ async def payment_deposit_manual(
                 input=receiver_user_id
             )]
         )
-    wallet = customer_user.wallet
-    if not wallet:
-        wallet = await wallet_repo.get_or_create(
-            async_db,
-            user_id=receiver_user_id,
-        )
+    # Payment, transaction, ledger entry, balance and attachment commit together
     try:
+        wallet = await wallet_repo.get_or_create(async_db, user_id=receiver_user_id)
         payment, trn = await create_manual_payment_deposit(
             async_db,
             user_id=receiver_user_id,
@@ -160,14 +156,13 @@ async def payment_deposit_manual(
             commit=False,
             flush=True,
         )
-
-        await wallet_repo.update(
+        await apply_entry(
             async_db,
-            db_obj=wallet,
-            obj_in={
-                "amount": wallet.amount + amount,
-            },
-            commit=True,
+            wallet_id=wallet.id,
+            amount=amount,
+            entry_type=WalletEntryTypeChoices.deposit,
+            payment_id=payment.id,
+            transaction_id=trn.id,
         )
         if upload_file:
             attachment_file = await file_repo.create_with_file(
@@ -184,10 +179,11 @@ async def payment_deposit_manual(
                     "payment_id": payment.id,
                     "file_id": attachment_file.id
                 },
-                commit=True,
+                commit=False,
             )
+        await async_db.commit()
     except Exception as e:
-        print(e)
+        logger.exception(e)
         await async_db.rollback()
         if file_path:
             delete_file(file_path)
@@ -260,7 +256,7 @@ async def retrieve_single_payment(
     return db_obj
 
 
-@api.get(
+@api.post(
     '/{obj_id}/refund/', name='payment-refund', response_model=IResponseBase[PaymentVisible],
     dependencies=[Depends(get_staff_user)]
 )
@@ -269,24 +265,28 @@ async def refund_payment(
         async_db=Depends(get_async_db),
 ):
     db_obj = await payment_repo.get(async_db, obj_id=obj_id)
+    # Refused before the gateway is called, apply_refund_entry still guards a balance spent meanwhile
     wallet = await wallet_repo.get(async_db, obj_id=db_obj.wallet_id)
-    captured_amount = db_obj.captured_amount
-    try:
+    if wallet.amount < db_obj.captured_amount:
+        raise HTTPException(status_code=400, detail="Insufficient funds")
 
-        _, payment, txn = await refund(
-            async_db=async_db, payment=db_obj, amount=db_obj.total_amount, commit=False
-        )
-        await wallet_repo.update(
+    async def apply_refund_entry(async_db, payment, txn):
+        await apply_entry(
             async_db,
-            db_obj=wallet,
-            obj_in={
-                "amount": wallet.amount - captured_amount,
-            },
-            commit=True,
+            wallet_id=payment.wallet_id,
+            amount=-txn.amount,
+            entry_type=WalletEntryTypeChoices.refund,
+            payment_id=payment.id,
+            transaction_id=txn.id,
         )
-    except PaymentError as e:
-        await async_db.rollback()
 
+    try:
+        _, payment, txn = await refund(
+            async_db=async_db, payment=db_obj, amount=db_obj.captured_amount, on_success=apply_refund_entry,
+        )
+    except PaymentFollowUpError as e:
+        raise HTTPException(status_code=409, detail=f"Payment refunded, wallet entry failed: {e.message}")
+    except (PaymentError, WalletError) as e:
         raise HTTPException(status_code=400, detail=e.message)
     return {
         "message": "Payment refunded",
@@ -0,0 +1,365 @@
+"""
+Payment processing engine.
+
+Every operation (authorize, capture, refund, ...) runs in three steps so the
+payment row is never locked while a gateway is called:
+
+1. ``begin_operation`` locks the payment with SELECT ... FOR UPDATE SKIP
+   LOCKED, checks the operation against ``TRANSITIONS`` and that nothing else
+   is in flight, stores an ``IN_PROGRESS`` transaction as the intent and
+   commits.
+2. The gateway plugin is called without any lock or open write.
+3. ``finish_operation`` locks the payment again, stores the gateway
+   transaction, writes charge status, captured amount and the other payment
+   fields with one UPDATE, closes the intent and commits.
+4. ``on_success`` (e.g. the wallet entry of a refund) of a gateway payment
+   runs in its own transaction. The gateway already moved the money, so its
+   failure never rolls the stored result back, it raises
+   ``PaymentFollowUpError`` carrying the stored payment and transaction
+   instead. Manual payments call no gateway, their ``on_success`` runs inside
+   the ``finish_operation`` transaction and its failure aborts the operation.
+
+A payment locked by another transaction is skipped instead of waited for and
+a payment with an open intent is refused, both raise ``PaymentBusyError`` so
+the caller can retry, a missing payment raises ``DocumentRawNotFound``.
+Operations on different payments never wait on each other. An intent of a
+crashed worker blocks the payment until ``reconciliation.reconcile_payments``
+aborts it once older than ``PAYMENT_INTENT_STALE_SECONDS``.
+"""
+from decimal import Decimal
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, Tuple
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import update
+
+from app.core.exceptions import DocumentRawNotFound
+from app.contrib.plugins.manager import get_plugins_manager
+from app.utils.translation import gettext as _
+
+from . import ChargeStatusChoices, PaymentOperationChoices, TransactionKindChoices
+from .exceptions import PaymentError, PaymentBusyError, PaymentFollowUpError, GatewayError
+from .interface import GatewayResponse
+from .models import Payment, Transaction
+from .repository import payment_repo, transaction_repo
+from .utils import (
+    create_payment_information,
+    get_already_processed_transaction_or_create_new_transaction,
+    get_charge_status_changes,
+    get_payment_method_changes,
+    validate_gateway_response,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from app.contrib.plugins.manager import PluginsManager
+
+    from .interface import PaymentData
+
+OnSuccess = Callable[["AsyncSession", Payment, Transaction], Awaitable[None]]
+
+# Charge statuses every operation may start from
+TRANSITIONS = {
+    PaymentOperationChoices.AUTHORIZE: (ChargeStatusChoices.NOT_CHARGED,),
+    PaymentOperationChoices.PROCESS: (ChargeStatusChoices.NOT_CHARGED,),
+    PaymentOperationChoices.CONFIRM: (ChargeStatusChoices.NOT_CHARGED,),
+    PaymentOperationChoices.CAPTURE: (ChargeStatusChoices.NOT_CHARGED,),
+    PaymentOperationChoices.VOID: (ChargeStatusChoices.NOT_CHARGED,),
+    PaymentOperationChoices.REFUND: (
+        ChargeStatusChoices.PARTIALLY_CHARGED,
+        ChargeStatusChoices.FULLY_CHARGED,
+        ChargeStatusChoices.PARTIALLY_REFUNDED,
+    ),
+}
+REQUIRE_ACTIVE = (
+    PaymentOperationChoices.AUTHORIZE,
+    PaymentOperationChoices.PROCESS,
+    PaymentOperationChoices.CONFIRM,
+    PaymentOperationChoices.CAPTURE,
+)
+GATEWAY_METHODS = {
+    PaymentOperationChoices.AUTHORIZE: 'authorize_payment',
+    PaymentOperationChoices.PROCESS: 'process_payment',
+    PaymentOperationChoices.CONFIRM: 'confirm_payment',
+    PaymentOperationChoices.CAPTURE: 'capture_payment',
+    PaymentOperationChoices.REFUND: 'refund_payment',
+    PaymentOperationChoices.VOID: 'void_payment',
+}
+# Kind of transaction stored when gateway gives no valid response
+RESULT_KINDS = {
+    PaymentOperationChoices.AUTHORIZE: TransactionKindChoices.AUTH,
+    PaymentOperationChoices.PROCESS: TransactionKindChoices.CAPTURE,
+    PaymentOperationChoices.CONFIRM: TransactionKindChoices.CONFIRM,
+    PaymentOperationChoices.CAPTURE: TransactionKindChoices.CAPTURE,
+    PaymentOperationChoices.REFUND: TransactionKindChoices.REFUND,
+    PaymentOperationChoices.VOID: TransactionKindChoices.VOID,
+}
+
+
+def clean_operation(payment: Payment, operation: PaymentOperationChoices, amount: Decimal) -> None:
+    if operation in REQUIRE_ACTIVE and not payment.is_active:
+        raise PaymentError(_("This payment is no longer active."))
+    if payment.is_manual() and operation != PaymentOperationChoices.REFUND:
+        raise PaymentError(_("Manual payment can only be refunded."))
+    if payment.charge_status not in TRANSITIONS[operation]:
+        raise PaymentError(
+            _("Payment in %(status)s status cannot be %(operation)s.") % {
+                'status': payment.charge_status.value, 'operation': operation.value.lower(),
+            }
+        )
+    if operation == PaymentOperationChoices.CAPTURE:
+        if amount <= 0:
+            raise PaymentError(_("Amount should be a positive number."))
+        if amount > payment.get_charge_amount():
+            raise PaymentError(_("Unable to charge more than un-captured amount."))
+    elif operation == PaymentOperationChoices.REFUND:
+        if amount <= 0:
+            raise PaymentError(_("Amount should be a positive number."))
+        if amount > payment.captured_amount:
+            raise PaymentError(_("Cannot refund more than captured."))
+
+
+def get_operation_amount(payment: Payment, operation: PaymentOperationChoices) -> Decimal:
+    if operation == PaymentOperationChoices.CAPTURE:
+        return payment.get_charge_amount()
+    if operation == PaymentOperationChoices.REFUND:
+        return payment.captured_amount
+    return payment.total_amount
+
+
+async def get_operation_token(
+        async_db: "AsyncSession", payment: Payment, operation: PaymentOperationChoices
+) -> Optional[str]:
+    """
+    Token of the transaction the operation continues, None for operations starting with client token
+    """
+    if operation == PaymentOperationChoices.CONFIRM:
+        txn = await transaction_repo.first(
+            async_db,
+            order_by=[Transaction.id.desc()],
+            params={"payment_id": payment.id, "kind": TransactionKindChoices.ACTION_TO_CONFIRM, "is_success": True},
+        )
+        return txn.token if txn else ""
+    if operation in (PaymentOperationChoices.CAPTURE, PaymentOperationChoices.VOID):
+        kind = TransactionKindChoices.AUTH
+    elif operation == PaymentOperationChoices.REFUND:
+        kind = TransactionKindChoices.EXTERNAL if payment.is_manual() else TransactionKindChoices.CAPTURE
+    else:
+        return None
+    txn = await transaction_repo.first(
+        async_db,
+        order_by=[Transaction.id.asc()],
+        params={"payment_id": payment.id, "kind": kind, "is_success": True},
+    )
+    if txn is None:
+        raise PaymentError(_("Cannot find successful %(kind)s transaction.") % {'kind': kind.value})
+    return txn.token
+
+
+async def fetch_gateway_response(fn, **kwargs) -> Tuple[Optional[GatewayResponse], Optional[str]]:
+    response, error = None, None
+    try:
+        response = await fn(**kwargs)
+        validate_gateway_response(response)
+    except GatewayError:
+        logger.exception("Gateway response validation failed!")
+        response = None
+        error = 'Gateway response validation failed!'
+    except PaymentError:
+        logger.exception('Error encountered while executing payment gateway.')
+        error = 'Error encountered while executing payment gateway.'
+        response = None
+    return response, error
+
+
+async def begin_operation(
+        async_db: "AsyncSession",
+        payment_id: UUID,
+        operation: PaymentOperationChoices,
+        amount: Optional[Decimal] = None,
+) -> Tuple[Payment, Transaction, Optional[str]]:
+    """
+    Validate operation and store its intent, commits
+    :return: locked and refreshed payment, intent transaction, token of the continued transaction
+    """
+    try:
+        payment = await payment_repo.get(async_db, obj_id=payment_id, with_for_update=True, skip_locked=True)
+    except DocumentRawNotFound:
+        # Skipped rows look missing, only an existing one is busy
+        found = await payment_repo.exists(async_db, params={'id': payment_id})
+        await async_db.rollback()
+        if not found:
+            raise
+        raise PaymentBusyError(_("Payment is being processed, try again later."), code='busy')
+    try:
+        if amount is None:
+            amount = get_operation_amount(payment, operation)
+        clean_operation(payment, operation, amount)
+        if await transaction_repo.exists(async_db, params={
+            "payment_id": payment.id, "kind": TransactionKindChoices.IN_PROGRESS, "is_already_processed": False,
+        }):
+            raise PaymentBusyError(_("Payment is being processed, try again later."), code='busy')
+        token = await get_operation_token(async_db, payment, operation)
+        intent = await transaction_repo.create(async_db, obj_in={
+            'payment_id': payment.id,
+            'kind': TransactionKindChoices.IN_PROGRESS,
+            'token': token or '',
+            'amount': amount,
+            'currency': payment.currency,
+            'gateway_response': {'operation': operation.value},
+        }, commit=False, flush=True)
+    except BaseException:
+        await async_db.rollback()
+        raise
+    await async_db.commit()
+    return payment, intent, token
+
+
+async def finish_operation(
+        async_db: "AsyncSession",
+        payment: Payment,
+        intent: Transaction,
+        operation: PaymentOperationChoices,
+        payment_data: "PaymentData",
+        response: Optional[GatewayResponse],
+        error: Optional[str],
+        on_success: Optional[OnSuccess] = None,
+) -> Tuple[Payment, Transaction]:
+    """
+    Store gateway result and apply it to payment with one write, commits
+    :param on_success: run before the commit when the transaction succeeded
+    """
+    payment = await payment_repo.get(async_db, obj_id=payment.id, with_for_update=True)
+    txn = await get_already_processed_transaction_or_create_new_transaction(
+        async_db=async_db,
+        payment=payment,
+        kind=RESULT_KINDS[operation],
+        payment_information=payment_data,
+        action_required=response is not None and response.action_required,
+        error_msg=error,
+        gateway_response=response,
+        commit=False, flush=True,
+    )
+
+    changes = {}
+    processed = [intent.id]
+    if response is not None:
+        if response.psp_reference:
+            changes['psp_reference'] = response.psp_reference
+        changes |= get_payment_method_changes(response.payment_method_info)
+    if txn.is_success and not txn.is_already_processed:
+        # to_confirm follows the last transaction, see utils.gateway_postprocess
+        if txn.is_action_required:
+            changes['to_confirm'] = True
+        else:
+            changes['to_confirm'] = False
+            changes |= get_charge_status_changes(payment, txn)
+            processed.append(txn.id)
+    if changes:
+        await async_db.execute(update(Payment).where(Payment.id == payment.id).values(**changes))
+    await async_db.execute(
+        update(Transaction).where(Transaction.id.in_(processed)).values(is_already_processed=True)
+    )
+    if txn.is_success and on_success is not None:
+        await on_success(async_db, payment, txn)
+    await async_db.commit()
+    return payment, txn
+
+
+async def follow_up_operation(
+        async_db: "AsyncSession",
+        payment: Payment,
+        txn: Transaction,
+        operation: PaymentOperationChoices,
+        on_success: OnSuccess,
+) -> None:
+    """
+    Run on_success of a stored successful transaction, commits
+    """
+    try:
+        await on_success(async_db, payment, txn)
+        await async_db.commit()
+    except BaseException as e:
+        await async_db.rollback()
+        logger.error(f"Payment {payment.id} {operation.value} stored as transaction {txn.id}, follow-up failed: {e!r}")
+        message = getattr(e, 'message', None) or str(e) or type(e).__name__
+        raise PaymentFollowUpError(message, payment, txn, code='follow_up') from e
+
+
+async def abort_operation(async_db: "AsyncSession", intent_id: int, error: str) -> None:
+    await async_db.execute(
+        update(Transaction).where(Transaction.id == intent_id).values(is_already_processed=True, error=error[:255])
+    )
+    await async_db.commit()
+
+
+async def run_operation(
+        async_db: "AsyncSession",
+        payment: Payment,
+        operation: PaymentOperationChoices,
+        manager: Optional["PluginsManager"] = None,
+        amount: Optional[Decimal] = None,
+        token: Optional[str] = None,
+        customer_id: Optional[str] = None,
+        additional_data: Optional[dict] = None,
+        on_success: Optional[OnSuccess] = None,
+) -> Tuple[Payment, Transaction]:
+    """
+    Run payment operation, the session must have no pending changes, it is committed
+    :param async_db:
+    :param payment:
+    :param operation:
+    :param manager: default get_plugins_manager(), not used by manual payments
+    :param amount: default is the whole amount the operation allows
+    :param token: client token of authorize and process
+    :param customer_id:
+    :param additional_data:
+    :param on_success: e.g. wallet ledger entry, written after the gateway result is committed,
+        in the same transaction for manual payments
+    :return: payment and transaction stored from gateway response, check transaction.is_success
+    """
+    payment_id = payment.id
+    is_manual = payment.is_manual()
+    if not is_manual:
+        manager = manager or get_plugins_manager()
+        # Plugin configs are read now, so the gateway call below runs outside of any database transaction
+        await manager.get_plugins(async_db)
+    payment, intent, past_token = await begin_operation(async_db, payment_id, operation, amount)
+    intent_id = intent.id
+    try:
+        payment_data = create_payment_information(
+            payment=payment,
+            payment_token=token if token is not None else past_token,
+            amount=intent.amount,
+            customer_id=customer_id,
+            additional_data=additional_data,
+        )
+        if is_manual:
+            # Nothing to call, manual payment is only marked as refunded
+            response, error = GatewayResponse(
+                is_success=True,
+                action_required=False,
+                kind=TransactionKindChoices.REFUND,
+                amount=payment_data.amount,
+                currency=payment_data.currency,
+                transaction_id=payment_data.token or "",
+                raw_response={},
+            ), None
+        else:
+            response, error = await fetch_gateway_response(
+                getattr(manager, GATEWAY_METHODS[operation]),
+                gateway=payment.gateway, payment_information=payment_data, async_db=async_db,
+            )
+        payment, txn = await finish_operation(
+            async_db, payment, intent, operation, payment_data, response, error,
+            on_success=on_success if is_manual else None,
+        )
+    except BaseException as e:
+        # Rollback expires loaded objects, only ids are used from here
+        await async_db.rollback()
+        logger.error(f"Payment {payment_id} {operation.value} aborted: {e!r}")
+        await abort_operation(async_db, intent_id, str(e) or type(e).__name__)
+        raise
+    if txn.is_success and on_success is not None and not is_manual:
+        await follow_up_operation(async_db, payment, txn, operation, on_success)
+    return payment, txn
@@ -8,5 +8,18 @@ class PaymentError(Exception):
         return self.message
 
 
+class PaymentBusyError(PaymentError):
+    """Another operation on the payment is in progress."""
+
+
+class PaymentFollowUpError(PaymentError):
+    """Gateway result is stored, the step run after it (e.g. wallet entry) failed."""
+
+    def __init__(self, message, payment, transaction, code=None):
+        super().__init__(message, code)
+        self.payment = payment
+        self.transaction = transaction
+
+
 class GatewayError(IOError):
     pass
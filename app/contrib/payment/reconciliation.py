@@ -0,0 +1,189 @@
+"""
+Payment reconciliation.
+
+``captured_amount`` and ``charge_status`` are updated by the payment engine
+one payment at a time, ``reconcile_payments`` rebuilds both from successful
+``Transaction`` rows for all payments in the background: payments are read
+in keyset batches by id, every batch costs one aggregate query over its
+transactions and one executemany UPDATE of the drifted payments, and is
+committed on its own so no lock is held for the whole scan. Payments with an
+operation in flight or locked by one are skipped. An intent (see ``engine``)
+older than ``PAYMENT_INTENT_STALE_SECONDS`` belongs to a crashed worker, it is
+aborted before the scan so its payment is reconciled and accepts operations
+again. Its gateway call may still have moved money, aborted intents are logged
+for a check with the gateway.
+"""
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional, Sequence, TYPE_CHECKING
+
+from loguru import logger
+from sqlalchemy import select, update, func, case, exists
+
+from app.conf.config import settings
+
+from . import ChargeStatusChoices, TransactionKindChoices
+from .models import Payment, Transaction
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+# Successful transactions adding to or taking from captured amount
+CREDIT_KINDS = (
+    TransactionKindChoices.EXTERNAL, TransactionKindChoices.CAPTURE, TransactionKindChoices.REFUND_REVERSED,
+)
+DEBIT_KINDS = (TransactionKindChoices.REFUND, TransactionKindChoices.CAPTURE_FAILED)
+# Statuses of payments with nothing captured that transactions can not tell apart
+UNCHARGED_STATUSES = (
+    ChargeStatusChoices.NOT_CHARGED, ChargeStatusChoices.PENDING,
+    ChargeStatusChoices.REFUSED, ChargeStatusChoices.CANCELLED,
+)
+
+
+@dataclass
+class ReconciliationReport:
+    scanned: int = 0
+    fixed: int = 0
+    without_transactions: int = 0
+    stale_intents: int = 0
+    drifted: list[dict] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def get_reconciled_status(
+        status: ChargeStatusChoices, total: Decimal, captured: Decimal, refunded: bool,
+) -> ChargeStatusChoices:
+    """
+    Charge status matching captured amount, same rules as utils.get_charge_status_changes
+    """
+    if refunded:
+        return ChargeStatusChoices.FULLY_REFUNDED if captured <= 0 else ChargeStatusChoices.PARTIALLY_REFUNDED
+    if captured <= 0:
+        return status if status in UNCHARGED_STATUSES else ChargeStatusChoices.NOT_CHARGED
+    if captured >= total:
+        return ChargeStatusChoices.FULLY_CHARGED
+    return ChargeStatusChoices.PARTIALLY_CHARGED
+
+
+def reconcile_batch(db: "Session", rows: Sequence, report: ReconciliationReport) -> list[dict]:
+    """
+    Compare batch of payments with their transactions, return update params of drifted ones
+    :param db:
+    :param rows: (id, total_amount, captured_amount, charge_status)
+    :param report: updated in place
+    :return:
+    """
+    totals = {
+        payment_id: (captured, refunds)
+        for payment_id, captured, refunds in db.execute(
+            select(
+                Transaction.payment_id,
+                func.sum(case(
+                    (Transaction.kind.in_(CREDIT_KINDS), Transaction.amount),
+                    (Transaction.kind.in_(DEBIT_KINDS), -Transaction.amount),
+                    else_=0,
+                )),
+                func.sum(case((Transaction.kind == TransactionKindChoices.REFUND, 1), else_=0)),
+            )
+            .filter(Transaction.payment_id.in_([row.id for row in rows]), Transaction.is_success.is_(True))
+            .group_by(Transaction.payment_id)
+        )
+    }
+    params = []
+    for row in rows:
+        if row.id not in totals:
+            # Nothing to rebuild from
+            report.without_transactions += 1
+            continue
+        captured, refunds = totals[row.id]
+        captured = max(Decimal(captured or 0), Decimal(0))
+        status = get_reconciled_status(row.charge_status, row.total_amount, captured, bool(refunds))
+        if captured == row.captured_amount and status == row.charge_status:
+            continue
+        params.append({'id': row.id, 'captured_amount': captured, 'charge_status': status})
+        report.drifted.append({
+            'id': str(row.id),
+            'captured_amount': [str(row.captured_amount), str(captured)],
+            'charge_status': [row.charge_status.value, status.value],
+        })
+    return params
+
+
+def abort_stale_intents(db: "Session", report: ReconciliationReport) -> None:
+    """
+    Close unfinished intents older than PAYMENT_INTENT_STALE_SECONDS, commits
+    :param db:
+    :param report: updated in place
+    :return:
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.PAYMENT_INTENT_STALE_SECONDS)
+    rows = db.execute(
+        update(Transaction)
+        .where(
+            Transaction.kind == TransactionKindChoices.IN_PROGRESS,
+            Transaction.is_already_processed.is_(False),
+            Transaction.created_at < stale_before,
+        )
+        .values(is_already_processed=True, error='Stale intent aborted by reconciliation')
+        .returning(Transaction.id, Transaction.payment_id, Transaction.gateway_response)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    report.stale_intents = len(rows)
+    for row in rows:
+        logger.warning(
+            f"Payment {row.payment_id} {row.gateway_response.get('operation')} intent {row.id} was stale, "
+            f"aborted, check the gateway for its result"
+        )
+
+
+def reconcile_payments(db: "Session", batch_size: Optional[int] = None) -> ReconciliationReport:
+    """
+    Rebuild captured amount and charge status of all payments, commits every batch
+    :param db: sqlalchemy.orm.Session
+    :param batch_size: default EXPORT_YIELD_PER
+    :return:
+    """
+    batch_size = batch_size or settings.EXPORT_YIELD_PER
+    report = ReconciliationReport()
+    abort_stale_intents(db, report)
+    in_flight = exists().where(
+        Transaction.payment_id == Payment.id,
+        Transaction.kind == TransactionKindChoices.IN_PROGRESS,
+        Transaction.is_already_processed.is_(False),
+    )
+    stmt = (
+        select(Payment.id, Payment.total_amount, Payment.captured_amount, Payment.charge_status)
+        .filter(~in_flight)
+        .order_by(Payment.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    last_id = None
+    while True:
+        batch_stmt = stmt if last_id is None else stmt.filter(Payment.id > last_id)
+        rows = db.execute(batch_stmt).all()
+        if not rows:
+            db.rollback()
+            break
+        report.scanned += len(rows)
+        params = reconcile_batch(db, rows, report)
+        if params:
+            db.execute(update(Payment), params)
+            report.fixed += len(params)
+        db.commit()
+        last_id = rows[-1].id
+
+    for drift in report.drifted:
+        logger.warning(
+            f"Payment {drift['id']} drifted, captured {drift['captured_amount'][0]} -> {drift['captured_amount'][1]}, "
+            f"status {drift['charge_status'][0]} -> {drift['charge_status'][1]}"
+        )
+    logger.info(
+        f"Payment reconciliation scanned {report.scanned}, fixed {report.fixed}, "
+        f"without transactions {report.without_transactions}, aborted stale intents {report.stale_intents}"
+    )
+    return report
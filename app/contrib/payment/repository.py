@@ -1,8 +1,16 @@
-from app.db.repository import CRUDBase
+from app.db.repository import CRUDBase, CRUDBaseSync
 
 from .models import Payment, Transaction, PaymentAttachment
 
 
+class CRUDPaymentSync(CRUDBaseSync[Payment]):
+    pass
+
+
+class CRUDTransactionSync(CRUDBaseSync[Transaction]):
+    pass
+
+
 class CRUDPayment(CRUDBase[Payment]):
     pass
 
@@ -15,6 +23,8 @@ class CRUDPaymentAttachment(CRUDBase[PaymentAttachment]):
     pass
 
 
+payment_repo_sync = CRUDPaymentSync(Payment)
+transaction_repo_sync = CRUDTransactionSync(Transaction)
 payment_repo = CRUDPayment(Payment)
 transaction_repo = CRUDTransaction(Transaction)
 payment_attachment_repo = CRUDPaymentAttachment(PaymentAttachment)
@@ -0,0 +1,11 @@
+from app.core.celery_app import celery_app
+from app.db.session import SessionLocal
+
+from .reconciliation import reconcile_payments
+
+
+@celery_app.task(acks_late=True, soft_time_limit=60 * 60, time_limit=60 * 61)
+def reconcile_payments_task() -> dict:
+    with SessionLocal() as db:
+        report = reconcile_payments(db)
+    return report.as_dict()
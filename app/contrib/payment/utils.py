@@ -3,7 +3,6 @@ import logging
 from decimal import Decimal
 
 from typing import TYPE_CHECKING, Dict, Optional
-from babel.numbers import get_currency_precision
 from sqlalchemy import cast, JSON
 
 from app.contrib.payment import (
@@ -12,7 +11,7 @@ from app.contrib.payment import (
 )
 from app.conf.config import settings
 
-from app.utils.prices import quantize_price
+from app.utils.prices import quantize_price, get_currency_precision
 from app.contrib.plugins.manager import PluginsManager, get_plugins_manager
 
 # from . import PaymentError, GatewayError
@@ -145,8 +144,7 @@ async def get_already_processed_transaction(
         payment: "Payment",
         gateway_response: "GatewayResponse"
 ) -> Optional["Transaction"]:
-    transaction = await transaction_repo(
-    ).first(async_db, params={
+    transaction = await transaction_repo.first(async_db, params={
         "is_success": gateway_response.is_success,
         "action_required": gateway_response.action_required,
         "token": gateway_response.transaction_id,
@@ -261,16 +259,9 @@ def validate_gateway_response(response: "GatewayResponse"):
         raise GatewayError("Gateway response needs to be json serializable")
 
 
-async def update_payment_charge_status(
-        async_db: "AsyncSession",
-        payment: "Payment",
-        transaction,
-        commit: bool,
-        obj_in: Optional[dict] = None
-):
-    if obj_in is None:
-        obj_in = {}
-
+def get_charge_status_changes(payment: "Payment", transaction: "Transaction") -> dict:
+    """Return payment fields changed by a successful transaction."""
+    obj_in = {}
     transaction_kind = transaction.kind
 
     if transaction_kind in {
@@ -283,7 +274,7 @@ async def update_payment_charge_status(
         # Set payment charge status to fully charged
         # only if there is no more amount needs to charge
         obj_in['charge_status'] = ChargeStatusChoices.PARTIALLY_CHARGED
-        if payment.get_charge_amount() <= 0:
+        if payment.total_amount - obj_in['captured_amount'] <= 0:
             obj_in['charge_status'] = ChargeStatusChoices.FULLY_CHARGED
 
     elif transaction_kind == TransactionKindChoices.VOID:
@@ -310,12 +301,23 @@ async def update_payment_charge_status(
             obj_in['captured_amount'] = payment.captured_amount - transaction.amount
             obj_in['charge_status'] = ChargeStatusChoices.PARTIALLY_CHARGED
 
-            if payment.captured_amount <= 0:
+            if obj_in['captured_amount'] <= 0:
                 obj_in['charge_status'] = ChargeStatusChoices.NOT_CHARGED
+    return obj_in
+
+
+async def update_payment_charge_status(
+        async_db: "AsyncSession",
+        payment: "Payment",
+        transaction,
+        commit: bool,
+        obj_in: Optional[dict] = None
+):
+    obj_in = (obj_in or {}) | get_charge_status_changes(payment, transaction)
     if obj_in:
         await payment_repo.update(async_db=async_db, db_obj=payment, obj_in=obj_in, commit=commit)
     await transaction_repo.update(
-        async_db=async_db, db_obj=transaction, obj_in={'already_processed': True},
+        async_db=async_db, db_obj=transaction, obj_in={'is_already_processed': True},
         commit=commit
     )
 
@@ -363,17 +365,10 @@ async def update_payment(
         await payment_repo.update(async_db=async_db, db_obj=payment, obj_in=obj_in, commit=commit)
 
 
-async def update_payment_method_details(
-        async_db: "AsyncSession",
-        payment: "Payment",
-        payment_method_info: Optional["PaymentMethodInfo"],
-        commit: bool,
-        obj_in: Optional[dict] = None
-):
+def get_payment_method_changes(payment_method_info: Optional["PaymentMethodInfo"]) -> dict:
+    obj_in = {}
     if not payment_method_info:
-        return
-    if not obj_in:
-        obj_in = {}
+        return obj_in
     if payment_method_info.brand:
         obj_in['cc_brand'] = payment_method_info.brand
     if payment_method_info.last_4:
@@ -384,6 +379,17 @@ async def update_payment_method_details(
         obj_in['cc_exp_month'] = payment_method_info.exp_month
     if payment_method_info.type:
         obj_in['payment_method_type'] = payment_method_info.type
+    return obj_in
+
+
+async def update_payment_method_details(
+        async_db: "AsyncSession",
+        payment: "Payment",
+        payment_method_info: Optional["PaymentMethodInfo"],
+        commit: bool,
+        obj_in: Optional[dict] = None
+):
+    obj_in = (obj_in or {}) | get_payment_method_changes(payment_method_info)
     if obj_in:
         await payment_repo.update(async_db=async_db, db_obj=payment, obj_in=obj_in, commit=commit)
 
@@ -398,12 +404,12 @@ async def get_payment_token(async_db: "AsyncSession", payment: "Payment"):
     return auth_transaction.token
 
 
-async def gateway_postprocess(async_db: "AsyncSession", payment, transaction):
+async def gateway_postprocess(async_db: "AsyncSession", payment, transaction, commit: bool = True):
     if not transaction.is_success or transaction.is_already_processed:
         return
 
     if transaction.is_action_required:
-        await payment_repo.update(async_db=async_db, db_obj=payment, obj_in={'to_confirm': True})
+        await payment_repo.update(async_db=async_db, db_obj=payment, obj_in={'to_confirm': True}, commit=commit)
         return
 
     # to_confirm is defined by the transaction.is_action_required. Payment doesn't
@@ -412,4 +418,6 @@ async def gateway_postprocess(async_db: "AsyncSession", payment, transaction):
     if payment.to_confirm:
         obj_in['to_confirm'] = False
 
-    await update_payment_charge_status(async_db=async_db, payment=payment, transaction=transaction, obj_in=obj_in)
+    await update_payment_charge_status(
+        async_db=async_db, payment=payment, transaction=transaction, obj_in=obj_in, commit=commit
+    )
@@ -52,8 +52,8 @@ async def update_plugin(
         async_db=Depends(get_async_db),
 ):
     manager = get_plugins_manager()
-    plugin = await manager.get_plugin(identifier, async_db)
     await manager.save_plugin_configuration(identifier, obj_in.model_dump(), async_db)
+    plugin = await resolve_plugin(async_db, identifier, manager)
 
     return {
         "message": "Plugin updated",
@@ -6,7 +6,7 @@ from typing import (
     Union,
     Callable, Any
 )
-from copy import copy
+from copy import copy, deepcopy
 
 from promise.promise import Promise
 from app.core.enums import TextChoices
@@ -104,6 +104,11 @@ class BasePlugin:
     DEFAULT_CONFIGURATION = []
     DEFAULT_ACTIVE = False
     HIDDEN = False
+    # Fan-out hooks (see PluginsManager) stop waiting for this plugin after HOOK_TIMEOUT seconds,
+    # default PLUGIN_HOOK_TIMEOUT_SECONDS. Hooks in DEFERRED_HOOKS run in celery, ORM objects they get are
+    # loaded again by primary key with a sync session, other arguments must be JSON serializable
+    HOOK_TIMEOUT: Optional[float] = None
+    DEFERRED_HOOKS: tuple[str, ...] = ()
 
     @classmethod
     def check_plugin_id(cls, plugin_id: str) -> bool:
@@ -647,11 +652,13 @@ class BasePlugin:
             cleaned_data: dict,
             async_db: "AsyncSession",
     ):
-        current_config = plugin_configuration.configuration
+        # JSON column changes are only saved when a new value is assigned
+        current_config = deepcopy(plugin_configuration.configuration)
         configuration_to_update = cleaned_data.get("configuration")
         obj_in = {}
         if configuration_to_update:
             cls._update_config_items(configuration_to_update, current_config)
+            obj_in["configuration"] = current_config
 
         if "is_active" in cleaned_data:
             obj_in["is_active"] = cleaned_data["is_active"]
@@ -663,7 +670,7 @@ class BasePlugin:
             await plugin_config_repo.update(
                 async_db=async_db,
                 db_obj=plugin_configuration,
-                obj_in={}
+                obj_in=obj_in
             )
 
         if plugin_configuration.configuration:
@@ -0,0 +1,119 @@
+"""
+Process-wide snapshot of loaded plugins.
+
+Building plugins costs a ``plugin_configuration`` query and a new object per
+plugin, so managers share one ``PluginSnapshot`` per process instead. Saving a
+plugin configuration increments ``PLUGIN_CONFIG_VERSION_KEY`` in redis, every
+process compares its snapshot with that version (at most once per
+``PLUGINS_VERSION_CHECK_SECONDS``) and reloads it from the database when it
+changed. The snapshot is never modified in place, it is replaced.
+"""
+import time
+from copy import deepcopy
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from app.conf.config import settings
+
+from .models import PluginConfiguration
+from .repository import plugin_config_repo
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from .base_plugin import BasePlugin
+
+PLUGIN_CONFIG_VERSION_KEY = 'plugins:config-version'
+
+
+@dataclass(frozen=True)
+class PluginSnapshot:
+    version: Optional[str]
+    plugin_paths: tuple[str, ...]
+    plugins: tuple["BasePlugin", ...]
+    # Dispatch tables of PluginsManager, filled lazily and dropped with the snapshot
+    dispatch_tables: dict = field(default_factory=dict, compare=False)
+    plugin_methods: dict = field(default_factory=dict, compare=False)
+
+
+class PluginSnapshotCache:
+    """
+    Keep the current snapshot and check its version in redis
+    """
+
+    def __init__(self):
+        self.redis = None
+        self.snapshot: Optional[PluginSnapshot] = None
+        self._checked_at = 0.0
+
+    def configure(self, aioredis_instance) -> None:
+        self.redis = aioredis_instance
+        self.clear()
+
+    def get_redis(self):
+        if self.redis is None:
+            from redis.asyncio import Redis
+
+            self.redis = Redis.from_url(str(settings.REDIS_URL), decode_responses=True, encoding='utf8')
+        return self.redis
+
+    def clear(self) -> None:
+        self.snapshot = None
+        self._checked_at = 0.0
+
+    async def get_version(self) -> Optional[str]:
+        return await self.get_redis().get(PLUGIN_CONFIG_VERSION_KEY)
+
+    async def get(self, async_db: "AsyncSession", plugin_paths: tuple[str, ...], load_plugins) -> PluginSnapshot:
+        """
+        Return current snapshot of plugin_paths, load_plugins(async_db, db_configs) builds a new one
+        """
+        snapshot = self.snapshot
+        now = time.monotonic()
+        if (
+                snapshot is not None and snapshot.plugin_paths == plugin_paths
+                and now - self._checked_at < settings.PLUGINS_VERSION_CHECK_SECONDS
+        ):
+            return snapshot
+        try:
+            # Read before loading, a configuration saved meanwhile leaves the snapshot outdated, not newer
+            version = await self.get_version()
+        except RedisError as e:
+            logger.warning(f"Plugin configuration version is unavailable, loading plugins from database: {e}")
+            return PluginSnapshot(None, plugin_paths, tuple(load_plugins(await get_db_plugin_configs(async_db))))
+
+        if snapshot is None or snapshot.plugin_paths != plugin_paths or snapshot.version != version:
+            snapshot = PluginSnapshot(version, plugin_paths, tuple(load_plugins(await get_db_plugin_configs(async_db))))
+            self.snapshot = snapshot
+        self._checked_at = now
+        return snapshot
+
+    async def invalidate(self) -> None:
+        """
+        Make every process reload plugins, call after plugin configuration is committed
+        """
+        self.clear()
+        try:
+            await self.get_redis().incr(PLUGIN_CONFIG_VERSION_KEY)
+        except RedisError as e:
+            logger.error(f"Plugin configuration version was not updated: {e}")
+
+
+async def get_db_plugin_configs(async_db: "AsyncSession") -> dict:
+    """
+    Return copies of plugin configurations by identifier, not bound to async_db and safe to share
+    """
+    return {
+        db_config.identifier: PluginConfiguration(
+            id=db_config.id, identifier=db_config.identifier, name=db_config.name,
+            description=db_config.description, is_active=db_config.is_active,
+            configuration=deepcopy(db_config.configuration),
+        )
+        for db_config in await plugin_config_repo.get_all(async_db)
+    }
+
+
+plugin_snapshot_cache = PluginSnapshotCache()
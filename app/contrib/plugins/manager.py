@@ -1,9 +1,19 @@
+import asyncio
 import inspect
+import time
 from collections import defaultdict
 from collections.abc import Iterable
+from copy import deepcopy
 from decimal import Decimal
+from functools import lru_cache
 from typing import TYPE_CHECKING, Any, Callable, Optional, Union
 
+from loguru import logger
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import InstanceState
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.metrics import record_plugin_hook
 from app.utils.prices import TaxedMoney
 
 from app.utils.prices import quantize_price
@@ -34,16 +44,117 @@ from app.contrib.payment.interface import (
 )
 # from ..tax.utils import calculate_tax_rate
 # from .base_plugin import ExcludedShippingMethod, ExternalAccessTokens
+from .cache import plugin_snapshot_cache
 from .models import PluginConfiguration
 from .repository import plugin_config_repo
 from ...utils.import_utils import import_string
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
 
+    from app.contrib.account.models import User
+    from app.contrib.order.models import Order
     from .base_plugin import BasePlugin
 
 NotifyEventTypeChoice = str
+# Bound plugin methods in plugin order, flagged True when they must be awaited
+DispatchTable = tuple[tuple[Callable, bool], ...]
+
+
+@lru_cache(maxsize=None)
+def load_plugin_class(plugin_path: str) -> type["BasePlugin"]:
+    return import_string(plugin_path)
+
+
+def get_plugin_method(plugin: "BasePlugin", method_name: str) -> Optional[tuple[Callable, bool]]:
+    """Return bound method_name of plugin and whether it is a coroutine function.
+
+    BasePlugin only declares hook methods, None is returned when plugin class doesn't implement it.
+    """
+    if getattr(type(plugin), method_name, None) is None:
+        return None
+    method = getattr(plugin, method_name)
+    return method, inspect.iscoroutinefunction(method)
+
+
+async def run_plugin_hook(
+        plugin: "BasePlugin", plugin_method: Callable, is_async: bool, method_name: str, args: tuple, kwargs: dict,
+) -> None:
+    """Run fan-out hook of one plugin, failures and timeouts are logged, not raised."""
+    if is_async:
+        call = plugin_method(*args, **kwargs, previous_value=None)
+    else:
+        # Keep sync plugins off the event loop, a timed out thread is left to finish on its own
+        call = asyncio.to_thread(plugin_method, *args, **kwargs, previous_value=None)
+    start = time.perf_counter()
+    result = 'error'
+    try:
+        await asyncio.wait_for(call, plugin.HOOK_TIMEOUT or settings.PLUGIN_HOOK_TIMEOUT_SECONDS)
+        result = 'ok'
+    except asyncio.TimeoutError:
+        result = 'timeout'
+        logger.warning(f"Plugin {plugin.PLUGIN_ID} {method_name} timed out")
+    except Exception:
+        logger.exception(f"Plugin {plugin.PLUGIN_ID} {method_name} failed")
+    finally:
+        record_plugin_hook(plugin.PLUGIN_ID, method_name, result, time.perf_counter() - start)
+
+
+# Deferred hook argument standing for an ORM object, see dump_hook_argument
+HOOK_MODEL_KEY = '__model__'
+
+
+def dump_hook_argument(value: Any) -> Any:
+    """ORM object is sent to celery as its model path and primary key, other values as they are."""
+    state = sa_inspect(value, raiseerr=False)
+    if not isinstance(state, InstanceState):
+        return value
+    model = type(value)
+    [pk] = state.identity
+    return {HOOK_MODEL_KEY: f'{model.__module__}.{model.__qualname__}', 'pk': str(pk)}
+
+
+def snapshot_hook_argument(value: Any) -> Any:
+    """ORM object is copied to an instance of no session holding its loaded columns, other values as they are.
+
+    Sync plugins run in a thread, the copy never lazy loads through the request AsyncSession,
+    attributes not loaded by the caller are None.
+    """
+    state = sa_inspect(value, raiseerr=False)
+    if not isinstance(state, InstanceState):
+        return value
+    mapper = state.mapper
+    snapshot = mapper.class_manager.new_instance()
+    for attr in mapper.column_attrs:
+        if attr.key in state.dict:
+            set_committed_value(snapshot, attr.key, deepcopy(state.dict[attr.key]))
+    return snapshot
+
+
+def load_hook_argument(db: "Session", value: Any) -> Any:
+    """Load again an ORM object sent by dump_hook_argument, None if it was deleted meanwhile."""
+    if not isinstance(value, dict) or HOOK_MODEL_KEY not in value:
+        return value
+    model = import_string(value[HOOK_MODEL_KEY])
+    [column] = sa_inspect(model).primary_key
+    return db.get(model, column.type.python_type(value['pk']))
+
+
+def defer_plugin_hook(plugin: "BasePlugin", method_name: str, args: tuple, kwargs: dict) -> None:
+    from .tasks import run_plugin_hook_task
+
+    plugin_class = type(plugin)
+    try:
+        run_plugin_hook_task.delay(
+            f'{plugin_class.__module__}.{plugin_class.__qualname__}', method_name,
+            tuple(dump_hook_argument(value) for value in args),
+            {name: dump_hook_argument(value) for name, value in kwargs.items()},
+        )
+    except Exception:
+        # Broker or encoding error must not fail the request that triggered the hook
+        logger.exception(f"Plugin {plugin.PLUGIN_ID} {method_name} could not be deferred")
+        record_plugin_hook(plugin.PLUGIN_ID, method_name, 'deferred-lost', 0)
 
 
 class PluginsManager(PaymentInterface):
@@ -76,33 +187,52 @@ class PluginsManager(PaymentInterface):
         self.all_plugins = []
         self.global_plugins = []
         self.loaded_global = False
+        # Built lazily from loaded plugins and shared with every manager of the same snapshot
+        self._dispatch_tables: dict[Any, DispatchTable] = {}
+        self._plugin_methods: dict[tuple[str, str], Optional[tuple[Callable, bool]]] = {}
 
     def __del__(self) -> None:
-        # remove references to plugins
-        self.all_plugins.clear()
-        self.global_plugins.clear()
+        # remove references to plugins, they are owned by plugin snapshot
+        self.all_plugins = []
+        self.global_plugins = []
+        self._reset_dispatch_tables()
 
     async def _ensure_plugins_loaded(self, async_db: "AsyncSession"):
-        global_db_config = await self._get_db_plugin_configs(async_db)
+        if self.loaded_global:
+            return
+        if not self.plugins:
+            # Nothing to configure, hooks called on every order or profile save skip redis and database
+            self.loaded_global = True
+            return
+        snapshot = await plugin_snapshot_cache.get(async_db, tuple(self.plugins), self._load_plugins)
 
-        for plugin_path in self.plugins:
-            plugin_class = import_string(plugin_path)
-            plugin = self._load_plugin(
-                plugin_class,
-                global_db_config,
-            )
-            self.global_plugins.append(plugin)
-            self.all_plugins.append(plugin)
+        self.global_plugins = list(snapshot.plugins)
+        self.all_plugins = list(snapshot.plugins)
+        self._dispatch_tables = snapshot.dispatch_tables
+        self._plugin_methods = snapshot.plugin_methods
         self.loaded_global = True
 
-    @staticmethod
-    async def _get_db_plugin_configs(async_db: "AsyncSession"):
-        plugin_manager_configs = await plugin_config_repo.get_all(async_db)
+    def _load_plugins(self, db_configs_map: dict) -> list["BasePlugin"]:
+        return [
+            self._load_plugin(load_plugin_class(plugin_path), db_configs_map)
+            for plugin_path in self.plugins
+        ]
+
+    def _reset_dispatch_tables(self) -> None:
+        self._dispatch_tables = {}
+        self._plugin_methods = {}
 
-        configs = {}
-        for db_plugin_config in plugin_manager_configs:
-            configs[db_plugin_config.identifier] = db_plugin_config
-        return configs
+    def _get_dispatch_table(self, method_name: str, plugin_ids: Optional[list[str]] = None) -> DispatchTable:
+        """Return methods of active plugins implementing method_name, built once per loaded configuration."""
+        key = (method_name, frozenset(plugin_ids)) if plugin_ids else method_name
+        table = self._dispatch_tables.get(key)
+        if table is None:
+            table = self._dispatch_tables[key] = tuple(
+                dispatch for plugin in self.all_plugins
+                if plugin.is_active and (not plugin_ids or plugin.PLUGIN_ID in plugin_ids)
+                for dispatch in (get_plugin_method(plugin, method_name),) if dispatch is not None
+            )
+        return table
 
     async def __run_method_on_plugins(
             self,
@@ -114,20 +244,52 @@ class PluginsManager(PaymentInterface):
             **kwargs,
     ):
         """Try to run a method with the given name on each declared active plugin."""
+        await self._ensure_plugins_loaded(async_db)
         value = default_value
-        plugins = await self.get_plugins(
-            async_db,
-            active_only=True,
-            plugin_ids=plugin_ids,
-        )
-        for plugin in plugins:
-            value = self.__run_method_on_single_plugin(
-                plugin, method_name, value, *args, **kwargs
-            )
+        for plugin_method, is_async in self._get_dispatch_table(method_name, plugin_ids):
+            returned_value = plugin_method(*args, **kwargs, previous_value=value)
+            if is_async:
+                returned_value = await returned_value
+            if returned_value is not NotImplemented:
+                value = returned_value
         return value
 
-    @staticmethod
+    async def __run_method_on_plugins_concurrently(
+            self,
+            async_db: "AsyncSession",
+            method_name: str,
+            *args,
+            plugin_ids: Optional[list[str]] = None,
+            **kwargs,
+    ) -> None:
+        """Run a hook whose return value is not chained on every active plugin at once.
+
+        Each plugin gets previous_value None and its own timeout, so the call takes as long as
+        the slowest plugin instead of all of them. Sync plugins get ORM objects as copies, see
+        snapshot_hook_argument. Hooks listed in plugin DEFERRED_HOOKS are sent to celery instead,
+        ORM objects are sent as primary keys and other arguments must be JSON serializable.
+        """
+        await self._ensure_plugins_loaded(async_db)
+        calls = []
+        snapshot = None
+        for plugin_method, is_async in self._get_dispatch_table(method_name, plugin_ids):
+            plugin = plugin_method.__self__
+            if method_name in plugin.DEFERRED_HOOKS:
+                defer_plugin_hook(plugin, method_name, args, kwargs)
+            elif is_async:
+                calls.append(run_plugin_hook(plugin, plugin_method, is_async, method_name, args, kwargs))
+            else:
+                if snapshot is None:
+                    snapshot = (
+                        tuple(snapshot_hook_argument(value) for value in args),
+                        {name: snapshot_hook_argument(value) for name, value in kwargs.items()},
+                    )
+                calls.append(run_plugin_hook(plugin, plugin_method, is_async, method_name, *snapshot))
+        if calls:
+            await asyncio.gather(*calls)
+
     async def __run_method_on_single_plugin(
+            self,
             plugin: Optional["BasePlugin"],
             method_name: str,
             previous_value: Any,
@@ -140,16 +302,22 @@ class PluginsManager(PaymentInterface):
         method. If plugin doesn't have own implementation of expected method_name, it
         will return previous_value.
         """
-        plugin_method = getattr(plugin, method_name, NotImplemented)
-        if plugin_method == NotImplemented:
+        if plugin is None:
+            return previous_value
+        key = (plugin.PLUGIN_ID, method_name)
+        try:
+            dispatch = self._plugin_methods[key]
+        except KeyError:
+            dispatch = self._plugin_methods[key] = get_plugin_method(plugin, method_name)
+        if dispatch is None:
             return previous_value
 
-        if inspect.iscoroutinefunction(plugin_method):
-            returned_value = await plugin_method(*args, **kwargs, previous_value=previous_value)  # type:ignore
-        else:
-            returned_value = plugin_method(*args, **kwargs, previous_value=previous_value)  # type:ignore
+        plugin_method, is_async = dispatch
+        returned_value = plugin_method(*args, **kwargs, previous_value=previous_value)
+        if is_async:
+            returned_value = await returned_value
 
-        if returned_value == NotImplemented:
+        if returned_value is NotImplemented:
             return previous_value
         return returned_value
 
@@ -597,16 +765,9 @@ class PluginsManager(PaymentInterface):
     #         channel_slug=None,
     #     )
     #
-    # def customer_updated(self, customer: "User", webhooks=None):
-    #     default_value = None
-    #     return self.__run_method_on_plugins(
-    #         "customer_updated",
-    #         default_value,
-    #         customer,
-    #         webhooks=webhooks,
-    #         channel_slug=None,
-    #     )
-    #
+    async def customer_updated(self, async_db: "AsyncSession", customer: "User") -> None:
+        await self.__run_method_on_plugins_concurrently(async_db, "customer_updated", customer)
+
     # def customer_metadata_updated(self, customer: "User", webhooks=None):
     #     default_value = None
     #     return self.__run_method_on_plugins(
@@ -778,12 +939,9 @@ class PluginsManager(PaymentInterface):
     #         "product_export_completed", default_value, export, channel_slug=None
     #     )
     #
-    # def order_created(self, order: "Order"):
-    #     default_value = None
-    #     return self.__run_method_on_plugins(
-    #         "order_created", default_value, order, channel_slug=order.channel.slug
-    #     )
-    #
+    async def order_created(self, async_db: "AsyncSession", order: "Order") -> None:
+        await self.__run_method_on_plugins_concurrently(async_db, "order_created", order)
+
     # def event_delivery_retry(self, event_delivery: "EventDelivery"):
     #     default_value = None
     #     return self.__run_method_on_plugins(
@@ -2238,8 +2396,10 @@ class PluginsManager(PaymentInterface):
                 )
                 configuration.name = plugin.PLUGIN_NAME
                 configuration.description = plugin.PLUGIN_DESCRIPTION
-                plugin.is_active = configuration.is_active
-                plugin.configuration = configuration.configuration
+                # Loaded plugins are shared and never changed, every process reloads them instead
+                await plugin_snapshot_cache.invalidate()
+                self.loaded_global = False
+                self._reset_dispatch_tables()
                 return configuration
 
     async def get_plugin(
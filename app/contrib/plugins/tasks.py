@@ -0,0 +1,48 @@
+import asyncio
+import inspect
+import time
+
+from loguru import logger
+from sqlalchemy import select
+
+from app.core.celery_app import celery_app
+from app.core.metrics import record_plugin_hook
+from app.db.session import SessionLocal
+
+from .models import PluginConfiguration
+
+
+@celery_app.task(acks_late=True)
+def run_plugin_hook_task(plugin_path: str, method_name: str, args: list, kwargs: dict) -> bool:
+    """
+    Run deferred fan-out hook of one plugin, ORM objects of arguments are loaded again in a session kept open
+    during the hook
+    :return: False if plugin is not active anymore or an object of arguments was deleted
+    """
+    from .manager import PluginsManager, load_plugin_class, load_hook_argument
+
+    plugin_class = load_plugin_class(plugin_path)
+    with SessionLocal() as db:
+        db_config = db.execute(
+            select(PluginConfiguration).filter(PluginConfiguration.identifier == plugin_class.PLUGIN_ID)
+        ).scalar_one_or_none()
+        plugin = PluginsManager._load_plugin(plugin_class, {db_config.identifier: db_config} if db_config else {})
+        if not plugin.is_active:
+            return False
+        loaded_args = [load_hook_argument(db, value) for value in args]
+        loaded_kwargs = {name: load_hook_argument(db, value) for name, value in kwargs.items()}
+        sent, loaded = [*args, *kwargs.values()], [*loaded_args, *loaded_kwargs.values()]
+        if any(value is not None and obj is None for value, obj in zip(sent, loaded)):
+            logger.warning(f"Plugin {plugin.PLUGIN_ID} {method_name} skipped, its object was deleted")
+            return False
+
+        start = time.perf_counter()
+        result = 'error'
+        try:
+            returned_value = getattr(plugin, method_name)(*loaded_args, **loaded_kwargs, previous_value=None)
+            if inspect.iscoroutine(returned_value):
+                asyncio.run(returned_value)
+            result = 'ok'
+        finally:
+            record_plugin_hook(plugin.PLUGIN_ID, method_name, f'deferred-{result}', time.perf_counter() - start)
+    return True
@@ -1,3 +1,4 @@
+from copy import deepcopy
 from typing import TYPE_CHECKING
 
 from app.contrib.plugins.base_plugin import ConfigurationTypeField
@@ -56,14 +57,16 @@ async def resolve_plugins(
     all_plugins = await manager.get_all_plugins(async_db)
     plugins = []
     for plugin in all_plugins:
-        hide_private_configuration_fields(plugin.configuration, plugin.CONFIG_STRUCTURE)
         if plugin.HIDDEN is True:
             continue
+        # Loaded plugins are shared between requests, hide fields on a copy
+        configuration = deepcopy(plugin.configuration)
+        hide_private_configuration_fields(configuration, plugin.CONFIG_STRUCTURE)
         plugins.append(PluginVisible(
 
             id=plugin.PLUGIN_ID,
             is_active=plugin.is_active,
-            configuration=plugin.configuration,
+            configuration=configuration,
 
             description=plugin.PLUGIN_DESCRIPTION,
             name=plugin.PLUGIN_NAME,
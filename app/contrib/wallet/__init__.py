@@ -0,0 +1,11 @@
+from app.core.enums import TextChoices
+from app.utils.translation import gettext_lazy as _
+
+
+class WalletEntryTypeChoices(TextChoices):
+    deposit = "deposit", _("Deposit")
+    withdraw = "withdraw", _("Withdraw")
+    refund = "refund", _("Refund")
+    adjustment = "adjustment", _("Adjustment")
+    # Balance a wallet had when the ledger was introduced
+    opening = "opening", _("Opening balance")
@@ -0,0 +1,12 @@
+class WalletError(Exception):
+    def __init__(self, message, code=None):
+        super(WalletError, self).__init__(message, code)
+        self.message = message
+        self.code = code
+
+    def __str__(self):
+        return self.message
+
+
+class InsufficientFundsError(WalletError):
+    pass
@@ -0,0 +1,143 @@
+"""
+Wallet ledger.
+
+Every balance change is a ``WalletEntry`` inserted in the caller transaction
+next to its ``Payment``/``Transaction``, the balance itself is changed by a
+single ``UPDATE wallet SET amount = amount + :x ... RETURNING amount``. The row
+lock taken by the update serializes concurrent changes of one wallet, so no
+update is lost and ``WalletEntry.balance`` records the balance right after
+the entry. ``Wallet.amount`` is the O(1) read, ``snapshot_balances`` stores
+ledger balances periodically so the ledger can be verified from the last
+snapshot instead of from the first entry.
+"""
+from decimal import Decimal
+from typing import Optional, TYPE_CHECKING
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import select, update, func, insert
+
+from app.utils.translation import gettext as _
+
+from . import WalletEntryTypeChoices
+from .exceptions import InsufficientFundsError
+from .models import Wallet, WalletEntry, WalletBalanceSnapshot
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+__all__ = ('apply_entry', 'get_ledger_balance', 'snapshot_balances')
+
+
+async def apply_entry(
+        async_db: "AsyncSession",
+        *,
+        wallet_id: UUID,
+        amount: Decimal,
+        entry_type: WalletEntryTypeChoices,
+        payment_id: Optional[UUID] = None,
+        transaction_id: Optional[int] = None,
+        allow_negative: bool = False,
+) -> WalletEntry:
+    """
+    Change wallet balance and append ledger entry, caller commits
+    :param async_db:
+    :param wallet_id:
+    :param amount: signed amount
+    :param entry_type:
+    :param payment_id:
+    :param transaction_id:
+    :param allow_negative: allow balance below zero
+    :return: entry, balance after the change is entry.balance
+    """
+    stmt = (
+        update(Wallet)
+        .where(Wallet.id == wallet_id)
+        .values(amount=Wallet.amount + amount)
+        .returning(Wallet.amount)
+        .execution_options(synchronize_session=False)
+    )
+    if amount < 0 and not allow_negative:
+        stmt = stmt.where(Wallet.amount + amount >= 0)
+    balance = (await async_db.execute(stmt)).scalar_one_or_none()
+    if balance is None:
+        raise InsufficientFundsError(_("Insufficient funds"))
+
+    entry = WalletEntry(
+        wallet_id=wallet_id,
+        entry_type=entry_type,
+        amount=amount,
+        balance=balance,
+        payment_id=payment_id,
+        transaction_id=transaction_id,
+    )
+    async_db.add(entry)
+    return entry
+
+
+async def get_ledger_balance(async_db: "AsyncSession", wallet_id: UUID) -> Decimal:
+    """
+    Balance from the last snapshot and entries after it
+    """
+    snapshot = (await async_db.execute(
+        select(WalletBalanceSnapshot.entry_id, WalletBalanceSnapshot.balance)
+        .filter(WalletBalanceSnapshot.wallet_id == wallet_id)
+        .order_by(WalletBalanceSnapshot.entry_id.desc())
+        .limit(1)
+    )).first()
+    entry_id, balance = snapshot if snapshot else (0, Decimal(0))
+    delta = (await async_db.execute(
+        select(func.coalesce(func.sum(WalletEntry.amount), 0))
+        .filter(WalletEntry.wallet_id == wallet_id, WalletEntry.id > entry_id)
+    )).scalar_one()
+    return balance + Decimal(delta)
+
+
+def snapshot_balances(db: "Session") -> int:
+    """
+    Store ledger balance of wallets with entries after their last snapshot, caller commits
+    :param db:
+    :return: number of snapshots
+    """
+    last_entry = (
+        select(WalletBalanceSnapshot.wallet_id, func.max(WalletBalanceSnapshot.entry_id).label('entry_id'))
+        .group_by(WalletBalanceSnapshot.wallet_id)
+        .subquery()
+    )
+    last_snapshot = (
+        select(WalletBalanceSnapshot.wallet_id, WalletBalanceSnapshot.entry_id, WalletBalanceSnapshot.balance)
+        .join(last_entry, (last_entry.c.wallet_id == WalletBalanceSnapshot.wallet_id)
+              & (last_entry.c.entry_id == WalletBalanceSnapshot.entry_id))
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            WalletEntry.wallet_id,
+            func.max(WalletEntry.id).label('entry_id'),
+            func.sum(WalletEntry.amount).label('delta'),
+            func.coalesce(func.max(last_snapshot.c.balance), 0).label('balance'),
+        )
+        .outerjoin(last_snapshot, last_snapshot.c.wallet_id == WalletEntry.wallet_id)
+        .filter(WalletEntry.id > func.coalesce(last_snapshot.c.entry_id, 0))
+        .group_by(WalletEntry.wallet_id)
+    ).all()
+    if not rows:
+        return 0
+
+    snapshots = [
+        {'wallet_id': row.wallet_id, 'entry_id': row.entry_id, 'balance': Decimal(row.balance) + Decimal(row.delta)}
+        for row in rows
+    ]
+    entry_balances = dict(db.execute(
+        select(WalletEntry.id, WalletEntry.balance)
+        .filter(WalletEntry.id.in_([snapshot['entry_id'] for snapshot in snapshots]))
+    ).all())
+    for snapshot in snapshots:
+        if entry_balances[snapshot['entry_id']] != snapshot['balance']:
+            logger.warning(
+                f"Wallet {snapshot['wallet_id']} ledger sum {snapshot['balance']} "
+                f"differs from entry {snapshot['entry_id']} balance {entry_balances[snapshot['entry_id']]}"
+            )
+    db.execute(insert(WalletBalanceSnapshot), snapshots)
+    return len(snapshots)
@@ -0,0 +1,79 @@
+from uuid import UUID
+from decimal import Decimal
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, ForeignKey, DECIMAL, DateTime, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID as SUUID
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from sqlalchemy_utils import ChoiceType
+
+from app.conf.config import settings
+from app.db.models import Base, UUIDBase, CreationModificationDateBase
+from app.contrib.wallet import WalletEntryTypeChoices
+
+
+class Wallet(UUIDBase, CreationModificationDateBase):
+    user_id: Mapped[UUID] = mapped_column(
+        SUUID(as_uuid=True),
+        ForeignKey("user.id", name="fx_wallet_user_id", ondelete="CASCADE"),
+        unique=True, nullable=False
+    )
+    currency: Mapped[str] = mapped_column(String(25), nullable=False, default=settings.DEFAULT_CURRENCY)
+    # Current balance, changed only together with a WalletEntry (see ledger.apply_entry)
+    amount: Mapped[Decimal] = mapped_column(
+        DECIMAL(precision=12, scale=2, asdecimal=True), nullable=False, default=Decimal("0.00")
+    )
+
+
+class WalletEntry(Base):
+    """
+    Append only ledger row, never updated or deleted
+    """
+    __table_args__ = (
+        Index('ix_wallet_entry_wallet_id_id', 'wallet_id', 'id'),
+    )
+
+    wallet_id: Mapped[UUID] = mapped_column(
+        SUUID(as_uuid=True),
+        ForeignKey("wallet.id", name="fx_wallet_entry_wallet_id", ondelete="RESTRICT"),
+        nullable=False
+    )
+    entry_type: Mapped[WalletEntryTypeChoices] = mapped_column(
+        ChoiceType(choices=WalletEntryTypeChoices, impl=String(25)), nullable=False
+    )
+    # Signed, negative for withdraw and refund
+    amount: Mapped[Decimal] = mapped_column(DECIMAL(precision=12, scale=2, asdecimal=True), nullable=False)
+    balance: Mapped[Decimal] = mapped_column(DECIMAL(precision=12, scale=2, asdecimal=True), nullable=False)
+    payment_id: Mapped[Optional[UUID]] = mapped_column(
+        SUUID(as_uuid=True),
+        ForeignKey("payment.id", name="fx_wallet_entry_payment_id", ondelete="SET NULL"),
+        nullable=True
+    )
+    transaction_id: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        ForeignKey("transaction.id", name="fx_wallet_entry_transaction_id", ondelete="SET NULL"),
+        nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class WalletBalanceSnapshot(Base):
+    __table_args__ = (
+        Index('ix_wallet_balance_snapshot_wallet_id_entry_id', 'wallet_id', 'entry_id'),
+    )
+
+    wallet_id: Mapped[UUID] = mapped_column(
+        SUUID(as_uuid=True),
+        ForeignKey("wallet.id", name="fx_wallet_balance_snapshot_wallet_id", ondelete="CASCADE"),
+        nullable=False
+    )
+    # Last ledger entry included in balance
+    entry_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    balance: Mapped[Decimal] = mapped_column(DECIMAL(precision=12, scale=2, asdecimal=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,57 @@
+from typing import TYPE_CHECKING, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.conf.config import settings
+from app.db.repository import CRUDBase
+
+from .models import Wallet, WalletEntry, WalletBalanceSnapshot
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+_dialect_insert = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+class CRUDWallet(CRUDBase[Wallet]):
+    async def get_or_create(
+            self,
+            async_db: "AsyncSession",
+            *,
+            user_id: UUID,
+            currency: Optional[str] = None,
+    ) -> Wallet:
+        """
+        Return user wallet, concurrent calls create one wallet, caller commits
+        :param async_db:
+        :param user_id:
+        :param currency: default DEFAULT_CURRENCY
+        :return:
+        """
+        insert = _dialect_insert[async_db.get_bind().dialect.name]
+        await async_db.execute(
+            insert(self.model).values(
+                id=uuid4(), user_id=user_id,
+                currency=currency or settings.DEFAULT_CURRENCY, amount=0,
+            ).on_conflict_do_nothing(index_elements=[self.model.user_id])
+        )
+        result = await async_db.execute(select(self.model).filter(self.model.user_id == user_id))
+        return result.scalar_one()
+
+
+class CRUDWalletEntry(CRUDBase[WalletEntry]):
+    pass
+
+
+class CRUDWalletBalanceSnapshot(CRUDBase[WalletBalanceSnapshot]):
+    pass
+
+
+wallet_repo = CRUDWallet(Wallet)
+wallet_entry_repo = CRUDWalletEntry(WalletEntry)
+wallet_balance_snapshot_repo = CRUDWalletBalanceSnapshot(WalletBalanceSnapshot)
@@ -0,0 +1,13 @@
+from app.core.celery_app import celery_app
+from app.db.session import SessionLocal
+
+from .ledger import snapshot_balances
+
+
+# Runs hourly, stops before the next run
+@celery_app.task(acks_late=True, soft_time_limit=60 * 30, time_limit=60 * 31)
+def snapshot_wallet_balances_task() -> int:
+    with SessionLocal() as db:
+        count = snapshot_balances(db)
+        db.commit()
+    return count
@@ -1,13 +1,80 @@
 from celery import Celery, Task
+from celery.signals import before_task_publish
+from kombu import Queue
+
 from app.conf.config import settings
+from app.core.metrics import record_task_enqueued
 
-celery_app = Celery("worker", broker=settings.REDIS_URL)
+celery_app = Celery("worker", broker=settings.REDIS_URL, backend=settings.CELERY_RESULT_BACKEND or settings.REDIS_URL)
 
 celery_app.conf.broker_connection_retry_on_startup = True
 
+# Queues are consumed by separate workers, see scripts/worker-start.sh:
+# auth - verification and password emails, bulk - exports and periodic batch jobs, media - file work
+CELERY_DEFAULT_QUEUE = 'celery'
+CELERY_QUEUES = (CELERY_DEFAULT_QUEUE, 'auth', 'bulk', 'media')
+celery_app.conf.task_queues = [Queue(name) for name in CELERY_QUEUES]
+celery_app.conf.task_default_queue = CELERY_DEFAULT_QUEUE
+# Redis emulates priorities with one list per step, 0 is consumed first
+celery_app.conf.broker_transport_options = {
+    'priority_steps': list(range(10)),
+    'queue_order_strategy': 'priority',
+}
+celery_app.conf.task_default_priority = 5
+celery_app.conf.task_soft_time_limit = settings.CELERY_TASK_SOFT_TIME_LIMIT
+celery_app.conf.task_time_limit = settings.CELERY_TASK_TIME_LIMIT
+# Only tasks polled by the API keep results (ignore_result=False), for a short time
+celery_app.conf.task_ignore_result = True
+celery_app.conf.result_expires = settings.CELERY_RESULT_EXPIRE_SECONDS
+
 celery_app.autodiscover_tasks([
     'app.contrib.account.tasks',
+    'app.contrib.file.tasks',
+    'app.contrib.order.tasks',
+    'app.contrib.export.tasks',
+    'app.contrib.payment.tasks',
+    'app.contrib.plugins.tasks',
+    'app.contrib.wallet.tasks',
 ])
 
+celery_app.conf.beat_schedule = {
+    'cleanup-expired-uploads': {
+        'task': 'app.contrib.file.tasks.cleanup_expired_uploads_task',
+        'schedule': 60 * 60,
+    },
+    'cleanup-expired-exports': {
+        'task': 'app.contrib.export.tasks.cleanup_expired_exports_task',
+        'schedule': 60 * 60,
+    },
+    'reconcile-order-status-counters': {
+        'task': 'app.contrib.order.tasks.reconcile_order_status_counters_task',
+        'schedule': 60 * 60 * 6,
+    },
+    'reconcile-payments': {
+        'task': 'app.contrib.payment.tasks.reconcile_payments_task',
+        'schedule': 60 * 60 * 6,
+    },
+    'snapshot-wallet-balances': {
+        'task': 'app.contrib.wallet.tasks.snapshot_wallet_balances_task',
+        'schedule': 60 * 60,
+    },
+}
+
+
+celery_app.conf.task_routes = {
+    "app.worker.test_celery": "main-queue",
+    # Password resets are not held up by a burst of sign-up verifications
+    "app.contrib.account.tasks.send_reset_password_email_task": {'queue': 'auth', 'priority': 0},
+    "app.contrib.account.tasks.*": {'queue': 'auth'},
+    "app.contrib.export.tasks.*": {'queue': 'bulk'},
+    "app.contrib.order.tasks.reconcile_order_status_counters_task": {'queue': 'bulk'},
+    "app.contrib.order.tasks.reprice_orders_shipping_task": {'queue': 'bulk'},
+    "app.contrib.payment.tasks.*": {'queue': 'bulk'},
+    "app.contrib.wallet.tasks.*": {'queue': 'bulk'},
+    "app.contrib.file.tasks.*": {'queue': 'media'},
+}
+
 
-celery_app.conf.task_routes = {"app.worker.test_celery": "main-queue"}
+@before_task_publish.connect
+def count_published_task(sender=None, routing_key=None, **kwargs):
+    record_task_enqueued(sender, routing_key)
@@ -0,0 +1,256 @@
+"""
+Idempotency-Key support for mutation endpoints.
+
+Clients send a unique ``Idempotency-Key`` header with a POST they may retry.
+The first request with a key takes a short redis lock and runs, its 2xx
+response is stored for ``IDEMPOTENCY_EXPIRE_SECONDS`` and replayed to every
+retry with the same key, so a retried deposit or order never creates a second
+row. A concurrent duplicate waits for the first one to finish instead of
+running next to it. The lock holds a random token, it is refreshed while the
+request runs and only its owner deletes it. Keys are scoped by the credentials
+of the request, reusing a key with another method, path or body is rejected,
+the multipart boundary is not part of the body fingerprint since clients pick
+a new one on every retry. Failed responses are not stored and release the key,
+so the client can retry them.
+
+Only routes listed in ``IDEMPOTENT_ROUTES`` (route names) are handled, requests
+without the header are passed through untouched.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence
+
+from redis.exceptions import WatchError
+from starlette.routing import Match
+from starlette.status import HTTP_409_CONFLICT, HTTP_422_UNPROCESSABLE_ENTITY
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+from fastapi.responses import ORJSONResponse
+
+from app.conf.config import settings
+
+__all__ = (
+    'IDEMPOTENCY_HEADER', 'IDEMPOTENCY_REPLAYED_HEADER', 'IdempotencyStore', 'IdempotencyMiddleware',
+    'get_request_fingerprint',
+)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_REPLAYED_HEADER = 'Idempotent-Replayed'
+IDEMPOTENCY_KEY = 'idempotency:{scope}:{key}'
+IDEMPOTENCY_LOCK_KEY = 'idempotency-lock:{scope}:{key}'
+MUTATION_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+POLL_INTERVAL = 0.05
+
+
+def get_multipart_boundary(content_type: bytes) -> Optional[bytes]:
+    media_type, *params = content_type.split(b';')
+    if media_type.strip().lower() != b'multipart/form-data':
+        return None
+    for param in params:
+        name, _, value = param.strip().partition(b'=')
+        if name.lower() == b'boundary' and value:
+            return value.strip(b'"')
+    return None
+
+
+def get_request_fingerprint(
+        method: str, path: str, query_string: bytes, body: bytes, content_type: bytes = b'',
+) -> str:
+    boundary = get_multipart_boundary(content_type)
+    if boundary:
+        # Same fields sent again come with another boundary
+        body = body.replace(b'--' + boundary, b'--')
+    return hashlib.sha256(b'\n'.join((method.encode(), path.encode(), query_string, body))).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Keep stored responses and in-flight locks in redis
+    """
+    __slots__ = ('redis',)
+
+    def __init__(self, aioredis_instance):
+        self.redis = aioredis_instance
+
+    async def get(self, scope: str, key: str) -> Optional[dict]:
+        record = await self.redis.get(IDEMPOTENCY_KEY.format(scope=scope, key=key))
+        if record is None:
+            return None
+        return json.loads(record)
+
+    async def save(self, scope: str, key: str, record: dict) -> None:
+        await self.redis.set(
+            IDEMPOTENCY_KEY.format(scope=scope, key=key), json.dumps(record),
+            ex=settings.IDEMPOTENCY_EXPIRE_SECONDS,
+        )
+
+    async def acquire(self, scope: str, key: str) -> Optional[str]:
+        """
+        Take the in-flight lock, return its token or None when another request holds it
+        """
+        token = secrets.token_hex(16)
+        if await self.redis.set(
+            IDEMPOTENCY_LOCK_KEY.format(scope=scope, key=key), token, nx=True,
+            ex=settings.IDEMPOTENCY_LOCK_SECONDS,
+        ):
+            return token
+        return None
+
+    async def refresh(self, scope: str, key: str, token: str) -> bool:
+        return await self.if_owner(
+            scope, key, token, lambda pipe, name: pipe.expire(name, settings.IDEMPOTENCY_LOCK_SECONDS),
+        )
+
+    async def release(self, scope: str, key: str, token: str) -> bool:
+        return await self.if_owner(scope, key, token, lambda pipe, name: pipe.delete(name))
+
+    async def if_owner(self, scope: str, key: str, token: str, command: Callable) -> bool:
+        """
+        Run command on the lock only while it still holds token, an expired lock may belong to another request
+        """
+        name = IDEMPOTENCY_LOCK_KEY.format(scope=scope, key=key)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(name)
+                if await pipe.get(name) != token:
+                    return False
+                pipe.multi()
+                command(pipe, name)
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+
+@dataclass
+class IdempotencyMiddleware:
+    app: ASGIApp
+    route_names: Sequence[str] = ()
+    _routes: Optional[list] = field(default=None, init=False)
+
+    def get_routes(self, scope: Scope) -> list:
+        if self._routes is None:
+            names = set(self.route_names)
+            self._routes = [route for route in scope['app'].router.routes if getattr(route, 'name', None) in names]
+        return self._routes
+
+    def is_idempotent_route(self, scope: Scope) -> bool:
+        return any(route.matches(scope)[0] == Match.FULL for route in self.get_routes(scope))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] not in MUTATION_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope['headers'])
+        key = headers.get(IDEMPOTENCY_HEADER.lower().encode())
+        if not key or not self.is_idempotent_route(scope):
+            await self.app(scope, receive, send)
+            return
+
+        key = key.decode('latin-1')
+        # Same key of another user is another request
+        credentials = headers.get(b'authorization') or headers.get(b'cookie') or b''
+        key_scope = hashlib.sha256(credentials).hexdigest()
+        body = await read_body(receive)
+        fingerprint = get_request_fingerprint(
+            scope['method'], scope['path'], scope.get('query_string', b''), body,
+            headers.get(b'content-type', b''),
+        )
+        store = IdempotencyStore(scope['app'].aioredis_instance)
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        record = await store.get(key_scope, key)
+        token = None
+        # A concurrent duplicate holds the lock, wait for its response or for the key to be released
+        while record is None:
+            token = await store.acquire(key_scope, key)
+            if token is not None:
+                break
+            if time.monotonic() >= deadline:
+                response = ORJSONResponse(
+                    status_code=HTTP_409_CONFLICT,
+                    content={'detail': 'A request with this Idempotency-Key is still in progress'},
+                )
+                await response(scope, receive, send)
+                return
+            await asyncio.sleep(POLL_INTERVAL)
+            record = await store.get(key_scope, key)
+
+        if record is not None:
+            if record['fingerprint'] != fingerprint:
+                response = ORJSONResponse(
+                    status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+                    content={'detail': 'Idempotency-Key was already used for another request'},
+                )
+                await response(scope, receive, send)
+                return
+            await replay(record, send)
+            return
+
+        keep_lock = asyncio.create_task(self.keep_lock(store, key_scope, key, token))
+        try:
+            await self.run(scope, body, receive, send, store, key_scope, key, fingerprint)
+        finally:
+            keep_lock.cancel()
+            await store.release(key_scope, key, token)
+
+    @staticmethod
+    async def keep_lock(store: IdempotencyStore, key_scope: str, key: str, token: str) -> None:
+        # Slow request must not let a duplicate in once the lock expires
+        while True:
+            await asyncio.sleep(settings.IDEMPOTENCY_LOCK_SECONDS / 3)
+            if not await store.refresh(key_scope, key, token):
+                return
+
+    async def run(
+            self, scope: Scope, body: bytes, receive: Receive, send: Send, store: IdempotencyStore,
+            key_scope: str, key: str, fingerprint: str,
+    ) -> None:
+        body_sent = False
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        start: Optional[Message] = None
+        chunks = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+            await send(message)
+
+        await self.app(scope, receive_body, send_wrapper)
+        if start is not None and 200 <= start['status'] < 300:
+            await store.save(key_scope, key, {
+                'fingerprint': fingerprint,
+                'status': start['status'],
+                'headers': [[name.decode('latin-1'), value.decode('latin-1')] for name, value in start['headers']],
+                'body': base64.b64encode(b''.join(chunks)).decode(),
+            })
+
+
+async def read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def replay(record: dict, send: Send) -> None:
+    headers = [(name.encode('latin-1'), value.encode('latin-1')) for name, value in record['headers']]
+    headers.append((IDEMPOTENCY_REPLAYED_HEADER.lower().encode(), b'true'))
+    await send({'type': 'http.response.start', 'status': record['status'], 'headers': headers})
+    await send({'type': 'http.response.body', 'body': base64.b64decode(record['body'])})
@@ -0,0 +1,172 @@
+"""
+Prometheus instrumentation.
+
+Under gunicorn set ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory shared by
+the workers, every worker then writes its samples to that directory and
+``/metrics`` aggregates them. ``prometheus_client`` is optional, without it
+every helper here is a no-op and ``/metrics`` is disabled.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from redis.client import Redis
+from redis.asyncio import Redis as AIORedis
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram, multiprocess
+except ImportError:  # pragma: nocover
+    prometheus_client = None  # type: ignore
+
+__all__ = (
+    'prometheus_client', 'PrometheusMiddleware', 'InstrumentedRedis', 'InstrumentedAIORedis',
+    'observe_pools', 'record_cache', 'record_task_enqueued', 'record_compiled_cache',
+    'record_plugin_hook', 'generate_latest', 'mark_process_dead',
+)
+
+UNMATCHED_ROUTE = 'unmatched'
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = Histogram(
+        'http_request_duration_seconds', 'HTTP request latency by route name',
+        ('route', 'method', 'status'),
+    )
+    REQUESTS_IN_PROGRESS = Gauge(
+        'http_requests_in_progress', 'HTTP requests being processed',
+        ('method',), multiprocess_mode='livesum',
+    )
+    DB_POOL_SIZE = Gauge(
+        'db_pool_size', 'SQLAlchemy pool size', ('engine',), multiprocess_mode='livesum',
+    )
+    DB_POOL_CHECKED_OUT = Gauge(
+        'db_pool_checked_out', 'SQLAlchemy pool checked out connections', ('engine',),
+        multiprocess_mode='livesum',
+    )
+    DB_POOL_OVERFLOW = Gauge(
+        'db_pool_overflow', 'SQLAlchemy pool overflow connections', ('engine',),
+        multiprocess_mode='livesum',
+    )
+    REDIS_LATENCY = Histogram(
+        'redis_command_duration_seconds', 'Redis command latency', ('client', 'command'),
+        buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1),
+    )
+    CELERY_TASKS_ENQUEUED = Counter(
+        'celery_tasks_enqueued_total', 'Celery tasks published', ('task', 'queue'),
+    )
+    CACHE_REQUESTS = Counter(
+        'cache_requests_total', 'Cache lookups by result', ('cache', 'result'),
+    )
+    COMPILED_CACHE = Counter(
+        'sqlalchemy_compiled_cache_total', 'SQLAlchemy compiled statement cache results',
+        ('repository', 'result'),
+    )
+    PLUGIN_HOOK_LATENCY = Histogram(
+        'plugin_hook_duration_seconds', 'Plugin hook latency by result', ('plugin', 'hook', 'result'),
+        buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+    )
+
+
+@dataclass
+class PrometheusMiddleware:
+    """
+    Measure request latency labelled by route name, path is never used as label
+    """
+    app: ASGIApp
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or prometheus_client is None:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            REQUEST_LATENCY.labels(
+                getattr(route, 'name', None) or UNMATCHED_ROUTE, method, str(status_code)
+            ).observe(time.perf_counter() - start)
+            in_progress.dec()
+
+
+class InstrumentedRedis(Redis):
+    def execute_command(self, *args, **options):
+        if prometheus_client is None:
+            return super().execute_command(*args, **options)
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels('sync', str(args[0]).upper()).observe(time.perf_counter() - start)
+
+
+class InstrumentedAIORedis(AIORedis):
+    async def execute_command(self, *args, **options):
+        if prometheus_client is None:
+            return await super().execute_command(*args, **options)
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels('async', str(args[0]).upper()).observe(time.perf_counter() - start)
+
+
+def observe_pools(pools: dict) -> None:
+    """
+    Update pool gauges from SystemSampler snapshot pools section
+    """
+    if prometheus_client is None:
+        return
+    for engine_name, stats in pools.items():
+        if not stats:
+            continue
+        DB_POOL_SIZE.labels(engine_name).set(stats['size'])
+        DB_POOL_CHECKED_OUT.labels(engine_name).set(stats['checked_out'])
+        DB_POOL_OVERFLOW.labels(engine_name).set(max(stats['overflow'], 0))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    if prometheus_client is not None:
+        CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_compiled_cache(repository: str, result: str) -> None:
+    if prometheus_client is not None:
+        COMPILED_CACHE.labels(repository, result).inc()
+
+
+def record_task_enqueued(task: str, queue: Optional[str]) -> None:
+    if prometheus_client is not None:
+        CELERY_TASKS_ENQUEUED.labels(task, queue or 'default').inc()
+
+
+def record_plugin_hook(plugin: str, hook: str, result: str, duration: float) -> None:
+    if prometheus_client is not None:
+        PLUGIN_HOOK_LATENCY.labels(plugin, hook, result).observe(duration)
+
+
+def generate_latest() -> bytes:
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return prometheus_client.generate_latest(registry)
+    return prometheus_client.generate_latest()
+
+
+def mark_process_dead(pid: int) -> None:
+    if prometheus_client is not None and 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
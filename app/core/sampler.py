@@ -0,0 +1,131 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Optional
+
+import psutil
+from loguru import logger
+
+from app.conf.config import settings
+from app.core.metrics import observe_pools
+
+__all__ = ('SystemSampler', 'system_sampler', 'get_pool_stats')
+
+
+def get_pool_stats(pool) -> dict:
+    """
+    Return connection pool usage, pools without queue (NullPool, StaticPool) return empty dict
+    :param pool: sqlalchemy pool
+    :return:
+    """
+    if not hasattr(pool, 'checkedout'):
+        return {}
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+    }
+
+
+class SystemSampler:
+    """
+    Collect system, process and db pool stats in background into ring buffer,
+    so readers never wait for psutil sampling interval
+    """
+
+    def __init__(self, interval: float, history_size: int):
+        self.interval = interval
+        self.history = deque(maxlen=history_size)
+        self.process = psutil.Process(os.getpid())
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def latest(self) -> Optional[dict]:
+        return self.history[-1] if self.history else None
+
+    def collect(self) -> dict:
+        # Both engines are imported lazily to keep module importable without database settings
+        from app.db.session import async_engine, engine
+        from app.db.routing import replica_router
+
+        virtual_memory = psutil.virtual_memory()
+        disk_usage = psutil.disk_usage('/')
+        now = time.time()
+        with self.process.oneshot():
+            process = {
+                'pid': self.process.pid,
+                'cpu_percent': self.process.cpu_percent(interval=None),
+                'rss': self.process.memory_info().rss,
+                'num_threads': self.process.num_threads(),
+                'num_fds': self.process.num_fds() if hasattr(self.process, 'num_fds') else None,
+            }
+        return {
+            'timestamp': now,
+            # Without interval psutil compares with the previous call, it never sleeps
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory': {
+                'total': virtual_memory.total,
+                'used': virtual_memory.used,
+                'available': virtual_memory.available,
+                'percent': virtual_memory.percent,
+            },
+            'disk': {
+                'total': disk_usage.total,
+                'used': disk_usage.used,
+                'free': disk_usage.free,
+                'percent': disk_usage.percent,
+            },
+            'uptime_seconds': now - psutil.boot_time(),
+            'process': process,
+            'pools': {
+                'async': get_pool_stats(async_engine.pool),
+                'sync': get_pool_stats(engine.pool),
+            },
+            # Refreshes replica lag used by read routing
+            'replicas': replica_router.check(),
+        }
+
+    async def sample(self) -> dict:
+        snapshot = await asyncio.to_thread(self.collect)
+        self.history.append(snapshot)
+        observe_pools(snapshot['pools'])
+        return snapshot
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sample()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"System sampler failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+        # First call of cpu_percent without interval always returns 0.0, prime counters
+        psutil.cpu_percent(interval=None)
+        self.process.cpu_percent(interval=None)
+        self._task = asyncio.create_task(self._run(), name='system-sampler')
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+system_sampler = SystemSampler(
+    interval=settings.SYSTEM_SAMPLER_INTERVAL,
+    history_size=settings.SYSTEM_SAMPLER_HISTORY_SIZE,
+)
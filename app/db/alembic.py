@@ -5,8 +5,10 @@ from app.contrib.config.models import Config, ConfigTranslation
 from app.contrib.file.models import File, Thumbnail
 from app.contrib.message.models import Message
 from app.contrib.account.models import (
-    User, UserSession, ExternalAccount, UserAddress, UserPhone
+    User, UserSession, ExternalAccount, Address, UserPhone
 )
-from app.contrib.order.models import Order, Invoice, OrderNote
+from app.contrib.order.models import Order, OrderNote
 from app.contrib.policy.models import PolicyTranslation
-from app.contrib.slider.models import Slider, SliderTranslation
\ No newline at end of file
+from app.contrib.slider.models import Slider, SliderTranslation
+from app.contrib.payment.models import Payment, Transaction, PaymentAttachment
+from app.contrib.wallet.models import Wallet, WalletEntry, WalletBalanceSnapshot
@@ -0,0 +1,186 @@
+"""
+Per-request SQL instrumentation.
+
+Listeners on ``before_cursor_execute``/``after_cursor_execute`` attribute every
+statement to the ``QueryStats`` of the current request (or ``track_queries``
+block) through a contextvar. Async sessions run their statements in a greenlet
+sharing the caller context, so the same listeners cover ``async_engine``.
+"""
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional, Iterator
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import (
+    CACHE_HIT, CACHE_MISS, CACHING_DISABLED, NO_CACHE_KEY, NO_DIALECT_SUPPORT
+)
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+from app.conf.config import settings
+from app.core.metrics import record_compiled_cache
+
+__all__ = (
+    'QueryStats', 'get_query_stats', 'track_queries',
+    'enable_query_instrumentation', 'QueryInstrumentationMiddleware',
+    'compiled_cache_stats', 'enable_compiled_cache_stats', 'get_compiled_cache_report',
+)
+
+CACHE_RESULTS = {
+    CACHE_HIT: 'hit',
+    CACHE_MISS: 'miss',
+    CACHING_DISABLED: 'disabled',
+    NO_CACHE_KEY: 'no_key',
+    NO_DIALECT_SUPPORT: 'unsupported',
+}
+
+# (repository, result) -> statements, repository comes from "repository" execution option
+compiled_cache_stats: Counter = Counter()
+
+_query_stats: ContextVar[Optional["QueryStats"]] = ContextVar('query_stats', default=None)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0
+    statements: Counter = field(default_factory=Counter)
+    durations: defaultdict = field(default_factory=lambda: defaultdict(float))
+
+    def add(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        # Statements are already parametrized, the text is the statement shape
+        self.statements[statement] += 1
+        self.durations[statement] += duration
+
+    def n_plus_one_candidates(self, threshold: Optional[int] = None) -> list[tuple[str, int, float]]:
+        """
+        Return statement shapes repeated at least threshold times: (statement, count, total duration)
+        """
+        if threshold is None:
+            threshold = settings.QUERY_N_PLUS_ONE_THRESHOLD
+        return [
+            (statement, count, self.durations[statement])
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _query_stats.get() is not None:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    if stats is None:
+        return
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    stats.add(statement, time.perf_counter() - start_times.pop())
+
+
+def enable_query_instrumentation(*engines: Engine) -> None:
+    """
+    Register listeners on sync engines, pass ``async_engine.sync_engine`` for async engine
+    """
+    for engine in engines:
+        if event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+            continue
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _count_compiled_cache(conn, cursor, statement, parameters, context, executemany):
+    if context is None or context.compiled is None:
+        return
+    repository = context.execution_options.get('repository', 'other')
+    result = CACHE_RESULTS.get(context.cache_hit, 'unknown')
+    compiled_cache_stats[(repository, result)] += 1
+    record_compiled_cache(repository, result)
+
+
+def enable_compiled_cache_stats(*engines: Engine) -> None:
+    """
+    Count compiled statement cache results per repository
+    """
+    for engine in engines:
+        if not event.contains(engine, 'after_cursor_execute', _count_compiled_cache):
+            event.listen(engine, 'after_cursor_execute', _count_compiled_cache)
+
+
+def get_compiled_cache_report() -> list[dict]:
+    report = {}
+    for (repository, result), count in compiled_cache_stats.items():
+        report.setdefault(repository, {'repository': repository, 'hit': 0, 'miss': 0})
+        report[repository][result] = report[repository].get(result, 0) + count
+    for row in report.values():
+        total = sum(v for k, v in row.items() if k != 'repository')
+        row['hit_ratio'] = row['hit'] / total if total else 0
+    return sorted(report.values(), key=lambda i: i['hit_ratio'])
+
+
+def report_query_stats(stats: QueryStats, method: str, path: str) -> None:
+    candidates = stats.n_plus_one_candidates()
+    if (
+            stats.count < settings.QUERY_COUNT_WARNING_THRESHOLD
+            and stats.duration < settings.QUERY_TIME_WARNING_THRESHOLD
+            and not candidates
+    ):
+        return
+    logger.warning(
+        f"{method} {path}: {stats.count} queries in {stats.duration * 1000:.2f}ms"
+    )
+    for statement, count, duration in candidates:
+        logger.warning(
+            f"Possible N+1 in {method} {path}: executed {count} times, "
+            f"{duration * 1000:.2f}ms total: {statement}"
+        )
+
+
+@dataclass
+class QueryInstrumentationMiddleware:
+    app: ASGIApp
+    server_timing: bool = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if self.server_timing and message['type'] == 'http.response.start':
+                message.setdefault('headers', [])
+                message['headers'] = list(message['headers']) + [
+                    (b'server-timing', stats.server_timing().encode('latin-1'))
+                ]
+            await send(message)
+
+        with track_queries() as stats:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                report_query_stats(stats, scope['method'], scope['path'])
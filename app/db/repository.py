@@ -1,19 +1,24 @@
 from typing import (
     Generic, Optional, Type, TypeVar, Union, Any, TYPE_CHECKING, Iterable,
-    Dict, Sequence
+    Dict, Sequence, Iterator, AsyncIterator
 )
+from time import perf_counter
 from uuid import UUID, uuid4
-from sqlalchemy import func, select, text, delete, Select, update
+from sqlalchemy import func, select, delete, Select, update
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import QueryableAttribute
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 
+from app.conf.config import settings
 from app.core.exceptions import DocumentRawNotFound
 from app.core.enums import Choices
 from app.utils.slugify import slugify
 
 from .models import Base
+from .slow_query import slow_query_log
+from .routing import replica_router
 
 if TYPE_CHECKING:
     from sqlalchemy.orm import Session
@@ -36,6 +41,24 @@ def get_slug_string(obj_in: dict,
     return slugify(slug_in)
 
 
+def get_order_by(model: Type[ModelType], order_by: Iterable[str]) -> tuple:
+    """
+    Convert "field"/"-field" strings to model column clauses
+    :param model:
+    :param order_by:
+    :raise ValueError: name is not a mapped attribute of model
+    :return:
+    """
+    sort = []
+    for field in order_by:
+        name = field[1:] if field.startswith('-') else field
+        column = getattr(model, name, None)
+        if not isinstance(column, QueryableAttribute):
+            raise ValueError(f"{model.__name__} cannot be ordered by {name!r}")
+        sort.append(column.desc() if field.startswith('-') else column.asc())
+    return tuple(sort)
+
+
 def prepare_data_with_slug_sync(
         db: "Session",
         obj_in: dict,
@@ -101,6 +124,14 @@ class CRUDBaseSync(Generic[ModelType]):
         self.model = model
         self.primary_field = primary_field
 
+    def _execute(self, db: "Session", stmt: Select):
+        bind = replica_router.get_bind(stmt, is_async=False)
+        return db.execute(
+            stmt,
+            execution_options={'repository': self.model.__name__},
+            bind_arguments={'bind': bind} if bind is not None else None,
+        )
+
     def first(
             self,
             db: "Session",
@@ -128,7 +159,7 @@ class CRUDBaseSync(Generic[ModelType]):
             stmt = stmt.filter_by(**params)
         if order_by:
             stmt = stmt.order_by(*order_by)
-        return db.execute(stmt).scalars().first()
+        return self._execute(db, stmt).scalars().first()
 
     def create(self, db: "Session", obj_in: dict) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in, custom_encoder={Choices: lambda x: x.value})
@@ -158,7 +189,7 @@ class CRUDBaseSync(Generic[ModelType]):
             stmt = stmt.filter(*expressions)
         if params:
             stmt = stmt.filter_by(**params)
-        return db.execute(stmt).scalar_one()
+        return self._execute(db, stmt).scalar_one()
 
     def exists(
             self, db: "Session",
@@ -177,7 +208,7 @@ class CRUDBaseSync(Generic[ModelType]):
             stmt = stmt.filter(*expressions)
         if params:
             stmt = stmt.filter_by(**params)
-        return db.execute(select(stmt.exists())).scalar_one()
+        return self._execute(db, select(stmt.exists())).scalar_one()
 
     def get_all(
             self,
@@ -213,12 +244,46 @@ class CRUDBaseSync(Generic[ModelType]):
         if not order_by:
             sort = (getattr(self.model, self.primary_field).desc(),)
         else:
-            sort = tuple(text(f'{i[1:]} DESC') if i.startswith('-') else text(f'{i} ASC') for i in order_by)
+            sort = get_order_by(self.model, order_by)
         stmt = stmt.order_by(*sort).offset(offset=offset).limit(limit=limit)
 
-        result = db.execute(stmt).scalars().fetchall()
+        result = self._execute(db, stmt).scalars().fetchall()
         return result
 
+    def stream(
+            self,
+            db: "Session",
+            *,
+            q: Optional[dict] = None,
+            order_by: Optional[Iterable[str]] = None,
+            options: Optional[Iterable] = None,
+            expressions: Optional[Iterable] = None,
+            yield_per: Optional[int] = None,
+    ) -> Iterator[ModelType]:
+        """
+        Iterate objects with server side cursor, rows are fetched yield_per at a time
+        :param db:
+        :param q:
+        :param order_by:
+        :param options:
+        :param expressions:
+        :param yield_per: default EXPORT_YIELD_PER
+        :return:
+        """
+        stmt = select(self.model)
+        if options:
+            stmt = stmt.options(*options)
+        if expressions:
+            stmt = stmt.filter(*expressions)
+        if q:
+            stmt = stmt.filter_by(**q)
+        if not order_by:
+            sort = (getattr(self.model, self.primary_field).desc(),)
+        else:
+            sort = get_order_by(self.model, order_by)
+        stmt = stmt.order_by(*sort).execution_options(yield_per=yield_per or settings.EXPORT_YIELD_PER)
+        yield from self._execute(db, stmt).scalars()
+
     def get_by_params(
             self, db: "Session",
             stmt: Optional[Select] = None,
@@ -240,9 +305,9 @@ class CRUDBaseSync(Generic[ModelType]):
             stmt = stmt.options(*options)
         if expressions:
             stmt = stmt.filter(*expressions)
-        if paremts:
+        if params:
             stmt = stmt.filter_by(**params)
-        result = db.execute(stmt)
+        result = self._execute(db, stmt)
         return result.scalar_one()
 
     def get(
@@ -258,7 +323,7 @@ class CRUDBaseSync(Generic[ModelType]):
         :param options:
         :return:
         """
-        result = db.execute(select(self.model).options(*options).where(self.model.id == obj_id))
+        result = self._execute(db, select(self.model).options(*options).where(self.model.id == obj_id))
 
         return result.scalar_one()
 
@@ -317,6 +382,27 @@ class CRUDBase(Generic[ModelType]):
         self.model = model
         self.primary_field = primary_field
 
+    async def _execute(self, async_db: "AsyncSession", stmt: Select, method: str):
+        """
+        Execute read statement on a replica when routing allows it,
+        statements slower than SLOW_QUERY_THRESHOLD go to slow query log
+        :param async_db:
+        :param stmt:
+        :param method: repository method name used in slow query log
+        :return:
+        """
+        bind = replica_router.get_bind(stmt, is_async=True)
+        start = perf_counter()
+        result = await async_db.execute(
+            stmt,
+            execution_options={'repository': self.model.__name__},
+            bind_arguments={'bind': bind} if bind is not None else None,
+        )
+        duration = perf_counter() - start
+        if duration >= settings.SLOW_QUERY_THRESHOLD:
+            slow_query_log.record(self.__class__.__name__, method, stmt, duration)
+        return result
+
     async def count(
             self, async_db: "AsyncSession", *,
             expressions: Optional[list] = None,
@@ -338,7 +424,7 @@ class CRUDBase(Generic[ModelType]):
             stmt = stmt.filter(*expressions)
         if params:
             stmt = stmt.filter_by(**params)
-        result = await async_db.execute(stmt)
+        result = await self._execute(async_db, stmt, 'count')
         return result.scalar_one()
 
     async def exists(
@@ -360,7 +446,7 @@ class CRUDBase(Generic[ModelType]):
             stmt = stmt.filter(*expressions)
         if params:
             stmt = stmt.filter_by(**params)
-        result = await async_db.execute(select(stmt.exists()))
+        result = await self._execute(async_db, select(stmt.exists()), 'exists')
         return result.scalar_one()
 
     async def get_by_params(
@@ -393,7 +479,7 @@ class CRUDBase(Generic[ModelType]):
             stmt = stmt.filter(*expressions)
         if params:
             stmt = stmt.filter_by(**params)
-        result = await async_db.execute(stmt)
+        result = await self._execute(async_db, stmt, 'get_by_params')
         try:
             if is_scalar:
                 return result.scalar_one()
@@ -428,7 +514,7 @@ class CRUDBase(Generic[ModelType]):
         if order_by:
             stmt = stmt.order_by(*order_by)
 
-        result = await async_db.execute(stmt)
+        result = await self._execute(async_db, stmt, 'first')
         return result.scalars().first()
 
     async def get(
@@ -436,19 +522,25 @@ class CRUDBase(Generic[ModelType]):
             async_db: "AsyncSession",
             obj_id: Union[int, UUID],
             options: Optional[Iterable] = None,
+            with_for_update: Optional[bool] = False,
+            skip_locked: Optional[bool] = False,
     ) -> ModelType:
         """
         Retrieve obj, if it does not exist raise exception
         :param async_db:
         :param options:
         :param obj_id:
+        :param with_for_update: SELECT ... FOR UPDATE on the primary, refreshes obj already in session
+        :param skip_locked: with with_for_update, row locked by another transaction is not found
         :return:
         """
 
         stmt = select(self.model)
         if options:
             stmt = stmt.options(*options)
-        result = await async_db.execute(stmt.where(self.model.id == obj_id))
+        if with_for_update:
+            stmt = stmt.with_for_update(skip_locked=skip_locked).execution_options(populate_existing=True)
+        result = await self._execute(async_db, stmt.where(self.model.id == obj_id), 'get')
         try:
             return result.scalar_one()
         except NoResultFound:
@@ -491,15 +583,60 @@ class CRUDBase(Generic[ModelType]):
         if not order_by:
             sort = (getattr(self.model, self.primary_field).desc(),)
         else:
-            sort = tuple(text(f'{i[1:]} DESC') if i.startswith('-') else text(f'{i} ASC') for i in order_by)
+            sort = get_order_by(self.model, order_by)
         stmt = stmt.order_by(*sort).offset(offset=offset)
         if limit:
             stmt = stmt.limit(limit=limit)
-        result = await async_db.execute(stmt)
+        result = await self._execute(async_db, stmt, 'get_all')
         if is_scalar:
             return result.scalars().fetchall()
         return result.fetchall()
 
+    async def stream(
+            self,
+            async_db: "AsyncSession",
+            *,
+            q: Optional[dict] = None,
+            order_by: Optional[Sequence[str]] = None,
+            options: Optional[Sequence] = None,
+            expressions: Optional[Sequence] = None,
+            yield_per: Optional[int] = None,
+    ) -> AsyncIterator[ModelType]:
+        """
+        Iterate objects with server side cursor, rows are fetched yield_per at a time,
+        the session must stay open until iteration ends
+        :param async_db:
+        :param q:
+        :param order_by:
+        :param options:
+        :param expressions:
+        :param yield_per: default EXPORT_YIELD_PER
+        :return:
+        """
+        stmt = select(self.model)
+        if options:
+            stmt = stmt.options(*options)
+        if expressions:
+            stmt = stmt.filter(*expressions)
+        if q:
+            stmt = stmt.filter_by(**q)
+        if not order_by:
+            sort = (getattr(self.model, self.primary_field).desc(),)
+        else:
+            sort = get_order_by(self.model, order_by)
+        stmt = stmt.order_by(*sort)
+        bind = replica_router.get_bind(stmt, is_async=True)
+        result = await async_db.stream_scalars(
+            stmt,
+            execution_options={
+                'repository': self.model.__name__,
+                'yield_per': yield_per or settings.EXPORT_YIELD_PER,
+            },
+            bind_arguments={'bind': bind} if bind is not None else None,
+        )
+        async for obj in result:
+            yield obj
+
     async def create(
             self, async_db: "AsyncSession", obj_in: Union[dict, CreateSchemaType],
             commit: Optional[bool] = True,
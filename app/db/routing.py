@@ -0,0 +1,220 @@
+"""
+Read replica routing.
+
+Read-only repository methods (``get``, ``get_all``, ``count``, ``first``,
+``exists``) run on a replica while the current block is inside
+``read_routing`` and nothing has been written yet, any flush or non-select
+statement pins the rest of the block to the primary (read your writes).
+``DatabaseRoutingMiddleware`` opens such block for safe HTTP methods only, so
+celery tasks, scripts and write requests always stay on the primary.
+
+A block only sees its own writes. So that the next requests of a client see
+them too, a request that wrote sets the ``PRIMARY_PIN_COOKIE`` cookie for
+``DATABASE_PRIMARY_PIN_SECONDS`` and requests carrying it stay on the
+primary. Clients that drop cookies only get read your writes inside one
+request and may read data as old as ``DATABASE_REPLICA_MAX_LAG`` right after
+a write.
+
+Replica lag is refreshed by ``ReplicaRouter.check`` (called from the system
+sampler), replicas behind ``DATABASE_REPLICA_MAX_LAG`` or failing the check
+are skipped until next check.
+"""
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional, Iterator
+
+from loguru import logger
+from sqlalchemy import event, text, Executable
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+from app.conf.config import settings
+
+__all__ = (
+    'RoutingState', 'Replica', 'ReplicaRouter', 'replica_router',
+    'read_routing', 'get_routing_state', 'mark_written', 'DatabaseRoutingMiddleware', 'PRIMARY_PIN_COOKIE',
+)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_PIN_COOKIE = 'db-primary'
+
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_routing_state: ContextVar[Optional["RoutingState"]] = ContextVar('routing_state', default=None)
+
+
+@dataclass
+class RoutingState:
+    written: bool = False
+
+
+def get_routing_state() -> Optional[RoutingState]:
+    return _routing_state.get()
+
+
+@contextmanager
+def read_routing() -> Iterator[RoutingState]:
+    """
+    Allow replica reads until the first write inside the block
+    """
+    state = RoutingState()
+    token = _routing_state.set(state)
+    try:
+        yield state
+    finally:
+        _routing_state.reset(token)
+
+
+def mark_written() -> None:
+    state = _routing_state.get()
+    if state is not None:
+        state.written = True
+
+
+@dataclass
+class Replica:
+    name: str
+    async_engine: AsyncEngine
+    engine: Engine
+    lag: Optional[float] = None
+    checked_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def is_healthy(self) -> bool:
+        # Never checked replica is not trusted
+        return self.lag is not None and self.lag <= settings.DATABASE_REPLICA_MAX_LAG
+
+    def check(self) -> Optional[float]:
+        try:
+            with self.engine.connect() as conn:
+                if conn.dialect.name == 'postgresql':
+                    self.lag = float(conn.execute(POSTGRES_LAG_QUERY).scalar_one())
+                else:
+                    conn.execute(text('SELECT 1'))
+                    self.lag = 0.0
+            self.error = None
+        except Exception as e:
+            logger.warning(f"Replica {self.name} check failed: {e}")
+            self.lag = None
+            self.error = str(e)
+        self.checked_at = time.time()
+        return self.lag
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas: list[Replica] = []
+        self._cycle = itertools.cycle(())
+
+    def add(self, async_engine: AsyncEngine, engine: Engine, name: Optional[str] = None) -> Replica:
+        replica = Replica(name=name or f'replica-{len(self.replicas)}', async_engine=async_engine, engine=engine)
+        self.replicas.append(replica)
+        self._cycle = itertools.cycle(self.replicas)
+        return replica
+
+    def check(self) -> dict[str, dict]:
+        """
+        Refresh lag of every replica, blocking, run it in a thread from async code
+        """
+        return {
+            replica.name: {
+                'lag': replica.check(),
+                'healthy': replica.is_healthy,
+                'error': replica.error,
+            }
+            for replica in self.replicas
+        }
+
+    def choose(self) -> Optional[Replica]:
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            if replica.is_healthy:
+                return replica
+        return None
+
+    def get_bind(self, stmt: Executable, is_async: bool) -> Optional[Engine]:
+        """
+        Return replica engine for read statement, None means primary (session default bind)
+        :param stmt: statement, locking reads stay on the primary
+        :param is_async: replica engine for AsyncSession (its sync_engine) or for Session
+        :return:
+        """
+        state = _routing_state.get()
+        if state is None or state.written or not self.replicas:
+            return None
+        if getattr(stmt, '_for_update_arg', None) is not None:
+            return None
+        replica = self.choose()
+        if replica is None:
+            return None
+        return replica.async_engine.sync_engine if is_async else replica.engine
+
+
+replica_router = ReplicaRouter()
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    mark_written()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _do_orm_execute(orm_execute_state):
+    if not orm_execute_state.is_select:
+        mark_written()
+
+
+@dataclass
+class DatabaseRoutingMiddleware:
+    app: ASGIApp
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        pin = bool(settings.DATABASE_REPLICA_URLS) and settings.DATABASE_PRIMARY_PIN_SECONDS > 0
+        if scope['method'] not in SAFE_METHODS:
+            await self.app(scope, receive, self.pin_send(send) if pin else send)
+            return
+        if pin and PRIMARY_PIN_COOKIE in get_cookies(scope):
+            # Client wrote recently, replicas may not have it yet
+            await self.app(scope, receive, send)
+            return
+        with read_routing() as state:
+            await self.app(scope, receive, self.pin_send(send, state) if pin else send)
+
+    @staticmethod
+    def pin_send(send: Send, state: Optional[RoutingState] = None) -> Send:
+        """
+        Add pin cookie to the response, of every response or of the one whose request wrote when state is given
+        """
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start' and (state is None or state.written):
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    'set-cookie',
+                    f'{PRIMARY_PIN_COOKIE}=1; Max-Age={settings.DATABASE_PRIMARY_PIN_SECONDS}; '
+                    f'Path=/; HttpOnly; SameSite=Lax',
+                )
+            await send(message)
+
+        return send_wrapper
+
+
+def get_cookies(scope: Scope) -> dict[str, str]:
+    for name, value in scope['headers']:
+        if name == b'cookie':
+            return cookie_parser(value.decode('latin-1'))
+    return {}
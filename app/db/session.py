@@ -1,15 +1,80 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import create_engine, event
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker, AsyncEngine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 
 from app.conf.config import settings
 
 from .mptt.events import TreesManager
 from .mptt.mixins import BaseNestedSets
-async_engine = create_async_engine(str(settings.DATABASE_URL), pool_pre_ping=True, echo=False)
+from .routing import replica_router
+
+
+def get_server_settings(is_async: bool = True) -> dict[str, str]:
+    server_settings = {}
+    statement_timeout = settings.DATABASE_STATEMENT_TIMEOUT if is_async else settings.DATABASE_TASK_STATEMENT_TIMEOUT
+    if statement_timeout is not None:
+        server_settings['statement_timeout'] = str(statement_timeout)
+    if not settings.DATABASE_JIT:
+        server_settings['jit'] = 'off'
+    server_settings.update({key: str(value) for key, value in settings.DATABASE_SERVER_SETTINGS.items()})
+    return server_settings
+
+
+def get_engine_options(is_async: bool) -> dict:
+    """
+    Return create_engine keyword arguments of pool profile from settings
+    :param is_async: asyncpg receives server_settings, psycopg2 receives "-c" options
+    :return:
+    """
+    server_settings = get_server_settings(is_async)
+    if is_async:
+        connect_args = {
+            'prepared_statement_cache_size': settings.DATABASE_PREPARED_STATEMENT_CACHE_SIZE,
+            'server_settings': server_settings,
+        }
+    else:
+        connect_args = {
+            'options': ' '.join(f'-c {key}={value}' for key, value in server_settings.items()),
+        }
+    return {
+        'pool_size': settings.DATABASE_POOL_SIZE,
+        'max_overflow': settings.DATABASE_MAX_OVERFLOW,
+        'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+        'connect_args': connect_args,
+    }
+
+
+async def warmup_pool(async_engine_: AsyncEngine, size: int) -> int:
+    """
+    Open up to size connections concurrently and return them to the pool,
+    so first requests do not pay for connect, authentication and type introspection
+    :return: number of warmed connections
+    """
+    size = min(size, async_engine_.pool.size())
+
+    async def connect():
+        async with async_engine_.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+
+    results = await asyncio.gather(*(connect() for _ in range(size)), return_exceptions=True)
+    return len([result for result in results if not isinstance(result, BaseException)])
+
+
+async_engine = create_async_engine(str(settings.DATABASE_URL), echo=False, **get_engine_options(is_async=True))
 
 db_uri = str(settings.DATABASE_URL).replace('+asyncpg', '')
-engine = create_engine(db_uri, pool_pre_ping=True, echo=False)
+engine = create_engine(db_uri, echo=False, **get_engine_options(is_async=False))
+
+for replica_url in settings.DATABASE_REPLICA_URLS:
+    replica_router.add(
+        create_async_engine(str(replica_url), echo=False, **get_engine_options(is_async=True)),
+        create_engine(str(replica_url).replace('+asyncpg', ''), echo=False, **get_engine_options(is_async=False)),
+        name='{host}:{port}'.format(**replica_url.hosts()[0]),
+    )
 
 
 tree_manager = TreesManager(BaseNestedSets)
@@ -0,0 +1,124 @@
+"""
+Slow query log for repository calls.
+
+Statements slower than ``SLOW_QUERY_THRESHOLD`` are kept in a per-process ring
+buffer together with per-shape aggregates. The plan is captured in background
+with ``EXPLAIN (ANALYZE off, FORMAT JSON)`` through the sync engine, so the
+request that was already slow does not wait for it.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional, Any
+
+from loguru import logger
+from sqlalchemy import Executable
+
+from app.conf.config import settings
+
+__all__ = ('SlowQueryLog', 'slow_query_log', 'parameter_shape')
+
+EXPLAIN_PREFIX = 'EXPLAIN (ANALYZE off, FORMAT JSON) '
+
+
+def parameter_shape(params: Optional[dict]) -> dict:
+    """
+    Return bound parameter names with value types, values are never stored
+    """
+    if not params:
+        return {}
+    return {key: type(value).__name__ for key, value in params.items()}
+
+
+class SlowQueryLog:
+    def __init__(self, size: int):
+        self.size = size
+        self.entries = deque(maxlen=size)
+        self.aggregates: dict[tuple[str, str, str], dict] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def record(
+            self,
+            repository: str,
+            method: str,
+            stmt: Executable,
+            duration: float,
+            explain: Optional[bool] = None,
+    ) -> dict:
+        # Imported lazily, the sync engine is only needed to compile and explain
+        from app.db.session import engine
+
+        if explain is None:
+            explain = settings.SLOW_QUERY_EXPLAIN
+        compiled = stmt.compile(dialect=engine.dialect, compile_kwargs={'render_postcompile': True})
+        statement = str(compiled)
+        entry = {
+            'timestamp': time.time(),
+            'repository': repository,
+            'method': method,
+            'statement': statement,
+            'params': parameter_shape(compiled.params),
+            'duration': duration,
+            'plan': None,
+        }
+        self.entries.append(entry)
+
+        key = (repository, method, statement)
+        aggregate = self.aggregates.get(key)
+        if aggregate is None:
+            if len(self.aggregates) >= self.size:
+                # Keep the heaviest shapes only
+                del self.aggregates[min(self.aggregates, key=lambda k: self.aggregates[k]['total'])]
+            aggregate = self.aggregates[key] = {
+                'repository': repository,
+                'method': method,
+                'statement': statement,
+                'params': entry['params'],
+                'count': 0,
+                'total': 0.0,
+                'max': 0.0,
+                'plan': None,
+            }
+        aggregate['count'] += 1
+        aggregate['total'] += duration
+        aggregate['max'] = max(aggregate['max'], duration)
+        entry['plan'] = aggregate['plan']
+
+        logger.warning(f"Slow query {repository}.{method} {duration * 1000:.2f}ms: {statement}")
+        if explain and engine.dialect.name == 'postgresql' and aggregate['plan'] is None:
+            self.schedule_explain(engine, statement, compiled.params, entry, aggregate)
+        return entry
+
+    def schedule_explain(self, engine, statement: str, params: dict, *targets: dict) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.explain(engine, statement, params, *targets))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def explain(engine, statement: str, params: dict, *targets: dict) -> Any:
+        def run():
+            with engine.connect() as conn:
+                return conn.exec_driver_sql(f'{EXPLAIN_PREFIX}{statement}', params).scalar()
+
+        try:
+            plan = await asyncio.to_thread(run)
+        except Exception as e:
+            logger.info(f"Could not explain slow query: {e}")
+            return None
+        for target in targets:
+            target['plan'] = plan
+        return plan
+
+    def top(self, limit: int = 20, order_by: str = 'total') -> list[dict]:
+        return sorted(self.aggregates.values(), key=lambda i: i[order_by], reverse=True)[:limit]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.aggregates.clear()
+
+
+slow_query_log = SlowQueryLog(size=settings.SLOW_QUERY_LOG_SIZE)
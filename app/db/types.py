@@ -0,0 +1,43 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Union
+
+import sqlalchemy as sa
+
+from app.utils.prices import MinorMoney, get_currency_precision
+
+
+class MinorUnits(sa.types.TypeDecorator):
+    """
+    DECIMAL amount read and written as int minor units, scale is the number of minor digits.
+    Binds int or MinorMoney of a currency with that precision, existing DECIMAL amount columns
+    are read as int with type_coerce(column, MinorUnits())
+    """
+    impl = sa.DECIMAL
+    cache_ok = True
+
+    def __init__(self, precision: int = 12, scale: int = 2):
+        super().__init__(precision=precision, scale=scale, asdecimal=True)
+        self.scale = scale
+
+    def process_bind_param(self, value: Optional[Union[int, MinorMoney]], dialect) -> Optional[Decimal]:
+        if value is None:
+            return None
+        if isinstance(value, MinorMoney):
+            if get_currency_precision(value.currency) != self.scale:
+                raise ValueError(f"{value.currency} amounts do not have {self.scale} minor digits")
+            value = value.minor
+        elif not isinstance(value, int) or isinstance(value, bool):
+            raise TypeError(f"Minor units must be int, got {type(value).__name__}")
+        return Decimal(value).scaleb(-self.scale)
+
+    def process_result_value(self, value: Optional[Decimal], dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return int(Decimal(value).scaleb(self.scale).to_integral_value(ROUND_HALF_UP))
+
+
+def to_minor_money(minor: Optional[int], currency: str) -> MinorMoney:
+    """
+    MinorMoney of a MinorUnits value, None is zero like Money
+    """
+    return MinorMoney.from_minor(minor or 0, currency)
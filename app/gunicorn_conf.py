@@ -48,6 +48,12 @@ timeout = int(timeout_str)
 keepalive = int(keepalive_str)
 
 
+def child_exit(server, worker):
+    # Drop live gauges of the dead worker from prometheus multiprocess dir
+    from app.core.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
 # For debugging and testing
 log_data = {
     "loglevel": loglevel,
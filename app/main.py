@@ -1,5 +1,6 @@
+import asyncio
+
 import uvicorn
-import redis
 
 from typing import Optional
 from fastapi import APIRouter, Depends
@@ -8,6 +9,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import ORJSONResponse
 from fastapi.routing import APIRoute
 from fastapi.staticfiles import StaticFiles
+from loguru import logger
 from starlette.middleware import Middleware
 from pydantic import BaseModel
 
@@ -16,6 +18,14 @@ from app.conf.config import settings
 from app.core.exceptions import DocumentRawNotFound
 from app.core.handlers import request_document_raw_not_found_exception, request_http_exception_error
 from app.core.app import FastAPI
+from app.core.sampler import system_sampler
+from app.core.metrics import PrometheusMiddleware, InstrumentedRedis, InstrumentedAIORedis
+from app.core.idempotency import IdempotencyMiddleware, IDEMPOTENCY_REPLAYED_HEADER
+from app.db.instrumentation import (
+    QueryInstrumentationMiddleware, enable_query_instrumentation, enable_compiled_cache_stats
+)
+from app.db.session import async_engine, engine, warmup_pool
+from app.db.routing import DatabaseRoutingMiddleware, replica_router
 from app.utils.translation import load_gettext_translations
 from app.utils.translation.middleware import (
     LocaleFromHeaderMiddleware,
@@ -23,6 +33,8 @@ from app.utils.translation.middleware import (
     LocaleFromQueryParamsMiddleware
 )
 from app.routers.urls import router
+from app.contrib.file.upload import RESUMABLE_UPLOAD_HEADERS
+from app.contrib.plugins.cache import plugin_snapshot_cache
 from app.routers.api import api
 from app.routers.dependency import get_locale
 from app.core.handlers import request_validation_error
@@ -66,6 +78,7 @@ def get_application(
         },
 
         middleware=[
+            Middleware(PrometheusMiddleware),
             Middleware(
                 LocaleFromHeaderMiddleware,
                 language_header=settings.LANGUAGE_HEADER,
@@ -75,6 +88,14 @@ def get_application(
             # Middleware(LocaleFromQueryParamsMiddleware),
         ],
     )
+    enable_compiled_cache_stats(async_engine.sync_engine, engine)
+    if replica_router.replicas:
+        application.add_middleware(DatabaseRoutingMiddleware)
+    if settings.IDEMPOTENT_ROUTES:
+        application.add_middleware(IdempotencyMiddleware, route_names=settings.IDEMPOTENT_ROUTES)
+    if settings.QUERY_INSTRUMENTATION_ENABLED:
+        enable_query_instrumentation(async_engine.sync_engine, engine)
+        application.add_middleware(QueryInstrumentationMiddleware, server_timing=settings.DEBUG)
     if settings.BACKEND_CORS_ORIGINS:
         application.add_middleware(
             CORSMiddleware,
@@ -82,6 +103,7 @@ def get_application(
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=RESUMABLE_UPLOAD_HEADERS + [IDEMPOTENCY_REPLAYED_HEADER],
         )
     else:
         application.add_middleware(
@@ -90,16 +112,17 @@ def get_application(
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=RESUMABLE_UPLOAD_HEADERS + [IDEMPOTENCY_REPLAYED_HEADER],
         )
 
     @application.on_event('startup')
     async def startup():
-        redis_instance = redis.from_url(
+        redis_instance = InstrumentedRedis.from_url(
             settings.REDIS_URL,
             decode_responses=True,
             encoding="utf8",
         )
-        aioredis_instance = redis.asyncio.from_url(
+        aioredis_instance = InstrumentedAIORedis.from_url(
             settings.REDIS_URL,
             decode_responses=True,
             encoding="utf8",
@@ -108,6 +131,21 @@ def get_application(
             redis_instance=redis_instance,
             aioredis_instance=aioredis_instance,
         )
+        plugin_snapshot_cache.configure(aioredis_instance)
+        await system_sampler.start()
+        if settings.DATABASE_POOL_WARMUP:
+            try:
+                warmed = await asyncio.wait_for(
+                    warmup_pool(async_engine, settings.DATABASE_POOL_WARMUP),
+                    timeout=settings.DATABASE_POOL_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                warmed = 0
+            logger.info(f"Database pool warmed with {warmed} connections")
+
+    @application.on_event('shutdown')
+    async def shutdown():
+        await system_sampler.stop()
 
     application.mount("/static", StaticFiles(directory="static", html=True), name="static")
     application.mount("/media", StaticFiles(directory="media", html=True), name="media")
@@ -6,6 +6,7 @@ from app.contrib.file.api import api as file_api
 from app.contrib.message.api import api as message_api
 from app.contrib.order.api import api as order_api
 from app.contrib.config.api import api as config_api
+from app.contrib.export.api import api as export_api
 
 api = APIRouter()
 
@@ -15,3 +16,4 @@ api.include_router(file_api, tags=["file"], prefix="/file")
 api.include_router(message_api, tags=["message"], prefix="/message")
 api.include_router(order_api, tags=["order"], prefix="/order")
 api.include_router(config_api, tags=["config"], prefix="/config")
+api.include_router(export_api, tags=["export"], prefix="/export")
@@ -1,3 +1,4 @@
+import ipaddress
 import json
 
 from typing import Generator, Optional
@@ -13,6 +14,7 @@ from app.contrib.account.schema import TokenPayload, UserSession
 from app.contrib.account.repository import user_repo, user_session_repo
 from app.core.exceptions import HTTPUnAuthorized, HTTPInvalidToken, HTTPPermissionDenied
 from app.core.schema import CommonsModel
+from app.core.metrics import record_cache
 from app.utils.jose import jwt
 from app.db.session import AsyncSessionLocal, SessionLocal
 from app.conf import LanguagesChoices
@@ -22,6 +24,10 @@ from app.utils.translation import get_locale_code
 reusable_oauth2 = OAuth2PasswordBearerWithCookie(tokenUrl=f'{settings.API_V1_STR}/auth/get-token/', auto_error=False)
 
 
+def get_session_cache_key(user_id, jti) -> str:
+    return f'session-{user_id}:{jti.hex}'
+
+
 async def get_redis(request: Request):
     return request.app.redis_instance
 
@@ -72,7 +78,8 @@ async def get_current_user(
     :return:
     """
 
-    user_cache = await aioredis_instance.get(f'session-{token_payload.user_id}:{token_payload.jti}')
+    user_cache = await aioredis_instance.get(get_session_cache_key(token_payload.user_id, token_payload.jti))
+    record_cache('user_session', hit=bool(user_cache))
     if not user_cache:
         user_session = await user_session_repo.first(
             async_db=async_db,
@@ -98,7 +105,9 @@ async def get_current_user(
             "phone": user.phone,
         }
         data_dumps = json.dumps(data)
-        await aioredis_instance.set(name=f"session-{user_id}:{token_payload.jti.hex}", value=data_dumps, ex=3600)
+        await aioredis_instance.set(
+            name=get_session_cache_key(user_id, token_payload.jti), value=data_dumps, ex=3600
+        )
     else:
         data = json.loads(user_cache)
     user_session = UserSession(
@@ -132,6 +141,29 @@ async def get_staff_user(
     raise HTTPPermissionDenied(detail="Staff member required")
 
 
+def is_metrics_network(host: Optional[str]) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+async def get_metrics_access(
+        request: Request,
+        token: Optional[str] = Depends(reusable_oauth2),
+        async_db: AsyncSession = Depends(get_async_db),
+        aioredis_instance=Depends(get_aioredis),
+) -> None:
+    """
+    Scrapers of METRICS_ALLOWED_NETWORKS are let in without token, anyone else must be staff
+    """
+    if request.client and is_metrics_network(request.client.host):
+        return
+    user = await get_current_user(await get_token_payload(token), async_db, aioredis_instance)
+    await get_staff_user(await get_active_user(user))
+
+
 async def get_commons(
         page: Optional[int] = 1,
         limit: Optional[int] = settings.PAGINATION_MAX_SIZE
@@ -1,78 +1,124 @@
 import os
-import psutil
 import time
 import platform
-from typing import Literal
+from typing import Literal, Optional
 
 from fastapi import APIRouter, Form, UploadFile, File, HTTPException, Depends, Query
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 
-from app.utils.file import save_file, delete_file
+from app.conf.config import settings
+from app.utils.file import save_file, delete_file, is_zip, get_release_path, find_release_path, RELEASE_DIR
 
 from app.core.schema import IResponseBase
-from .dependency import get_staff_user
+from app.core.sampler import system_sampler
+from app.core import metrics
+from app.db.slow_query import slow_query_log
+from app.db.instrumentation import get_compiled_cache_report
+from app.db.session import async_engine, engine
+from .dependency import get_staff_user, get_metrics_access
 
 router = APIRouter()
 
-ALLOWED_ZIP_TYPES = {'application/zip', 'application/x-zip-compressed', 'multipart/x-zip'}
+
+def humanize_size(value: int) -> str:
+    return f"{value / (1024 ** 3):.2f} GB"
 
 
 @router.get('/system/', name='system-detail', response_model=dict,
             dependencies=[Depends(get_staff_user)], tags=["system"])
 async def system_detail(
+        history: Optional[bool] = False,
 ):
-    # Get CPU usage
-    cpu_usage = psutil.cpu_percent(interval=1)
-
-    # Get memory info
-    virtual_memory = psutil.virtual_memory()
-    total_memory = virtual_memory.total
-    used_memory = virtual_memory.used
-    free_memory = virtual_memory.available
-
-    # Get disk usage
-    disk_usage = psutil.disk_usage('/')
-    total_disk = disk_usage.total
-    used_disk = disk_usage.used
-    free_disk = disk_usage.free
-
-    # Get system uptime
-    boot_time = psutil.boot_time()
-    current_time = time.time()
-    uptime_seconds = current_time - boot_time
-    uptime_humanized = time.strftime('%H:%M:%S', time.gmtime(uptime_seconds))
-
-    # Get OS information
-    os_name = platform.system()
-    os_version = platform.version()
-    os_release = platform.release()
-
-    return {
-        "cpu_usage": f"{cpu_usage}%",
+    snapshot = system_sampler.latest()
+    if snapshot is None:
+        # Sampler is not started yet, cpu usage since the previous call, never blocks
+        snapshot = await system_sampler.sample()
+
+    uptime_seconds = snapshot['uptime_seconds']
+    result = {
+        "cpu_usage": f"{snapshot['cpu_percent']}%",
         "memory": {
-            "total": f"{total_memory / (1024 ** 3):.2f} GB",
-            "used": f"{used_memory / (1024 ** 3):.2f} GB",
-            "free": f"{free_memory / (1024 ** 3):.2f} GB"
+            "total": humanize_size(snapshot['memory']['total']),
+            "used": humanize_size(snapshot['memory']['used']),
+            "free": humanize_size(snapshot['memory']['available']),
         },
         "disk": {
-            "total": f"{total_disk / (1024 ** 3):.2f} GB",
-            "used": f"{used_disk / (1024 ** 3):.2f} GB",
-            "free": f"{free_disk / (1024 ** 3):.2f} GB"
+            "total": humanize_size(snapshot['disk']['total']),
+            "used": humanize_size(snapshot['disk']['used']),
+            "free": humanize_size(snapshot['disk']['free']),
         },
         "uptime": {
             "seconds": uptime_seconds,
-            "human_readable": uptime_humanized
+            "human_readable": time.strftime('%H:%M:%S', time.gmtime(uptime_seconds))
         },
         "os": {
-            "name": os_name,
-            "version": os_version,
-            "release": os_release
-        }
+            "name": platform.system(),
+            "version": platform.version(),
+            "release": platform.release()
+        },
+        "process": snapshot['process'],
+        "pools": snapshot['pools'],
+        "replicas": snapshot['replicas'],
+        "sampled_at": snapshot['timestamp'],
+    }
+    if history:
+        result["history"] = [
+            {
+                "timestamp": i['timestamp'],
+                "cpu_percent": i['cpu_percent'],
+                "memory_percent": i['memory']['percent'],
+                "process_rss": i['process']['rss'],
+                "pools": i['pools'],
+            } for i in system_sampler.history
+        ]
+    return result
+
+
+@router.get('/system/slow-queries/', name='system-slow-query-list', response_model=dict,
+            dependencies=[Depends(get_staff_user)], tags=["system"])
+async def slow_query_list(
+        limit: Optional[int] = Query(20, ge=1, le=200),
+        order_by: Optional[Literal["total", "max", "count"]] = "total",
+        with_plan: Optional[bool] = False,
+):
+    """
+    Top slow repository statements of this worker process
+    """
+    rows = slow_query_log.top(limit=limit, order_by=order_by)
+    if not with_plan:
+        rows = [{k: v for k, v in row.items() if k != 'plan'} for row in rows]
+    return {
+        "threshold": settings.SLOW_QUERY_THRESHOLD,
+        "pid": os.getpid(),
+        "rows": rows,
     }
 
 
-def is_zip(content_type):
-    return content_type in ALLOWED_ZIP_TYPES
+@router.get('/system/compiled-cache/', name='system-compiled-cache-detail', response_model=dict,
+            dependencies=[Depends(get_staff_user)], tags=["system"])
+async def compiled_cache_detail():
+    """
+    Compiled statement cache results per repository of this worker process
+    """
+    return {
+        "pid": os.getpid(),
+        "cache_size": {
+            "async": len(getattr(async_engine.sync_engine, '_compiled_cache', None) or ()),
+            "sync": len(getattr(engine, '_compiled_cache', None) or ()),
+        },
+        "rows": get_compiled_cache_report(),
+    }
+
+
+@router.get('/metrics', name='metrics', response_class=Response, include_in_schema=False,
+            dependencies=[Depends(get_metrics_access)])
+async def metrics_detail():
+    if metrics.prometheus_client is None:
+        raise HTTPException(status_code=404, detail="Metrics are not enabled")
+    return Response(
+        content=metrics.generate_latest(),
+        media_type=metrics.prometheus_client.CONTENT_TYPE_LATEST
+    )
 
 
 def validate_zip_file(upload_file: "UploadFile") -> bool:
@@ -116,22 +162,19 @@ async def upload_release(
         release_os: Literal["android", "ios"] = Form(...),
 ):
     is_zip_file = validate_zip_file(upload_file)
-    filename = "release-apk"
-
-    if release_os == "ios":
-        filename = "release-ios.zip"
-
-    full_path = f"release/{release_os}/{version}/{filename}.zip"
+    release_path = get_release_path(release_os, version)
 
     # Check if the file exists
-    if os.path.exists(full_path):
+    if find_release_path(release_os, version):
         raise HTTPException(status_code=400, detail="File already exists")
 
+    file_dir, filename = os.path.split(release_path)
+    os.makedirs(f"{RELEASE_DIR}/{file_dir}", exist_ok=True)
     original_file = save_file(
         upload_file,
-        base_dir="release",
-        file_dir=f"{release_os}/{version}",
-        filename=filename,
+        base_dir=RELEASE_DIR,
+        file_dir=file_dir,
+        filename=os.path.splitext(filename)[0],
         extension=".zip",
         with_datetime=False
     )
@@ -184,17 +227,12 @@ async def delete_release_file(
         version: str = Query(..., max_length=10),
         release_os: Literal["android", "ios"] = Query(...),
 ):
-    filename = "release-apk"
-
-    if release_os == "ios":
-        filename = "release-ios.zip"
-
-    full_path = f"{release_os}/{version}/{filename}.zip"
+    full_path = find_release_path(release_os, version)
     # Check if the directory exists
-    if not os.path.exists(f'release/{full_path}'):
+    if full_path is None:
         raise HTTPException(status_code=404, detail="File does not exist")
 
-    delete_file(full_path, base_dir="release")
+    delete_file(full_path, base_dir=RELEASE_DIR)
     return {
         "message": "File deleted",
         "data": full_path
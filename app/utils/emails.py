@@ -1,12 +1,116 @@
-import emails
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, TYPE_CHECKING
 
+import emails
+from emails.backend.smtp import SMTPBackend
 from emails.template import JinjaTemplate
+from loguru import logger
 
 from app.conf.config import settings
 from app.utils.templating import templates
 
+if TYPE_CHECKING:
+    import jinja2
+
+
+class PooledSMTPBackend(SMTPBackend):
+    """
+    SMTP backend keeping its connection between messages, emails reconnects it once
+    when the server drops it in the middle of sendmail
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.last_used = time.monotonic()
+
+    def ping(self) -> bool:
+        if self._client is None:
+            # Not connected yet, connects on first message
+            return True
+        try:
+            return self._client.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+
+class SMTPConnectionPool:
+    """
+    SMTP connections of a worker process, at most ``size`` idle ones are kept.
+    A connection idle for longer than SMTP_KEEPALIVE_SECONDS is checked with NOOP
+    before use and reopened if the server closed it meanwhile
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: list[PooledSMTPBackend] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @staticmethod
+    def get_smtp_options() -> dict:
+        smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT, }
+        if settings.SMTP_TLS:
+            smtp_options["tls"] = True
+        if settings.SMTP_USER:
+            smtp_options["user"] = settings.SMTP_USER
+        if settings.SMTP_PASSWORD:
+            smtp_options["password"] = settings.SMTP_PASSWORD
+        return smtp_options
+
+    def acquire(self) -> PooledSMTPBackend:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker, sockets belong to the parent
+                self._idle, self._pid = [], os.getpid()
+            backend = self._idle.pop() if self._idle else None
+        if backend is None:
+            return PooledSMTPBackend(**self.get_smtp_options())
+        if time.monotonic() - backend.last_used > settings.SMTP_KEEPALIVE_SECONDS and not backend.ping():
+            backend.close()
+        return backend
+
+    def release(self, backend: PooledSMTPBackend) -> None:
+        backend.last_used = time.monotonic()
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(backend)
+                return
+        backend.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledSMTPBackend]:
+        backend = self.acquire()
+        try:
+            yield backend
+        except BaseException:
+            backend.close()
+            raise
+        self.release(backend)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for backend in idle:
+            backend.close()
+
+
+smtp_pool = SMTPConnectionPool(size=settings.SMTP_POOL_SIZE)
+
+
+@lru_cache(maxsize=None)
+def get_email_template(template_name: str) -> "jinja2.Template":
+    """
+    Read and compile template of EMAIL_TEMPLATES_DIR once per process
+    """
+    with open(Path(settings.EMAIL_TEMPLATES_DIR) / template_name) as f:
+        return templates.env.from_string(f.read())
+
 
 def send_email(
         emails_to: List[str],
@@ -22,92 +126,127 @@ def send_email(
         html=JinjaTemplate(html_template, environment=templates.env),
         mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
     )
-
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT, }
-
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(
-        to=emails_to, render=environment, smtp=smtp_options, set_mail_to=True
-    )
+    with smtp_pool.connection() as smtp:
+        response = message.send(
+            to=emails_to, render=environment, smtp=smtp, set_mail_to=True
+        )
 
     return response
 
 
-def send_test_email(emails_to: List[str]) -> None:
-    project_name = settings.PROJECT_NAME
-    subject = f"{project_name} - Test email"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "test_email.html") as f:
-        template_str = f.read()
-    return send_email(
-        emails_to=emails_to,
-        subject_template=subject,
-        html_template=template_str,
-        environment={
+def send_message(smtp: PooledSMTPBackend, data: dict) -> Optional[str]:
+    """
+    Send one message of send_emails
+    :return: error, None when server accepted the message
+    """
+    message = emails.Message(
+        subject=data["subject"],
+        html=get_email_template(data["template_name"]).render(**data["environment"]),
+        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    )
+    response = message.send(to=data["emails_to"], smtp=smtp, set_mail_to=True)
+    if response is None:
+        return "no response"
+    if not response.success:
+        return str(response.error)
+    return None
+
+
+def send_emails(messages: List[dict]) -> List[dict]:
+    """
+    Send messages over one pooled connection, a failing message does not stop the others
+    :param messages: {"emails_to", "subject", "template_name", "environment"}, see get_*_message
+    :return: messages not accepted by server or failed to render
+    """
+    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
+    failed = []
+    with smtp_pool.connection() as smtp:
+        for data in messages:
+            try:
+                error = send_message(smtp, data)
+            except (smtplib.SMTPException, OSError) as e:
+                # Connection state is unknown, the next message reconnects
+                smtp.close()
+                error = repr(e)
+            except Exception as e:
+                error = repr(e)
+            if error is not None:
+                logger.warning(f"Email {data['template_name']} to {data['emails_to']} failed: {error}")
+                failed.append(data)
+    return failed
+
+
+def get_test_message(emails_to: List[str]) -> dict:
+    return {
+        "emails_to": emails_to,
+        "subject": f"{settings.PROJECT_NAME} - Test email",
+        "template_name": "test_email.html",
+        "environment": {
             "project_name": settings.PROJECT_NAME, "emails": emails_to
         },
-    )
+    }
 
 
-def send_reset_password_email(email: str, verification_code: str, ) -> None:
+def get_reset_password_message(email: str, verification_code: str) -> dict:
     project_name = settings.PROJECT_NAME
-
-    subject = "%(project_name)s - Password recovery for user with email %(email)s" % {
-        'project_name': project_name, 'email': email
-    }
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "reset_password.html") as f:
-        template_str = f.read()
-    server_host = settings.SERVER_HOST
-    return send_email(
-        emails_to=[email],
-        subject_template=subject,
-        html_template=template_str,
-        environment={
-            "server_host": server_host,
+    return {
+        "emails_to": [email],
+        "subject": "%(project_name)s - Password recovery for user with email %(email)s" % {
+            'project_name': project_name, 'email': email
+        },
+        "template_name": "reset_password.html",
+        "environment": {
+            "server_host": settings.SERVER_HOST,
             "project_name": project_name,
             "email": email,
             "verification_code": verification_code,
         },
-    )
+    }
 
 
-def send_email_verification(email_to: str, verification_code: str) -> None:
+def get_email_verification_message(email_to: str, verification_code: str) -> dict:
     project_name = settings.PROJECT_NAME
-    subject = "%(project_name)s - Email verification for user with email %(email)s" % {
-        'project_name': project_name, 'email': email_to
-    }
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "verify_email.html") as f:
-        template_str = f.read()
-    return send_email(
-        emails_to=[email_to],
-        subject_template=subject,
-        html_template=template_str,
-        environment={
-            "project_name": settings.PROJECT_NAME,
+    return {
+        "emails_to": [email_to],
+        "subject": "%(project_name)s - Email verification for user with email %(email)s" % {
+            'project_name': project_name, 'email': email_to
+        },
+        "template_name": "verify_email.html",
+        "environment": {
+            "project_name": project_name,
             "email": email_to,
             "verification_code": verification_code
         },
-    )
+    }
 
 
-def send_password_change_verification(email_to: str, verification_code: str) -> None:
+def get_password_change_verification_message(email_to: str, verification_code: str) -> dict:
     project_name = settings.PROJECT_NAME
-    subject = "%(project_name)s - Password change verification for user with email %(email)s" % {
-        'project_name': project_name, 'email': email_to
-    }
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "verify_password.html") as f:
-        template_str = f.read()
-    return send_email(
-        emails_to=[email_to],
-        subject_template=subject,
-        html_template=template_str,
-        environment={
-            "project_name": settings.PROJECT_NAME,
+    return {
+        "emails_to": [email_to],
+        "subject": "%(project_name)s - Password change verification for user with email %(email)s" % {
+            'project_name': project_name, 'email': email_to
+        },
+        "template_name": "verify_password.html",
+        "environment": {
+            "project_name": project_name,
             "email": email_to,
             "verification_code": verification_code
         },
-    )
+    }
+
+
+def send_test_email(emails_to: List[str]) -> bool:
+    return not send_emails([get_test_message(emails_to)])
+
+
+def send_reset_password_email(email: str, verification_code: str, ) -> bool:
+    return not send_emails([get_reset_password_message(email, verification_code)])
+
+
+def send_email_verification(email_to: str, verification_code: str) -> bool:
+    return not send_emails([get_email_verification_message(email_to, verification_code)])
+
+
+def send_password_change_verification(email_to: str, verification_code: str) -> bool:
+    return not send_emails([get_password_change_verification_message(email_to, verification_code)])
@@ -13,9 +13,13 @@ from app.conf.config import settings, structure_settings
 __all__ = {
     'chunked_copy', 'upload_to',
     'convert_image', 'save_file',
-    'delete_file', 'get_file_path'
+    'delete_file', 'get_file_path',
+    'is_zip', 'get_release_path', 'find_release_path',
 }
 
+RELEASE_DIR = 'release'
+ALLOWED_ZIP_TYPES = {'application/zip', 'application/x-zip-compressed', 'multipart/x-zip'}
+
 
 async def chunked_copy(src: UploadFile, dst: str) -> None:
     """
@@ -170,3 +174,36 @@ def delete_file(
 
 def get_file_path(path: str, base_dir: Optional[str] = structure_settings.MEDIA_DIR):
     return f'/{base_dir}/{path}'
+
+
+def is_zip(content_type: Optional[str]) -> bool:
+    return content_type in ALLOWED_ZIP_TYPES
+
+
+def get_release_path(release_os: str, version: str) -> str:
+    """
+    Return release archive path relative to release dir
+    :param release_os: android or ios
+    :param version:
+    :return:
+    """
+    filename = "release-ios" if release_os == "ios" else "release-apk"
+    return f"{release_os}/{version}/{filename}.zip"
+
+
+def find_release_path(release_os: str, version: str) -> Optional[str]:
+    """
+    Return path of the stored release archive relative to release dir, None when there is none.
+    iOS archives uploaded before get_release_path were saved as release-ios.zip.zip
+    :param release_os: android or ios
+    :param version:
+    :return:
+    """
+    release_path = get_release_path(release_os, version)
+    candidates = [release_path]
+    if release_os == "ios":
+        candidates.append(f"{release_path}.zip")
+    for path in candidates:
+        if os.path.exists(f"{RELEASE_DIR}/{path}"):
+            return path
+    return None
@@ -7,11 +7,10 @@ prices, discounts and taxes.
 from decimal import Decimal
 from typing import TypeVar
 
-from babel.numbers import get_currency_precision
-
 from .discount import (
     fixed_discount, fractional_discount, percentage_discount)
-from .money import Money
+from .money import Money, get_currency_precision, get_currency_exponent
+from .minor_money import MinorMoney
 from .money_range import MoneyRange
 from .tax import flat_tax
 from .taxed_money import TaxedMoney
@@ -21,16 +20,14 @@ from .utils import sum
 PriceType = TypeVar("PriceType", TaxedMoney, Money, Decimal, TaxedMoneyRange)
 
 __all__ = [
-    'Money', 'MoneyRange', 'TaxedMoney', 'TaxedMoneyRange', 'fixed_discount',
+    'Money', 'MinorMoney', 'MoneyRange', 'TaxedMoney', 'TaxedMoneyRange', 'fixed_discount',
     'flat_tax', 'fractional_discount', 'percentage_discount', 'sum',
-    "quantize_price", "zero_money"
+    "quantize_price", "zero_money", "get_currency_precision", "get_currency_exponent",
 ]
 
 
 def quantize_price(price: PriceType, currency: str) -> PriceType:
-    precision = get_currency_precision(currency)
-    number_places = Decimal(10) ** -precision
-    return price.quantize(number_places)
+    return price.quantize(get_currency_exponent(currency))
 
 
 def zero_money(currency: str) -> Money:
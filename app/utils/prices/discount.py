@@ -2,6 +2,7 @@ from decimal import Decimal, ROUND_DOWN
 from typing import TypeVar, Union
 
 from .money import Money
+from .minor_money import MinorMoney
 from .money_range import MoneyRange
 from .taxed_money import TaxedMoney
 from .taxed_money_range import TaxedMoneyRange
@@ -13,6 +14,10 @@ T = TypeVar('T', Money, MoneyRange, TaxedMoney, TaxedMoneyRange)
 
 def fixed_discount(base: T, discount: Money) -> T:
     """Apply a fixed discount to any price type."""
+    if type(base) is MinorMoney:
+        result = base - discount
+        zero = MinorMoney.from_minor(0, base.currency)
+        return zero if result < zero else result
     if isinstance(base, MoneyRange):
         return MoneyRange(
             fixed_discount(base.start, discount),
@@ -32,6 +37,13 @@ def fixed_discount(base: T, discount: Money) -> T:
 
 def fractional_discount(base: T, fraction: Decimal, *, from_gross=True) -> T:
     """Apply a fractional discount based on either gross or net amount."""
+    if type(base) is MinorMoney:
+        numerator, denominator = fraction.as_integer_ratio()
+        # Integer division rounding toward zero, same as ROUND_DOWN
+        discount = abs(base.minor * numerator) // denominator
+        if base.minor * numerator < 0:
+            discount = -discount
+        return fixed_discount(base, MinorMoney.from_minor(discount, base.currency))
     if isinstance(base, MoneyRange):
         return MoneyRange(
             fractional_discount(base.start, fraction, from_gross=from_gross),
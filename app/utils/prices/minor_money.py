@@ -0,0 +1,163 @@
+from __future__ import division, unicode_literals
+
+import warnings
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional, Union
+
+from .money import Money, Numeric, get_currency_precision
+
+
+def to_minor_units(amount: Numeric, currency: str) -> int:
+    """Return amount in the smallest currency unit, rounded half up."""
+    scaled = Decimal(amount).scaleb(get_currency_precision(currency))
+    return int(scaled.to_integral_value(ROUND_HALF_UP))
+
+
+class MinorMoney(Money):
+    """An amount of a particular currency stored as integer minor units.
+
+    Amounts are quantized to the currency precision on creation, arithmetic
+    between ``MinorMoney`` instances and multiplication by ``int`` stay in
+    integers. Operations whose result does not fit minor units (multiplying or
+    dividing by ``Decimal``) return a plain ``Money`` like ``Money`` itself
+    would, so it can be used anywhere ``Money`` is accepted.
+    """
+
+    __slots__ = ('minor',)
+
+    def __init__(self, amount: Optional[Numeric], currency: str, null_safe: Optional[bool] = True) -> None:
+        if isinstance(amount, float):
+            warnings.warn(  # pragma: no cover
+                RuntimeWarning(
+                    'float passed as value to MinorMoney, consider using Decimal'),
+                stacklevel=2)
+        if amount is None and null_safe:
+            amount = 0
+        self.minor = to_minor_units(amount, currency)
+        self.currency = currency
+
+    @classmethod
+    def from_minor(cls, minor: int, currency: str) -> 'MinorMoney':
+        money = cls.__new__(cls)
+        money.minor = minor
+        money.currency = currency
+        return money
+
+    @classmethod
+    def from_money(cls, money: Money) -> 'MinorMoney':
+        if isinstance(money, MinorMoney):
+            return money
+        return cls(money.amount, money.currency)
+
+    @property
+    def amount(self) -> Decimal:
+        return Decimal(self.minor).scaleb(-get_currency_precision(self.currency))
+
+    def _get_minor(self, other: Money) -> Optional[int]:
+        """Return other amount in minor units, None when it has more digits."""
+        if type(other) is MinorMoney:
+            return other.minor
+        scaled = other.amount.scaleb(get_currency_precision(self.currency))
+        if scaled != scaled.to_integral_value():
+            return None
+        return int(scaled)
+
+    def __repr__(self) -> str:
+        return 'MinorMoney(%r, %r)' % (str(self.amount), self.currency)
+
+    def __lt__(self, other: Money) -> bool:
+        if isinstance(other, MinorMoney):
+            if self.currency != other.currency:
+                raise ValueError(
+                    'Cannot compare amounts in %r and %r' % (
+                        self.currency, other.currency))
+            return self.minor < other.minor
+        return super().__lt__(other)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, MinorMoney):
+            return self.minor == other.minor and self.currency == other.currency
+        return super().__eq__(other)
+
+    __hash__ = None  # type: ignore
+
+    def __mul__(self, other: Numeric) -> Money:
+        if isinstance(other, int) and not isinstance(other, bool):
+            return MinorMoney.from_minor(self.minor * other, self.currency)
+        return super().__mul__(other)
+
+    def __rmul__(self, other: Numeric) -> Money:
+        return self * other
+
+    def __truediv__(self, other):
+        if isinstance(other, MinorMoney):
+            if self.currency != other.currency:
+                raise ValueError(
+                    'Cannot divide amounts in %r and %r' % (
+                        self.currency, other.currency))
+            return Decimal(self.minor) / other.minor
+        return super().__truediv__(other)
+
+    def __add__(self, other: Money) -> Money:
+        if type(other) is MinorMoney and other.currency == self.currency:
+            return MinorMoney.from_minor(self.minor + other.minor, self.currency)
+        if isinstance(other, Money):
+            if other.currency != self.currency:
+                raise ValueError(
+                    'Cannot add amount in %r to %r' % (
+                        self.currency, other.currency))
+            minor = self._get_minor(other)
+            if minor is None:
+                return Money(self.amount + other.amount, self.currency)
+            return MinorMoney.from_minor(self.minor + minor, self.currency)
+        return NotImplemented
+
+    def __radd__(self, other: Money) -> Money:
+        return self + other
+
+    def __sub__(self, other: Money) -> Money:
+        if type(other) is MinorMoney and other.currency == self.currency:
+            return MinorMoney.from_minor(self.minor - other.minor, self.currency)
+        if isinstance(other, Money):
+            if other.currency != self.currency:
+                raise ValueError(
+                    'Cannot subtract amount in %r from %r' % (
+                        other.currency, self.currency))
+            minor = self._get_minor(other)
+            if minor is None:
+                return Money(self.amount - other.amount, self.currency)
+            return MinorMoney.from_minor(self.minor - minor, self.currency)
+        return NotImplemented
+
+    def __rsub__(self, other: Money) -> Money:
+        if isinstance(other, Money):
+            if other.currency != self.currency:
+                raise ValueError(
+                    'Cannot subtract amount in %r from %r' % (
+                        self.currency, other.currency))
+            minor = self._get_minor(other)
+            if minor is None:
+                return Money(other.amount - self.amount, self.currency)
+            return MinorMoney.from_minor(minor - self.minor, self.currency)
+        return NotImplemented
+
+    def __neg__(self) -> 'MinorMoney':
+        return MinorMoney.from_minor(-self.minor, self.currency)
+
+    def __bool__(self) -> bool:
+        return bool(self.minor)
+
+    def quantize(self, exp=None, rounding=None) -> Union['MinorMoney', Money]:
+        """Return a quantized copy.
+
+        The amount is already quantized to the currency precision, so without
+        `exp` or with a finer one it is returned as is, with a coarser `exp`
+        the result stays in minor units.
+        """
+        if exp is None or Decimal(exp).as_tuple().exponent <= -get_currency_precision(self.currency):
+            return self
+        quantized = super().quantize(exp, rounding=rounding)
+        minor = self._get_minor(quantized)
+        if minor is None:
+            return quantized
+        return MinorMoney.from_minor(minor, self.currency)
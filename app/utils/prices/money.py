@@ -2,11 +2,26 @@ from __future__ import division, unicode_literals
 
 import warnings
 from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
 from typing import Union, overload, Optional
 
+from babel.numbers import get_currency_precision as babel_currency_precision
+
 Numeric = Union[int, Decimal]
 
 
+@lru_cache(maxsize=None)
+def get_currency_precision(currency: str) -> int:
+    """Return number of minor unit digits, babel lookup is cached per currency."""
+    return babel_currency_precision(currency)
+
+
+@lru_cache(maxsize=None)
+def get_currency_exponent(currency: str) -> Decimal:
+    """Return quantize exponent of the currency, Decimal('0.01') for two digits."""
+    return Decimal('0.1') ** get_currency_precision(currency)
+
+
 class Money:
     """An amount of a particular currency."""
 
@@ -117,8 +132,7 @@ class Money:
         if rounding is None:
             rounding = ROUND_HALF_UP
         if exp is None:
-            digits = get_currency_precision(self.currency)
-            exp = Decimal('0.1') ** digits
+            exp = get_currency_exponent(self.currency)
         else:
             exp = Decimal(exp)
         return Money(
@@ -0,0 +1,30 @@
+#!/usr/bin/env bash
+# Micro benchmarks, "save" stores a baseline, "compare" fails on regression over BENCHMARK_THRESHOLD
+# e.g. scripts/bench-micro.sh save; scripts/bench-micro.sh compare
+
+
+set -e
+set -x
+
+MODE=${1:-compare}
+shift || true
+BENCHMARK_THRESHOLD=${BENCHMARK_THRESHOLD:-15%}
+
+if [ "$MODE" = "save" ]; then
+  ARGS="--benchmark-autosave"
+else
+  ARGS="--benchmark-compare --benchmark-compare-fail=median:${BENCHMARK_THRESHOLD}"
+fi
+
+if ! command -v "poetry" > /dev/null; then
+  if [ -f ./.venv/bin/python ]; then
+      DEFAULT_PYTHON_VENV_PATH=./.venv/bin/
+  else [ -f ./venv/bin/python ];
+      DEFAULT_PYTHON_VENV_PATH=./venv/bin/
+  fi
+  PYTHON_VENV_PATH=${DEFAULT_PYTHON_VENV_PATH:-$DEFAULT_PYTHON_VENV_PATH}
+
+  ${PYTHON_VENV_PATH}pytest tests/bench/bench_micro.py ${ARGS} "${@}"
+else
+  poetry run pytest tests/bench/bench_micro.py ${ARGS} "${@}"
+fi
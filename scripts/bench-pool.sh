@@ -0,0 +1,26 @@
+#!/usr/bin/env bash
+# Compare pool profiles on order and place flows, extra args go to tests.bench.http_flows
+# "baseline" is the previous engine setup (pre-ping on, pool 5+10, default statement cache, jit on),
+# "tuned" is the profile from settings/.env
+# e.g. scripts/bench-pool.sh --fake-redis --concurrency 20
+
+
+set -e
+set -x
+
+export DATABASE_NAME=${DATABASE_NAME:-bench}
+COMMIT=$(git rev-parse --short HEAD)
+FLOWS="--flow order-my-create --flow order-my-list --flow place-public-list"
+
+DATABASE_POOL_PRE_PING=true \
+DATABASE_POOL_SIZE=5 \
+DATABASE_MAX_OVERFLOW=10 \
+DATABASE_POOL_RECYCLE=-1 \
+DATABASE_POOL_WARMUP=0 \
+DATABASE_PREPARED_STATEMENT_CACHE_SIZE=100 \
+DATABASE_JIT=true \
+DATABASE_STATEMENT_TIMEOUT=0 \
+  scripts/bench.sh ${FLOWS} --output "bench-results/pool-baseline-${COMMIT}.json" "${@}"
+
+scripts/bench.sh ${FLOWS} --output "bench-results/pool-tuned-${COMMIT}.json" \
+  --compare "bench-results/pool-baseline-${COMMIT}.json" "${@}"
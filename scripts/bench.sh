@@ -0,0 +1,22 @@
+#!/usr/bin/env bash
+# Run HTTP flow benchmark against DATABASE_NAME (default "bench"), extra args go to tests.bench.http_flows
+# e.g. scripts/bench.sh --fake-redis --compare bench-results/http-abc1234.json
+
+
+set -e
+set -x
+
+export DATABASE_NAME=${DATABASE_NAME:-bench}
+
+if ! command -v "poetry" > /dev/null; then
+  if [ -f ./.venv/bin/python ]; then
+      DEFAULT_PYTHON_VENV_PATH=./.venv/bin/
+  else [ -f ./venv/bin/python ];
+      DEFAULT_PYTHON_VENV_PATH=./venv/bin/
+  fi
+  PYTHON_VENV_PATH=${DEFAULT_PYTHON_VENV_PATH:-$DEFAULT_PYTHON_VENV_PATH}
+
+  ${PYTHON_VENV_PATH}python -m tests.bench.http_flows "${@}"
+else
+  poetry run python -m tests.bench.http_flows "${@}"
+fi
@@ -16,7 +16,8 @@ if [ "$RUN_PRESTART" = true ] ; then
     echo "Let the DB start"
     ${PYTHON_VENV_PATH}python -m app.backend_pre_start
 
-    # Run migrations
+    # Stamp a database created before migrations were tracked, then run migrations
+    ${PYTHON_VENV_PATH}python -m app.alembic_pre_start
     ${PYTHON_VENV_PATH}alembic upgrade head
 
     echo "Create initial data in DB"
@@ -25,7 +26,8 @@ if [ "$RUN_PRESTART" = true ] ; then
     echo "Let the DB start"
     poetry run python -m app.backend_pre_start
 
-    # Run migrations
+    # Stamp a database created before migrations were tracked, then run migrations
+    poetry run python -m app.alembic_pre_start
     poetry run alembic upgrade head
 
     echo "Create initial data in DB"
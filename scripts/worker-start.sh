@@ -3,6 +3,27 @@
 
 set -e
 
+# One worker per queue (see app/core/celery_app.py), CELERY_WORKER_QUEUE selects it,
+# without it a single worker consumes every queue.
+# Long tasks are fetched one by one (prefetch 1, -O fair) so a slow export never holds short ones back.
+case "${CELERY_WORKER_QUEUE:-all}" in
+  auth)
+    WORKER_OPTIONS="-Q auth -n auth@%h --concurrency=${CELERY_CONCURRENCY:-4} --prefetch-multiplier=1 -O fair"
+    ;;
+  bulk)
+    WORKER_OPTIONS="-Q bulk -n bulk@%h --concurrency=${CELERY_CONCURRENCY:-2} --prefetch-multiplier=1 -O fair"
+    ;;
+  media)
+    WORKER_OPTIONS="-Q media -n media@%h --concurrency=${CELERY_CONCURRENCY:-2} --prefetch-multiplier=1 -O fair"
+    ;;
+  celery)
+    WORKER_OPTIONS="-Q celery -n default@%h --concurrency=${CELERY_CONCURRENCY:-4} --prefetch-multiplier=4"
+    ;;
+  *)
+    WORKER_OPTIONS="-Q auth,celery,media,bulk --prefetch-multiplier=1 -O fair"
+    ;;
+esac
+
 if ! command -v "poetry" > /dev/null; then
   if [ -f ./.venv/bin/python ]; then
       DEFAULT_PYTHON_VENV_PATH=./.venv/bin/
@@ -14,10 +35,10 @@ if ! command -v "poetry" > /dev/null; then
   # Let the DB start
   ${PYTHON_VENV_PATH}python -m app.celeryworker_pre_start
 
-  ${PYTHON_VENV_PATH}celery -A app.worker worker  -l info
+  ${PYTHON_VENV_PATH}celery -A app.worker worker  -l info ${WORKER_OPTIONS}
 else
   # Let the DB start
   poetry run python -m app.celeryworker_pre_start
 
-  poetry run celery -A app.worker worker  -l info
+  poetry run celery -A app.worker worker  -l info ${WORKER_OPTIONS}
 fi
@@ -0,0 +1,140 @@
+"""
+Micro benchmarks of pure python utilities sitting on request paths.
+
+Not collected by default test run, run explicitly (see scripts/bench-micro.sh)::
+
+    pytest tests/bench/bench_micro.py --benchmark-autosave
+    pytest tests/bench/bench_micro.py --benchmark-compare --benchmark-compare-fail=median:15%
+"""
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.utils.slugify import slugify  # noqa: E402
+from app.utils.text_unidecode import unidecode  # noqa: E402
+from app.utils.sanitizer import Sanitizer  # noqa: E402
+from app.utils.prices import (  # noqa: E402
+    Money, MinorMoney, TaxedMoney, fixed_discount, percentage_discount, zero_money
+)
+from app.utils.jose import jwt  # noqa: E402
+from app.utils.translation.helpers import parse_language_header  # noqa: E402
+from app.utils.regex_helper import normalize  # noqa: E402
+
+SLUG_INPUTS = {
+    'latin': 'Express delivery to Ashgabat & Mary -- 2024 edition!',
+    'cyrillic': 'Доставка посылок по Туркменистану: Ашхабад, Мары, Дашогуз',
+    'turkmen': 'Gyssagly eltip bermek: Aşgabat, Türkmenabat, Daşoguz, Balkanabat şäherleri',
+    'long': 'Ýük daşamak hyzmaty ' * 20,
+}
+
+RICH_TEXT = """
+<h2 style="color: red" onclick="alert(1)">Eltip bermek şertleri</h2>
+<p><span style="font-weight: bold">Hormatly müşderi</span>, sargytlaryňyz
+<span style="font-style: italic">24 sagadyň</span> dowamynda eltilýär.&nbsp;&nbsp;</p>
+<ul><li>Aşgabat şäheri &mdash; <b>10 TMT</b></li><li>Welaýatlar — 25 TMT</li></ul>
+<p>Подробнее: <a href="https://example.com/terms" target="_blank">условия доставки</a>
+<a href="javascript:alert(1)">link</a></p>
+<script>document.cookie</script><img src="x" onerror="alert(1)">
+<table><tr><td>Agram</td><td>Bahasy</td></tr><tr><td>1 kg</td><td>10.00</td></tr></table>
+""" * 3
+
+LANGUAGE_HEADERS = {
+    'simple': 'tk',
+    'browser': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7,tk;q=0.6',
+    'malformed': 'en;q=,ru;q=abc,,tk;q=0.5, ;q=0.1',
+}
+
+JWT_SECRET = 'bench-secret'
+JWT_PAYLOAD = {
+    'user_id': '2c7d7c52-8bd6-4b56-a2a6-9d4a3a4f6c1a',
+    'jti': '7f1c9e1ab0f54d8b8bfc6e2b3c4d5e6f',
+    'aud': 'client',
+    'iss': 'backend',
+    'iat': 1700000000,
+    'exp': 4100000000,
+}
+
+sanitizer = Sanitizer()
+
+LINE_AMOUNTS = [Decimal(i % 50000) / 100 for i in range(100_000)]
+
+
+@pytest.mark.parametrize('name', SLUG_INPUTS)
+def test_slugify(benchmark, name):
+    result = benchmark(slugify, SLUG_INPUTS[name])
+    assert result
+
+
+@pytest.mark.parametrize('name', ['cyrillic', 'turkmen'])
+def test_unidecode(benchmark, name):
+    assert benchmark(unidecode, SLUG_INPUTS[name]).isascii()
+
+
+def test_sanitizer(benchmark):
+    result = benchmark(sanitizer.sanitize, RICH_TEXT)
+    assert '<script' not in result
+
+
+def test_money_arithmetic(benchmark):
+    price = Money(Decimal('12.50'), 'TMT')
+    shipping = Money(Decimal('10.00'), 'TMT')
+
+    def run():
+        total = price * 3 + shipping
+        total = fixed_discount(total, Money(Decimal('5'), 'TMT'))
+        return percentage_discount(total, 10)
+
+    assert benchmark(run).currency == 'TMT'
+
+
+def test_taxed_money_arithmetic(benchmark):
+    line = TaxedMoney(net=Money(Decimal('10.00'), 'TMT'), gross=Money(Decimal('11.50'), 'TMT'))
+
+    def run():
+        total = line * 3
+        for _ in range(10):
+            total = total + line
+        return total
+
+    assert benchmark(run).gross.amount == Decimal('149.50')
+
+
+@pytest.mark.parametrize('money_class', [Money, MinorMoney], ids=['decimal', 'minor'])
+def test_lines_sum_and_discount(benchmark, money_class):
+    lines = [money_class(amount, 'TMT') for amount in LINE_AMOUNTS]
+    discount = money_class(Decimal('1.50'), 'TMT')
+
+    def run():
+        total = zero_money('TMT')
+        for line in lines:
+            total = total + fixed_discount(percentage_discount(line, 10), discount)
+        return total
+
+    assert benchmark(run).amount > 0
+
+
+def test_jwt_encode(benchmark):
+    assert benchmark(jwt.encode, JWT_PAYLOAD, JWT_SECRET, algorithm='HS256')
+
+
+def test_jwt_decode(benchmark):
+    token = jwt.encode(JWT_PAYLOAD, JWT_SECRET, algorithm='HS256')
+    result = benchmark(
+        jwt.decode, token, JWT_SECRET, algorithms=['HS256'], audience='client', issuer='backend'
+    )
+    assert result['user_id'] == JWT_PAYLOAD['user_id']
+
+
+@pytest.mark.parametrize('name', LANGUAGE_HEADERS)
+def test_parse_language_header(benchmark, name):
+    benchmark(parse_language_header, LANGUAGE_HEADERS[name])
+
+
+@pytest.mark.parametrize('pattern', [
+    r'^order/(?P<code>[A-Z0-9]+)/$',
+    r'^(?:release|media)/(?P<path>.+?)(?:\.(?P<format>zip|apk))?$',
+])
+def test_regex_normalize(benchmark, pattern):
+    assert benchmark(normalize, pattern)
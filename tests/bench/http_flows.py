@@ -0,0 +1,273 @@
+"""
+HTTP benchmark of the main API flows.
+
+The application runs in process behind ``httpx.ASGITransport`` against the
+database from settings (point ``DATABASE_NAME`` to a scratch database, it is
+created and seeded if missing) and either the redis from ``REDIS_URL`` or
+fakeredis with ``--fake-redis``. Results are stored as JSON per commit so two
+runs can be compared::
+
+    DATABASE_NAME=bench python -m tests.bench.http_flows --fake-redis
+    python -m tests.bench.http_flows --compare bench-results/http-<commit>.json
+
+This module is not collected by pytest.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from typing import Callable, Awaitable, Optional
+
+from httpx import AsyncClient, ASGITransport, Response
+
+from app.conf.config import settings
+
+BENCH_USER_EMAIL = 'bench@example.com'
+BENCH_USER_PASSWORD = 'bench_secret'
+BENCH_PLACE_NAME = 'Aşgabat'
+RESULTS_DIR = 'bench-results'
+
+Flow = Callable[[AsyncClient, dict], Awaitable[Response]]
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def prepare_database() -> dict:
+    """
+    Create tables and seed bench user and place, return ids used by flows
+    """
+    from sqlalchemy import select
+    from sqlalchemy_utils import database_exists, create_database
+
+    from app.db.models import metadata
+    from app.db.session import engine, SessionLocal
+    from app.contrib.account.repository import user_repo_sync
+    from app.contrib.location.models import PlaceTranslation
+    from app.contrib.location.repository import place_repo_sync
+
+    if not database_exists(engine.url):
+        create_database(engine.url)
+    metadata.create_all(bind=engine)
+
+    with SessionLocal() as db:
+        user = user_repo_sync.first(db, params={'email': BENCH_USER_EMAIL})
+        if user is None:
+            user = user_repo_sync.create(db, obj_in={
+                'name': 'bench',
+                'email': BENCH_USER_EMAIL,
+                'password': BENCH_USER_PASSWORD,
+                'is_active': True,
+            })
+        place_tr = db.execute(select(PlaceTranslation).filter_by(
+            name=BENCH_PLACE_NAME, locale=settings.LANGUAGE_CODE
+        )).scalars().first()
+        if place_tr is None:
+            place = place_repo_sync.create_with_translation(db, obj_in={
+                'name': BENCH_PLACE_NAME,
+                'full_name': f'{BENCH_PLACE_NAME}, Türkmenistan',
+                'location_level': 'city',
+                'is_active': True,
+            }, lang=settings.LANGUAGE_CODE)
+            place_id = place.id
+        else:
+            place_id = place_tr.id
+        return {'user_id': str(user.id), 'place_id': place_id}
+
+
+def get_png() -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), color=(12, 34, 56)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+async def flow_get_token(client: AsyncClient, context: dict) -> Response:
+    return await client.post(f'{settings.API_V1_STR}/auth/get-token/', data={
+        'username': BENCH_USER_EMAIL,
+        'password': BENCH_USER_PASSWORD,
+    })
+
+
+async def flow_me(client: AsyncClient, context: dict) -> Response:
+    return await client.get(f'{settings.API_V1_STR}/auth/me/', headers=context['headers'])
+
+
+async def flow_order_my_create(client: AsyncClient, context: dict) -> Response:
+    return await client.post(f'{settings.API_V1_STR}/order/my/create/', headers=context['headers'], json={
+        'name': 'Bench Receiver',
+        'phone': '+99365000000',
+        'shippingMethod': 'regular',
+        'streetAddress': 'Magtymguly şaýoly 1',
+        'placeId': context['place_id'],
+        'lines': [{'name': 'Bench Sender', 'phone': '+99365000001', 'price': '12.50'}],
+    })
+
+
+async def flow_order_my_list(client: AsyncClient, context: dict) -> Response:
+    return await client.get(f'{settings.API_V1_STR}/order/my/list/', headers=context['headers'])
+
+
+async def flow_place_public_list(client: AsyncClient, context: dict) -> Response:
+    return await client.get(
+        f'{settings.API_V1_STR}/location/public/list/',
+        params={'search': BENCH_PLACE_NAME[:3]},
+    )
+
+
+async def flow_file_upload(client: AsyncClient, context: dict) -> Response:
+    return await client.post(
+        f'{settings.API_V1_STR}/file/create/upload/',
+        headers=context['headers'],
+        files={'upload_file': (f'{uuid.uuid4().hex}.png', context['png'], 'image/png')},
+        data={'caption': 'bench'},
+    )
+
+
+FLOWS: dict[str, Flow] = {
+    'get-token': flow_get_token,
+    'me': flow_me,
+    'order-my-create': flow_order_my_create,
+    'order-my-list': flow_order_my_list,
+    'place-public-list': flow_place_public_list,
+    'file-upload': flow_file_upload,
+}
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0,
+        'mean': statistics.fmean(latencies) if latencies else 0,
+        'p50': percentiles[49],
+        'p95': percentiles[94],
+        'p99': percentiles[98],
+    }
+
+
+async def run_flow(flow: Flow, client: AsyncClient, context: dict, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def call():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await flow(client, context)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    # Warm up connections, caches and statement cache before measuring
+    for _ in range(min(concurrency, requests)):
+        await flow(client, context)
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run(flows: list[str], requests: int, concurrency: int, fake_redis: bool) -> dict:
+    from asgi_lifespan import LifespanManager
+
+    from app.main import app
+
+    context = await asyncio.to_thread(prepare_database)
+    context['png'] = get_png()
+    results = {}
+    async with LifespanManager(app):
+        if fake_redis:
+            import fakeredis
+
+            app.configure(
+                redis_instance=fakeredis.FakeRedis(decode_responses=True),
+                aioredis_instance=fakeredis.FakeAsyncRedis(decode_responses=True),
+            )
+        transport = ASGITransport(app=app, client=('127.0.0.1', 50000))
+        async with AsyncClient(transport=transport, base_url='http://bench') as client:
+            response = await flow_get_token(client, context)
+            response.raise_for_status()
+            context['headers'] = {'Authorization': f"Bearer {response.json()['access_token']}"}
+            for name in flows:
+                results[name] = await run_flow(FLOWS[name], client, context, requests, concurrency)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Return regressions where p95 grew more than threshold (0.2 is 20%)
+    """
+    regressions = []
+    for name, result in current['flows'].items():
+        previous = baseline['flows'].get(name)
+        if not previous or not previous['p95']:
+            continue
+        ratio = result['p95'] / previous['p95'] - 1
+        if ratio > threshold:
+            regressions.append(
+                f"{name}: p95 {previous['p95'] * 1000:.2f}ms -> {result['p95'] * 1000:.2f}ms (+{ratio:.0%})"
+            )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--flow', action='append', choices=list(FLOWS), help='flow to run, default all')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--fake-redis', action='store_true')
+    parser.add_argument('--output', help=f'result file, default {RESULTS_DIR}/http-<commit>.json')
+    parser.add_argument('--compare', help='baseline result file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p95 regression, default 0.2')
+    args = parser.parse_args(argv)
+
+    commit = get_commit()
+    flows = asyncio.run(run(args.flow or list(FLOWS), args.requests, args.concurrency, args.fake_redis))
+    result = {
+        'commit': commit,
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'flows': flows,
+    }
+    output = args.output or f'{RESULTS_DIR}/http-{commit}.json'
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as fs:
+        json.dump(result, fs, indent=2)
+
+    print(f"{'flow':<20}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, row in flows.items():
+        print(
+            f"{name:<20}{row['rps']:>10.1f}{row['p50'] * 1000:>10.2f}"
+            f"{row['p95'] * 1000:>10.2f}{row['p99'] * 1000:>10.2f}{row['errors']:>8}"
+        )
+    print(f"Saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as fs:
+            regressions = compare(result, json.load(fs), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
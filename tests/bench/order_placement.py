@@ -0,0 +1,83 @@
+"""
+Order placement throughput benchmark.
+
+Calls ``place_order`` directly (no HTTP layer) with N concurrent sessions
+against the database from settings, seeded like ``http_flows``. Compare block
+sizes of the order code allocator, block size 1 is one sequence round trip per
+order::
+
+    DATABASE_NAME=bench python -m tests.bench.order_placement --orders 2000 --concurrency 20
+    DATABASE_NAME=bench python -m tests.bench.order_placement --block-size 1
+
+Notifications are not enqueued. This module is not collected by pytest.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+from typing import Optional
+from uuid import UUID
+
+from app.conf.config import settings
+
+from .http_flows import prepare_database, summarize, BENCH_USER_EMAIL, BENCH_PLACE_NAME
+
+
+async def run(orders: int, concurrency: int, block_size: int) -> dict:
+    from app.db.session import AsyncSessionLocal
+    from app.contrib.order import actions
+    from app.contrib.order.schema import OrderCheckout
+    from app.contrib.order.utils import OrderCodeAllocator
+
+    context = await asyncio.to_thread(prepare_database)
+    actions.order_code_allocator = OrderCodeAllocator(block_size=block_size)
+    actions.notify_order_placed_task = SimpleNamespace(delay=lambda **kwargs: None)
+    user = SimpleNamespace(id=UUID(context['user_id']), email=BENCH_USER_EMAIL)
+    place = {'id': context['place_id'], 'full_name': BENCH_PLACE_NAME}
+    obj_in = OrderCheckout.model_validate({
+        'name': 'Bench Receiver',
+        'phone': '+99365000000',
+        'shippingMethod': 'regular',
+        'placeId': context['place_id'],
+        'lines': [{'name': 'Bench Sender', 'phone': '+99365000001', 'price': '12.50'}],
+    })
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def call():
+        nonlocal errors
+        async with semaphore, AsyncSessionLocal() as async_db:
+            start = time.perf_counter()
+            try:
+                await actions.place_order(
+                    async_db, user=user, obj_in=obj_in, place=place, locale=settings.LANGUAGE_CODE
+                )
+            except Exception as e:
+                print(f"Order placement failed: {e}", file=sys.stderr)
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(orders)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--block-size', type=int, default=settings.ORDER_CODE_BLOCK_SIZE)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args.orders, args.concurrency, args.block_size))
+    print(
+        f"orders={result['requests']} errors={result['errors']} orders/s={result['rps']:.1f} "
+        f"p50={result['p50'] * 1000:.2f}ms p95={result['p95'] * 1000:.2f}ms p99={result['p99'] * 1000:.2f}ms"
+    )
+    return 1 if result['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import csv
+import io
+import os
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.conf.config import settings
+from app.contrib.account.models import User
+from app.contrib.export import ExportFormatChoices
+from app.contrib.export import writers
+from app.contrib.export.actions import export_to_file, get_export_path, cleanup_expired_exports
+from app.contrib.export.resources import EXPORT_RESOURCES, format_value
+
+
+@pytest.fixture
+def user_engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "db.sqlite"}')
+    User.__table__.create(engine)
+    with Session(engine) as db:
+        db.add_all([
+            User(name=f'Ulanyjy {i}', email=f'user{i}@example.com', hashed_password='x')
+            for i in range(25)
+        ])
+        db.commit()
+    return engine
+
+
+def test_format_value():
+    created_at = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert format_value(created_at) == '2024-01-02T03:04:05+00:00'
+    assert format_value(ExportFormatChoices.csv) == 'csv'
+    assert format_value(None) is None
+
+
+def test_format_value_escapes_formulas():
+    assert format_value('=HYPERLINK("http://evil")') == '\'=HYPERLINK("http://evil")'
+    assert format_value('@SUM(A1)') == "'@SUM(A1)"
+    assert format_value('-2+3') == "'-2+3"
+    assert format_value('+1 (555)') == "'+1 (555)"
+    assert format_value('+998901234567') == '+998901234567'
+    assert format_value(-5) == -5
+    assert format_value('plain note') == 'plain note'
+
+
+def test_iter_csv_chunks(monkeypatch):
+    monkeypatch.setattr(writers, 'CSV_CHUNK_SIZE', 100)
+    rows = [[i, f'Aşgabat {i}', None] for i in range(50)]
+    chunks = list(writers.iter_csv(('id', 'name', 'note'), iter(rows)))
+    assert len(chunks) > 1
+    assert all(len(chunk) < 200 for chunk in chunks)
+
+    content = ''.join(chunks)
+    assert content.startswith(writers.CSV_BOM)
+    parsed = list(csv.reader(io.StringIO(content[1:])))
+    assert parsed[0] == ['id', 'name', 'note']
+    assert parsed[1:] == [[str(i), f'Aşgabat {i}', ''] for i in range(50)]
+
+
+async def test_aiter_csv():
+    async def rows():
+        for i in range(3):
+            yield [i, 'Mary']
+
+    content = b''.join([chunk async for chunk in writers.aiter_csv(('id', 'name'), rows())])
+    assert content.decode('utf-8').splitlines()[1:] == ['0,Mary', '1,Mary', '2,Mary']
+
+
+def test_export_to_file_csv(user_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'EXPORT_DIR', str(tmp_path / 'exports'))
+    resource = EXPORT_RESOURCES['user']
+    with Session(user_engine) as db:
+        filename = export_to_file(db, resource, 'csv', expressions=[User.is_active.is_(True)])
+
+    assert filename.startswith('user-') and filename.endswith('.csv')
+    with open(get_export_path(filename), encoding='utf-8-sig') as fs:
+        rows = list(csv.DictReader(fs))
+    assert len(rows) == 25
+    assert {row['email'] for row in rows} == {f'user{i}@example.com' for i in range(25)}
+    assert not list((tmp_path / 'exports').glob('*.part'))
+
+
+def test_get_export_path(monkeypatch):
+    monkeypatch.setattr(settings, 'EXPORT_DIR', 'exports')
+    assert get_export_path('user-1.csv') == 'exports/user-1.csv'
+    assert get_export_path('../app/main.py') is None
+    assert get_export_path('.env') is None
+
+
+def test_cleanup_expired_exports(tmp_path, monkeypatch):
+    export_dir = tmp_path / 'exports'
+    monkeypatch.setattr(settings, 'EXPORT_DIR', str(export_dir))
+    assert cleanup_expired_exports() == 0
+
+    export_dir.mkdir()
+    for name, age in (('old.csv', 3600), ('old.xlsx.part', 3600), ('new.csv', 10)):
+        path = export_dir / name
+        path.write_text('id')
+        os.utime(path, (1000000 - age, 1000000 - age))
+    monkeypatch.setattr(settings, 'EXPORT_EXPIRE_SECONDS', 60)
+
+    assert cleanup_expired_exports(now=1000000) == 2
+    assert [path.name for path in export_dir.iterdir()] == ['new.csv']
+
+
+def test_export_to_file_xlsx(user_engine, tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip('openpyxl')
+    monkeypatch.setattr(settings, 'EXPORT_DIR', str(tmp_path / 'exports'))
+    resource = EXPORT_RESOURCES['user']
+    with Session(user_engine) as db:
+        filename = export_to_file(db, resource, 'xlsx')
+
+    worksheet = openpyxl.load_workbook(get_export_path(filename), read_only=True)['user']
+    rows = list(worksheet.values)
+    assert rows[0] == resource.fields
+    assert len(rows) == 26
+
+
+def test_repository_stream_yield_per(user_engine):
+    resource = EXPORT_RESOURCES['user']
+    with Session(user_engine) as db:
+        names = [user.name for user in resource.repo_sync.stream(db, order_by=('name',), yield_per=10)]
+    assert len(names) == 25 and names == sorted(names)
+
+
+async def test_repository_stream_async(tmp_path):
+    pytest.importorskip('aiosqlite')
+    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "db.sqlite"}')
+    async with engine.begin() as conn:
+        await conn.run_sync(User.__table__.create)
+    async with AsyncSession(engine) as async_db:
+        async_db.add_all([User(name=f'user {i}', hashed_password='x') for i in range(5)])
+        await async_db.commit()
+
+        resource = EXPORT_RESOURCES['user']
+        rows = [resource.get_row(user) async for user in resource.repo.stream(async_db, yield_per=2)]
+    assert len(rows) == 5
+    assert all(isinstance(row[0], str) for row in rows)
+    await engine.dispose()
@@ -0,0 +1,76 @@
+import base64
+import hashlib
+
+import pytest
+
+from app.contrib.file.upload import (
+    UploadError, ChecksumMismatch, parse_upload_metadata, parse_upload_checksum, write_chunk,
+)
+
+
+async def stream_of(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def broken_stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+    raise ConnectionResetError()
+
+
+def checksum_header(data: bytes, algorithm: str = 'sha1') -> str:
+    return f'{algorithm} {base64.b64encode(hashlib.new(algorithm, data).digest()).decode()}'
+
+
+def test_parse_upload_metadata():
+    header = f"filename {base64.b64encode(b'video.mp4').decode()},filetype {base64.b64encode(b'video/mp4').decode()},empty"
+    assert parse_upload_metadata(header) == {'filename': 'video.mp4', 'filetype': 'video/mp4', 'empty': ''}
+    assert parse_upload_metadata(None) == {}
+    with pytest.raises(UploadError):
+        parse_upload_metadata("filename not-base64!")
+
+
+def test_parse_upload_checksum():
+    algorithm, digest = parse_upload_checksum(checksum_header(b'abc'))
+    assert algorithm == 'sha1'
+    assert digest == hashlib.sha1(b'abc').digest()
+    assert parse_upload_checksum(None) is None
+    with pytest.raises(UploadError):
+        parse_upload_checksum('crc32 AAAA')
+
+
+async def test_write_chunk_appends_at_offset(tmp_path):
+    path = str(tmp_path / 'file.part')
+    offset = await write_chunk(path, 0, stream_of(b'hello '), 11)
+    assert offset == 6
+    offset = await write_chunk(
+        path, offset, stream_of(b'wor', b'ld'), 11, parse_upload_checksum(checksum_header(b'world'))
+    )
+    assert offset == 11
+    assert open(path, 'rb').read() == b'hello world'
+
+
+async def test_write_chunk_checksum_mismatch_truncates(tmp_path):
+    path = str(tmp_path / 'file.part')
+    await write_chunk(path, 0, stream_of(b'hello '), 11)
+    with pytest.raises(ChecksumMismatch):
+        await write_chunk(path, 6, stream_of(b'world'), 11, parse_upload_checksum(checksum_header(b'other')))
+    assert open(path, 'rb').read() == b'hello '
+
+
+async def test_write_chunk_overflow(tmp_path):
+    path = str(tmp_path / 'file.part')
+    with pytest.raises(UploadError) as e:
+        await write_chunk(path, 0, stream_of(b'hello', b' world'), 5)
+    assert e.value.status_code == 413
+    assert open(path, 'rb').read() == b''
+
+
+async def test_write_chunk_interrupted(tmp_path):
+    path = str(tmp_path / 'file.part')
+    assert await write_chunk(path, 0, broken_stream(b'hello'), 11) == 5
+    assert open(path, 'rb').read() == b'hello'
+    with pytest.raises(ConnectionResetError):
+        await write_chunk(path, 5, broken_stream(b' wor'), 11, parse_upload_checksum(checksum_header(b' world')))
+    assert open(path, 'rb').read() == b'hello'
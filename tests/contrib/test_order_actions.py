@@ -0,0 +1,92 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.contrib.account.models import User  # noqa: F401, registers "user" table for foreign keys
+from app.contrib.order import OrderEventChoices
+from app.contrib.order import actions
+from app.contrib.order.models import Order, OrderLine, OrderEvent, OrderStatusCounter
+from app.contrib.order.schema import OrderCheckout
+from app.contrib.order.utils import OrderCodeAllocator
+
+
+async def test_order_code_allocator_uses_blocks():
+    allocator = OrderCodeAllocator(block_size=3)
+    blocks = iter([[1, 2, 3], [7, 8, 9]])
+    calls = []
+
+    async def fetch_block(async_db):
+        calls.append(async_db)
+        return next(blocks)
+
+    allocator.fetch_block = fetch_block
+    codes = [await allocator.next('db') for _ in range(5)]
+    assert codes == ['ORD-000001', 'ORD-000002', 'ORD-000003', 'ORD-000007', 'ORD-000008']
+    assert len(calls) == 2
+
+
+async def test_place_order_single_transaction(tmp_path, monkeypatch):
+    pytest.importorskip('aiosqlite')
+    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "db.sqlite"}')
+    async with engine.begin() as conn:
+        for table in (Order.__table__, OrderLine.__table__, OrderEvent.__table__, OrderStatusCounter.__table__):
+            await conn.run_sync(table.create)
+
+    async def next_code(async_db):
+        return 'ORD-000042'
+
+    async def get_config(async_db):
+        return SimpleNamespace(regular_shipping_price=Decimal('10.00'), express_shipping_price=Decimal('25.50'))
+
+    notified = []
+    monkeypatch.setattr(actions.order_code_allocator, 'next', next_code)
+    monkeypatch.setattr(actions.config_repo, 'first', get_config)
+    monkeypatch.setattr(actions.notify_order_placed_task, 'delay', lambda **kwargs: notified.append(kwargs))
+    created = []
+
+    class Manager:
+        async def order_created(self, async_db, order):
+            # Called after commit, other sessions already see the order
+            async with AsyncSession(engine) as other_db:
+                assert await other_db.get(Order, order.id) is not None
+            created.append(order.id)
+
+    monkeypatch.setattr(actions, 'get_plugins_manager', Manager)
+
+    user = SimpleNamespace(id=uuid4(), email='user@example.com')
+    obj_in = OrderCheckout.model_validate({
+        'name': 'Receiver',
+        'phone': '+99365000000',
+        'shippingMethod': 'regular',
+        'placeId': 1,
+        'lines': [
+            {'name': 'Sender', 'phone': '+99365000001', 'price': '12.50'},
+            {'name': 'Sender', 'phone': '+99365000001'},
+        ],
+    })
+    async with AsyncSession(engine, expire_on_commit=False) as async_db:
+        order = await actions.place_order(
+            async_db, user=user, obj_in=obj_in, place={'id': 1, 'full_name': 'Aşgabat'}, locale='tk'
+        )
+
+    assert notified == [{'order_id': str(order.id)}]
+    assert created == [order.id]
+    async with AsyncSession(engine) as async_db:
+        db_order = (await async_db.execute(select(Order))).scalar_one()
+        assert db_order.code == 'ORD-000042'
+        # Same amounts as repricing gives
+        assert (db_order.subtotal_amount, db_order.shipping_price_amount, db_order.total_amount) == (
+            Decimal('12.50'), Decimal('10.00'), Decimal('22.50'),
+        )
+        lines = (await async_db.execute(select(OrderLine))).scalars().all()
+        assert len(lines) == 2 and lines[0].public_metadata == {'name': 'Sender', 'phone': '+99365000001'}
+        event = (await async_db.execute(select(OrderEvent))).scalar_one()
+        assert event.event_type == OrderEventChoices.placed
+        counters = (await async_db.execute(select(OrderStatusCounter.scope, OrderStatusCounter.count))).all()
+        assert sorted(counters) == sorted([('all', 1), (str(user.id), 1)])
+    await engine.dispose()
@@ -0,0 +1,153 @@
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+from app.contrib.account.models import User  # noqa: F401, registers "user" table for foreign keys
+from app.contrib.order import OrderStatusChoices, ShippingMethodChoices
+from app.contrib.order.models import Order, OrderLine, OrderStatusCounter
+from app.contrib.order import batch_calculations as batch
+from app.utils.prices import Money, quantize_price, zero_money, percentage_discount, fixed_discount
+
+CURRENCY = 'TMT'
+SHIPPING_PRICES = {'regular': Decimal('10.00'), 'express': Decimal('25.50')}
+
+
+def get_random_orders(count: int, divisor: int = 1000) -> list[list[Decimal]]:
+    rng = random.Random(42)
+    return [
+        [Decimal(rng.randint(0, 500000)) / divisor for _ in range(rng.randint(0, 6))]
+        for _ in range(count)
+    ]
+
+
+def per_order_total(lines: list[Decimal], percentage: Decimal, fixed: Decimal) -> Decimal:
+    subtotal = zero_money(CURRENCY)
+    for amount in lines:
+        subtotal += quantize_price(Money(amount, CURRENCY), CURRENCY)
+    subtotal = quantize_price(subtotal, CURRENCY)
+    subtotal = percentage_discount(subtotal, percentage)
+    return fixed_discount(subtotal, Money(fixed, CURRENCY)).amount
+
+
+def test_batch_matches_per_order_path():
+    orders = get_random_orders(500)
+    rng = random.Random(7)
+    percentages = [Decimal(rng.choice(['0', '5', '12.5', '33', '100'])) for _ in orders]
+    fixed = [Decimal(rng.randint(0, 3000)) / 100 for _ in orders]
+
+    order_indexes = [index for index, lines in enumerate(orders) for _ in lines]
+    line_amounts = batch.to_minor([amount for lines in orders for amount in lines], CURRENCY)
+    subtotals = batch.sum_by_order(order_indexes, line_amounts, len(orders))
+    totals = batch.apply_fixed_discounts(
+        batch.apply_percentage_discounts(subtotals, percentages),
+        batch.to_minor(fixed, CURRENCY),
+    )
+
+    expected = [
+        per_order_total(lines, percentage, discount)
+        for lines, percentage, discount in zip(orders, percentages, fixed)
+    ]
+    assert batch.from_minor(totals, CURRENCY) == expected
+
+
+def test_minor_units_conversion():
+    assert batch.to_minor([Decimal('12.345'), Decimal('0.005'), None], 'TMT') == [1235, 1, 0]
+    assert batch.to_minor([Decimal('12.5')], 'JPY') == [13]
+    assert batch.from_minor([1235, 0], 'TMT') == [Decimal('12.35'), Decimal('0.00')]
+
+
+def test_calculate_shipping_skips_unchanged():
+    order_id = uuid4()
+    row = SimpleNamespace(
+        id=order_id, currency=CURRENCY, shipping_method=ShippingMethodChoices.express,
+        subtotal_amount=Decimal('5.00'), extra_amount=None,
+        shipping_price_amount=Decimal('25.50'), total_amount=Decimal('30.50'),
+    )
+    lines = [SimpleNamespace(order_id=order_id, total_price_amount=Decimal('5.00'))]
+    assert batch.calculate_shipping([row], lines, SHIPPING_PRICES) == []
+
+    row.total_amount = Decimal('5.00')
+    assert batch.calculate_shipping([row], lines, SHIPPING_PRICES) == [{
+        'id': order_id,
+        'subtotal_amount': Decimal('5.00'),
+        'base_shipping_price_amount': Decimal('25.50'),
+        'un_discounted_base_shipping_price_amount': Decimal('25.50'),
+        'shipping_price_amount': Decimal('25.50'),
+        'total_amount': Decimal('30.50'),
+    }]
+
+
+def test_price_order_matches_calculate_shipping():
+    lines = [Decimal('12.345'), None, Decimal('0.5')]
+    amounts = batch.price_order(lines, SHIPPING_PRICES['express'], CURRENCY, extra_amount=Decimal('1.00'))
+    assert amounts['total_amount'] == Decimal('39.35')
+
+    order_id = uuid4()
+    row = SimpleNamespace(
+        id=order_id, currency=CURRENCY, shipping_method=ShippingMethodChoices.express,
+        extra_amount=Decimal('1.00'), **{key: amounts[key] for key in (
+            'subtotal_amount', 'shipping_price_amount', 'total_amount'
+        )},
+    )
+    line_rows = [SimpleNamespace(order_id=order_id, total_price_amount=amount) for amount in lines]
+    assert batch.calculate_shipping([row], line_rows, SHIPPING_PRICES) == []
+
+
+@pytest.fixture
+def db():
+    engine = create_engine('sqlite://')
+    for table in (Order.__table__, OrderLine.__table__, OrderStatusCounter.__table__):
+        table.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_reprice_orders_shipping(db):
+    orders = []
+    for index, lines in enumerate(get_random_orders(7, divisor=100)):
+        order = Order(
+            id=uuid4(), code=f'ORD-{index}', user_id=uuid4(), origin='checkout', currency=CURRENCY,
+            shipping_method='express' if index % 2 else 'regular',
+            status=OrderStatusChoices.confirmed if index == 0 else OrderStatusChoices.unconfirmed,
+            subtotal_amount=Decimal(0), extra_amount=Decimal('1.00'),
+        )
+        orders.append((order, lines))
+        db.add(order)
+        db.add_all([
+            OrderLine(order_id=order.id, currency=CURRENCY, total_price_amount=amount,
+                      un_discounted_total_price_amount=amount)
+            for amount in lines
+        ])
+    db.commit()
+
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    event.listen(db, 'after_commit', count_commit)
+    assert batch.reprice_orders_shipping(db, SHIPPING_PRICES, batch_size=2) == 6
+    # Locks of a batch are released before the next one is read
+    assert len(commits) == 3
+    event.remove(db, 'after_commit', count_commit)
+    # Second run finds nothing to change
+    assert batch.reprice_orders_shipping(db, SHIPPING_PRICES, batch_size=2) == 0
+
+    for order, lines in orders:
+        row = db.execute(
+            select(Order.subtotal_amount, Order.shipping_price_amount, Order.total_amount)
+            .filter(Order.id == order.id)
+        ).one()
+        updated_at = db.execute(select(Order.updated_at).filter(Order.id == order.id)).scalar_one()
+        if order.status == OrderStatusChoices.confirmed:
+            assert row.shipping_price_amount is None and updated_at is None
+            continue
+        assert updated_at is not None
+        subtotal = sum(lines, Decimal('0.00'))
+        shipping = SHIPPING_PRICES[order.shipping_method.value]
+        assert row == (subtotal, shipping, subtotal + shipping + Decimal('1.00'))
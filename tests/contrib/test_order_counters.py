@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import Session
+
+from app.conf.config import settings
+from app.contrib.account.models import User  # noqa: F401, registers "user" table for foreign keys
+from app.contrib.order import OrderStatusChoices
+from app.contrib.order.models import Order, OrderStatusCounter
+from app.contrib.order.counters import reconcile_counters, fill_counts, GLOBAL_SCOPE
+
+
+def make_order(user_id, **kwargs) -> Order:
+    return Order(
+        code=f'ORD-{uuid4().hex[:8]}', user_id=user_id, origin='checkout', currency='TMT',
+        shipping_method='regular', subtotal_amount=Decimal('0'), **kwargs
+    )
+
+
+def get_counters(db: Session) -> dict:
+    rows = db.execute(
+        select(OrderStatusCounter.scope, OrderStatusCounter.status, func.sum(OrderStatusCounter.count)).group_by(
+            OrderStatusCounter.scope, OrderStatusCounter.status
+        )
+    )
+    return {(scope, status): count for scope, status, count in rows if count}
+
+
+@pytest.fixture
+def db():
+    engine = create_engine('sqlite://')
+    Order.__table__.create(engine)
+    OrderStatusCounter.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_counters_follow_order_changes(db):
+    alice, bob = uuid4(), uuid4()
+    orders = [make_order(alice), make_order(alice), make_order(bob), make_order(None)]
+    db.add_all(orders)
+    db.commit()
+    assert get_counters(db) == {
+        (GLOBAL_SCOPE, 'unconfirmed'): 4,
+        (str(alice), 'unconfirmed'): 2,
+        (str(bob), 'unconfirmed'): 1,
+    }
+
+    orders[0].status = OrderStatusChoices.canceled
+    orders[2].deleted_at = datetime.now(timezone.utc)
+    orders[3].note = 'not counted'
+    db.commit()
+    assert get_counters(db) == {
+        (GLOBAL_SCOPE, 'unconfirmed'): 2,
+        (GLOBAL_SCOPE, 'canceled'): 1,
+        (str(alice), 'unconfirmed'): 1,
+        (str(alice), 'canceled'): 1,
+    }
+
+    db.delete(orders[1])
+    orders[0].status = OrderStatusChoices.confirmed
+    db.rollback()
+    assert get_counters(db)[(str(alice), 'canceled')] == 1
+
+    expected = get_counters(db)
+    db.execute(OrderStatusCounter.__table__.update().values(count=100))
+    db.commit()
+    # Counter of bob's deleted order too
+    assert reconcile_counters(db) == len(expected) + 1
+    db.commit()
+    assert get_counters(db) == expected
+    assert reconcile_counters(db) == 0
+
+
+def test_global_counter_is_sharded(db, monkeypatch):
+    monkeypatch.setattr(settings, 'ORDER_COUNTER_SHARDS', 4)
+    for _ in range(20):
+        db.add(make_order(None))
+        db.commit()
+
+    shards = db.execute(
+        select(OrderStatusCounter.shard).filter(OrderStatusCounter.scope == GLOBAL_SCOPE)
+    ).scalars().all()
+    assert len(shards) > 1 and set(shards) <= {0, 1, 2, 3}
+    assert get_counters(db) == {(GLOBAL_SCOPE, 'unconfirmed'): 20}
+
+
+def test_fill_counts():
+    counts = fill_counts([('canceled', 2)])
+    assert counts['canceled'] == 2
+    assert counts['unconfirmed'] == 0
+    assert set(counts) == {status.value for status in OrderStatusChoices}
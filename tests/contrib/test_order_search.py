@@ -0,0 +1,35 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.contrib.order.models import Order
+from app.contrib.order.search import build_prefix_tsquery, get_search_criteria, ilike_contains
+
+
+def compile_pg(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect()))
+
+
+def test_build_prefix_tsquery():
+    assert build_prefix_tsquery('Aşgabat  mag') == 'aşgabat:* & mag:*'
+    assert build_prefix_tsquery("ORD-0001 | !x' & y:*") == 'ord:* & 0001:* & x:* & y:*'
+    assert build_prefix_tsquery(' -&| ') is None
+
+
+def test_ilike_contains_escapes_wildcards():
+    clause = ilike_contains(Order.code, '10%_')
+    assert clause.right.value == '%10\\%\\_%'
+    assert 'ILIKE' in compile_pg(clause)
+
+
+def test_search_criteria():
+    assert get_search_criteria('!!') is None
+
+    condition, rank = get_search_criteria('+993 65 123')
+    sql = compile_pg(select(Order.id).filter(condition).order_by(rank.desc()))
+    assert '"order".search_vector @@ to_tsquery' in sql
+    assert '"order".code ILIKE' in sql
+    assert '"order".phone LIKE' in sql
+    assert 'ORDER BY ts_rank("order".search_vector, to_tsquery' in sql
+
+    condition, _ = get_search_criteria('al')
+    assert 'code' not in compile_pg(condition)
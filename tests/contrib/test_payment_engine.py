@@ -0,0 +1,341 @@
+import asyncio
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event, select
+
+from app.core.exceptions import DocumentRawNotFound
+from app.contrib.account.models import User  # noqa: F401, registers "user" table for foreign keys
+from app.contrib.wallet.exceptions import WalletError
+from app.contrib.wallet.models import Wallet  # noqa: F401, registers "wallet" table for foreign keys
+from app.contrib.payment import (
+    ChargeStatusChoices, PaymentOperationChoices, PaymentTypeChoices, TransactionKindChoices, CustomPaymentChoices,
+)
+from app.contrib.payment.engine import begin_operation, run_operation
+from app.contrib.payment.exceptions import PaymentError, PaymentFollowUpError
+from app.contrib.payment.interface import GatewayResponse
+from app.contrib.payment.models import Payment, Transaction
+from app.contrib.plugins.base_plugin import BasePlugin
+from app.contrib.plugins.cache import plugin_snapshot_cache
+from app.contrib.plugins.manager import PluginsManager
+from app.contrib.plugins.models import PluginConfiguration
+
+
+class FakeGatewayPlugin(BasePlugin):
+    PLUGIN_ID = 'test.fake-gateway'
+    PLUGIN_NAME = 'Fake gateway'
+    DEFAULT_ACTIVE = True
+
+    # Manager instantiates plugins on every call, state is kept on the class
+    calls: list = []
+    in_flight = 0
+    max_in_flight = 0
+    error = None
+    # Holds gateway calls until set
+    release = None
+
+    async def _respond(self, kind, payment_information):
+        cls = type(self)
+        cls.calls.append((kind, payment_information.payment_id))
+        cls.in_flight += 1
+        cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            await asyncio.sleep(0.05)
+            if cls.release is not None:
+                await cls.release.wait()
+            if cls.error is not None:
+                raise cls.error
+        finally:
+            cls.in_flight -= 1
+        return GatewayResponse(
+            is_success=True, action_required=False, kind=kind, amount=payment_information.amount,
+            currency=payment_information.currency, transaction_id=f'{kind.value.lower()}-{uuid4().hex}',
+            raw_response={}, psp_reference='psp-1',
+        )
+
+    async def capture_payment(self, payment_information, previous_value, async_db=None):
+        return await self._respond(TransactionKindChoices.CAPTURE, payment_information)
+
+    async def refund_payment(self, payment_information, previous_value, async_db=None):
+        return await self._respond(TransactionKindChoices.REFUND, payment_information)
+
+
+@pytest.fixture
+async def async_engine(tmp_path):
+    pytest.importorskip('aiosqlite')
+    fakeredis = pytest.importorskip('fakeredis')
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "db.sqlite"}', connect_args={'timeout': 30})
+
+    # sqlite has no row locks and ignores FOR UPDATE, BEGIN IMMEDIATE serializes
+    # transactions like the payment row lock does on postgres
+    @event.listens_for(engine.sync_engine, 'connect')
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, 'begin')
+    def do_begin(conn):
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+    async with engine.begin() as conn:
+        for table in (Payment.__table__, Transaction.__table__, PluginConfiguration.__table__):
+            await conn.run_sync(table.create)
+    FakeGatewayPlugin.calls = []
+    FakeGatewayPlugin.max_in_flight = 0
+    FakeGatewayPlugin.error = None
+    FakeGatewayPlugin.release = None
+    plugin_snapshot_cache.configure(fakeredis.FakeAsyncRedis(decode_responses=True))
+    yield engine
+    plugin_snapshot_cache.configure(None)
+    await engine.dispose()
+
+
+def get_manager() -> PluginsManager:
+    return PluginsManager([f'{__name__}.FakeGatewayPlugin'])
+
+
+def get_session(engine):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    return AsyncSession(engine, expire_on_commit=False, autoflush=False)
+
+
+async def create_payment(
+        engine, gateway=FakeGatewayPlugin.PLUGIN_ID, captured=Decimal(0),
+        charge_status=ChargeStatusChoices.NOT_CHARGED, token_kind=TransactionKindChoices.AUTH,
+) -> Payment:
+    async with get_session(engine) as async_db:
+        payment = Payment(
+            gateway=gateway, payment_type=PaymentTypeChoices.deposit, charge_status=charge_status,
+            total_amount=Decimal('100.00'), captured_amount=captured, currency='TMT', is_active=True,
+            extra_data={}, public_metadata={}, private_metadata={},
+        )
+        async_db.add(payment)
+        await async_db.flush()
+        async_db.add(Transaction(
+            payment_id=payment.id, kind=token_kind, token='token-1', is_success=True,
+            amount=Decimal('100.00'), currency='TMT', action_required_data={}, gateway_response={},
+        ))
+        await async_db.commit()
+    return payment
+
+
+async def run(engine, payment, operation, **kwargs):
+    async with get_session(engine) as async_db:
+        return await run_operation(async_db, payment, operation, get_manager(), **kwargs)
+
+
+async def get_state(engine, payment_id):
+    async with get_session(engine) as async_db:
+        payment = (await async_db.execute(select(Payment).filter(Payment.id == payment_id))).scalar_one()
+        transactions = (await async_db.execute(
+            select(Transaction).filter(Transaction.payment_id == payment_id).order_by(Transaction.id)
+        )).scalars().all()
+    return payment, transactions
+
+
+async def test_operations_on_different_payments_run_concurrently(async_engine):
+    payments = [await create_payment(async_engine) for _ in range(5)]
+
+    results = await asyncio.gather(*(
+        run(async_engine, payment, PaymentOperationChoices.CAPTURE) for payment in payments
+    ))
+
+    assert all(txn.is_success for _, txn in results)
+    # Gateway calls overlapped, no payment waited for another one
+    assert FakeGatewayPlugin.max_in_flight > 1
+    for payment in payments:
+        db_payment, transactions = await get_state(async_engine, payment.id)
+        assert db_payment.charge_status == ChargeStatusChoices.FULLY_CHARGED
+        assert db_payment.captured_amount == Decimal('100.00')
+        assert db_payment.psp_reference == 'psp-1'
+        assert [txn.kind for txn in transactions] == [
+            TransactionKindChoices.AUTH, TransactionKindChoices.IN_PROGRESS, TransactionKindChoices.CAPTURE,
+        ]
+        assert all(txn.is_already_processed for txn in transactions[1:])
+
+
+async def run_duplicates(engine, payment, operation, count, **kwargs) -> list:
+    """
+    Run duplicates with the gateway held until all but one were refused, return results in completion order
+    """
+    FakeGatewayPlugin.release = asyncio.Event()
+    tasks = [asyncio.create_task(run(engine, payment, operation, **kwargs)) for _ in range(count)]
+    results = []
+    try:
+        for future in asyncio.as_completed(tasks, timeout=30):
+            try:
+                results.append(await future)
+            except PaymentError as e:
+                results.append(e)
+            if len(results) == count - 1:
+                FakeGatewayPlugin.release.set()
+    finally:
+        FakeGatewayPlugin.release = None
+    return results
+
+
+async def test_concurrent_duplicates_on_one_payment(async_engine):
+    payment = await create_payment(async_engine)
+
+    *refused, result = await run_duplicates(async_engine, payment, PaymentOperationChoices.CAPTURE, 3)
+
+    # Busy or already captured, depending on when the duplicate came, never a second gateway call
+    assert all(isinstance(error, PaymentError) for error in refused)
+    assert result[1].is_success
+    assert len(FakeGatewayPlugin.calls) == 1
+    db_payment, _ = await get_state(async_engine, payment.id)
+    assert db_payment.captured_amount == Decimal('100.00')
+
+    # Later capture is refused by the state machine, refunds race the same way
+    with pytest.raises(PaymentError):
+        await run(async_engine, payment, PaymentOperationChoices.CAPTURE)
+    refused, result = await run_duplicates(
+        async_engine, payment, PaymentOperationChoices.REFUND, 2, amount=Decimal('40.00'),
+    )
+    assert isinstance(refused, PaymentError)
+    assert result[1].is_success
+    assert len(FakeGatewayPlugin.calls) == 2
+    db_payment, _ = await get_state(async_engine, payment.id)
+    assert db_payment.captured_amount == Decimal('60.00')
+    assert db_payment.charge_status == ChargeStatusChoices.PARTIALLY_REFUNDED
+
+
+async def test_failed_gateway_call_releases_payment(async_engine):
+    payment = await create_payment(async_engine)
+    FakeGatewayPlugin.error = RuntimeError('connection reset')
+
+    with pytest.raises(RuntimeError):
+        await run(async_engine, payment, PaymentOperationChoices.CAPTURE)
+    db_payment, transactions = await get_state(async_engine, payment.id)
+    assert db_payment.charge_status == ChargeStatusChoices.NOT_CHARGED
+    assert transactions[-1].kind == TransactionKindChoices.IN_PROGRESS
+    assert transactions[-1].is_already_processed and transactions[-1].error == 'connection reset'
+
+    FakeGatewayPlugin.error = None
+    _, txn = await run(async_engine, payment, PaymentOperationChoices.CAPTURE, amount=Decimal('30.00'))
+    assert txn.is_success
+    db_payment, _ = await get_state(async_engine, payment.id)
+    assert db_payment.charge_status == ChargeStatusChoices.PARTIALLY_CHARGED
+
+
+async def test_missing_payment_is_not_busy(async_engine):
+    async with get_session(async_engine) as async_db:
+        with pytest.raises(DocumentRawNotFound):
+            await begin_operation(async_db, uuid4(), PaymentOperationChoices.CAPTURE)
+
+
+async def test_manual_refund_runs_on_success(async_engine):
+    payment = await create_payment(
+        async_engine, gateway=CustomPaymentChoices.MANUAL.value, captured=Decimal('100.00'),
+        charge_status=ChargeStatusChoices.FULLY_CHARGED, token_kind=TransactionKindChoices.EXTERNAL,
+    )
+    callbacks = []
+
+    async def on_success(async_db, db_payment, txn):
+        callbacks.append((db_payment.charge_status, txn.kind, txn.amount))
+
+    async with get_session(async_engine) as async_db:
+        await run_operation(async_db, payment, PaymentOperationChoices.REFUND, on_success=on_success)
+
+    assert callbacks == [(ChargeStatusChoices.FULLY_REFUNDED, TransactionKindChoices.REFUND, Decimal('100.00'))]
+    assert FakeGatewayPlugin.calls == []
+    db_payment, _ = await get_state(async_engine, payment.id)
+    assert db_payment.charge_status == ChargeStatusChoices.FULLY_REFUNDED
+    assert not db_payment.is_active
+
+
+async def test_manual_refund_failed_on_success_rolls_back(async_engine):
+    payment = await create_payment(
+        async_engine, gateway=CustomPaymentChoices.MANUAL.value, captured=Decimal('100.00'),
+        charge_status=ChargeStatusChoices.FULLY_CHARGED, token_kind=TransactionKindChoices.EXTERNAL,
+    )
+
+    async def on_success(async_db, db_payment, txn):
+        raise WalletError('Insufficient funds')
+
+    with pytest.raises(WalletError):
+        await run(async_engine, payment, PaymentOperationChoices.REFUND, on_success=on_success)
+
+    # No gateway moved money, the refund is not stored
+    db_payment, transactions = await get_state(async_engine, payment.id)
+    assert db_payment.charge_status == ChargeStatusChoices.FULLY_CHARGED
+    assert db_payment.captured_amount == Decimal('100.00')
+    assert [txn.kind for txn in transactions[1:]] == [TransactionKindChoices.IN_PROGRESS]
+    assert transactions[1].is_already_processed and transactions[1].error == 'Insufficient funds'
+
+
+async def test_failed_on_success_keeps_gateway_result(async_engine):
+    payment = await create_payment(
+        async_engine, captured=Decimal('100.00'), charge_status=ChargeStatusChoices.FULLY_CHARGED,
+        token_kind=TransactionKindChoices.CAPTURE,
+    )
+
+    async def on_success(async_db, db_payment, txn):
+        raise WalletError('Insufficient funds')
+
+    with pytest.raises(PaymentFollowUpError) as exc_info:
+        await run(async_engine, payment, PaymentOperationChoices.REFUND, on_success=on_success)
+
+    assert exc_info.value.message == 'Insufficient funds'
+    assert exc_info.value.transaction.is_success
+    assert len(FakeGatewayPlugin.calls) == 1
+    db_payment, transactions = await get_state(async_engine, payment.id)
+    assert db_payment.charge_status == ChargeStatusChoices.FULLY_REFUNDED
+    assert [txn.kind for txn in transactions[1:]] == [TransactionKindChoices.IN_PROGRESS, TransactionKindChoices.REFUND]
+    # Intent is closed by the stored refund, not aborted
+    assert all(txn.is_already_processed for txn in transactions[1:]) and not transactions[1].error
+
+
+async def test_refund_route_is_idempotent(async_engine):
+    fakeredis = pytest.importorskip('fakeredis')
+    from fastapi import FastAPI
+    from httpx import AsyncClient, ASGITransport
+
+    from app.conf.config import settings
+    from app.core.idempotency import IdempotencyMiddleware, IDEMPOTENCY_HEADER, IDEMPOTENCY_REPLAYED_HEADER
+    from app.contrib.payment.api import api
+    from app.contrib.wallet.models import WalletEntry
+    from app.routers.dependency import get_async_db, get_staff_user
+
+    async with async_engine.begin() as conn:
+        for table in (Wallet.__table__, WalletEntry.__table__):
+            await conn.run_sync(table.create)
+    async with get_session(async_engine) as async_db:
+        wallet = Wallet(user_id=uuid4(), currency='TMT', amount=Decimal('100.00'))
+        async_db.add(wallet)
+        await async_db.commit()
+    payment = await create_payment(
+        async_engine, gateway=CustomPaymentChoices.MANUAL.value, captured=Decimal('100.00'),
+        charge_status=ChargeStatusChoices.FULLY_CHARGED, token_kind=TransactionKindChoices.EXTERNAL,
+    )
+    async with get_session(async_engine) as async_db:
+        db_payment = await async_db.get(Payment, payment.id)
+        db_payment.wallet_id = wallet.id
+        await async_db.commit()
+
+    async def get_test_db():
+        async with get_session(async_engine) as async_db:
+            yield async_db
+
+    application = FastAPI()
+    application.include_router(api, prefix='/payment')
+    application.add_middleware(IdempotencyMiddleware, route_names=settings.IDEMPOTENT_ROUTES)
+    application.aioredis_instance = fakeredis.FakeAsyncRedis(decode_responses=True)
+    application.dependency_overrides[get_async_db] = get_test_db
+    application.dependency_overrides[get_staff_user] = lambda: None
+
+    headers = {IDEMPOTENCY_HEADER: 'refund-1'}
+    async with AsyncClient(transport=ASGITransport(app=application), base_url='http://test') as client:
+        first = await client.post(f'/payment/{payment.id}/refund/', headers=headers)
+        retry = await client.post(f'/payment/{payment.id}/refund/', headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert IDEMPOTENCY_REPLAYED_HEADER in retry.headers
+    async with get_session(async_engine) as async_db:
+        entries = (await async_db.scalars(select(WalletEntry))).all()
+        assert [entry.amount for entry in entries] == [Decimal('-100.00')]
+        assert (await async_db.get(Wallet, wallet.id)).amount == Decimal('0.00')
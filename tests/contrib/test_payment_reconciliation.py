@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.contrib.account.models import User  # noqa: F401, registers "user" table for foreign keys
+from app.contrib.wallet.models import Wallet  # noqa: F401, registers "wallet" table for foreign keys
+from app.contrib.payment import ChargeStatusChoices, PaymentTypeChoices, TransactionKindChoices
+from app.contrib.payment.models import Payment, Transaction
+from app.contrib.payment.reconciliation import reconcile_payments
+
+
+def add_payment(db, captured, charge_status, transactions, total=Decimal('100.00')) -> UUID:
+    payment = Payment(
+        gateway='test.gateway', payment_type=PaymentTypeChoices.deposit, charge_status=charge_status,
+        total_amount=total, captured_amount=captured, currency='TMT', is_active=True,
+        extra_data={}, public_metadata={}, private_metadata={},
+    )
+    db.add(payment)
+    db.flush()
+    for kind, amount, *rest in transactions:
+        db.add(Transaction(
+            payment_id=payment.id, kind=kind, amount=amount, is_success=rest[0] if rest else True,
+            currency='TMT', action_required_data={}, gateway_response={},
+        ))
+    db.flush()
+    return payment.id
+
+
+def test_reconcile_payments(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "db.sqlite"}')
+    for table in (Payment.__table__, Transaction.__table__):
+        table.create(engine)
+
+    with Session(engine) as db:
+        consistent = add_payment(db, Decimal('100.00'), ChargeStatusChoices.FULLY_CHARGED, [
+            (TransactionKindChoices.AUTH, Decimal('100.00')),
+            (TransactionKindChoices.CAPTURE, Decimal('100.00')),
+        ])
+        lost_capture = add_payment(db, Decimal('0'), ChargeStatusChoices.NOT_CHARGED, [
+            (TransactionKindChoices.CAPTURE, Decimal('30.00')),
+            (TransactionKindChoices.CAPTURE, Decimal('20.00'), False),
+        ])
+        lost_refund = add_payment(db, Decimal('100.00'), ChargeStatusChoices.FULLY_CHARGED, [
+            (TransactionKindChoices.EXTERNAL, Decimal('100.00')),
+            (TransactionKindChoices.REFUND, Decimal('100.00')),
+        ])
+        pending = add_payment(db, Decimal('0'), ChargeStatusChoices.PENDING, [
+            (TransactionKindChoices.AUTH, Decimal('100.00')),
+        ])
+        without_transactions = add_payment(db, Decimal('5.00'), ChargeStatusChoices.PARTIALLY_CHARGED, [])
+        in_flight = add_payment(db, Decimal('0'), ChargeStatusChoices.NOT_CHARGED, [
+            (TransactionKindChoices.CAPTURE, Decimal('100.00')),
+            (TransactionKindChoices.IN_PROGRESS, Decimal('100.00'), False),
+        ])
+        stale = add_payment(db, Decimal('0'), ChargeStatusChoices.NOT_CHARGED, [
+            (TransactionKindChoices.CAPTURE, Decimal('100.00')),
+            (TransactionKindChoices.IN_PROGRESS, Decimal('100.00'), False),
+        ])
+        db.execute(
+            Transaction.__table__.update()
+            .where(Transaction.payment_id == stale, Transaction.kind == TransactionKindChoices.IN_PROGRESS)
+            .values(created_at=datetime.now(timezone.utc) - timedelta(days=1))
+        )
+        db.commit()
+
+        report = reconcile_payments(db, batch_size=2)
+
+        assert report.scanned == 6
+        assert report.fixed == 3
+        assert report.without_transactions == 1
+        assert report.stale_intents == 1
+        assert {drift['id'] for drift in report.drifted} == {str(lost_capture), str(lost_refund), str(stale)}
+        intents = dict(db.execute(
+            select(Transaction.payment_id, Transaction.is_already_processed)
+            .filter(Transaction.kind == TransactionKindChoices.IN_PROGRESS)
+        ).all())
+        assert intents == {in_flight: False, stale: True}
+        states = dict(
+            (payment_id, (captured, status)) for payment_id, captured, status in
+            db.execute(select(Payment.id, Payment.captured_amount, Payment.charge_status))
+        )
+        assert states == {
+            consistent: (Decimal('100.00'), ChargeStatusChoices.FULLY_CHARGED),
+            lost_capture: (Decimal('30.00'), ChargeStatusChoices.PARTIALLY_CHARGED),
+            lost_refund: (Decimal('0.00'), ChargeStatusChoices.FULLY_REFUNDED),
+            pending: (Decimal('0.00'), ChargeStatusChoices.PENDING),
+            without_transactions: (Decimal('5.00'), ChargeStatusChoices.PARTIALLY_CHARGED),
+            # Left to the operation in flight
+            in_flight: (Decimal('0.00'), ChargeStatusChoices.NOT_CHARGED),
+            # Intent of a crashed worker no longer blocks it
+            stale: (Decimal('100.00'), ChargeStatusChoices.FULLY_CHARGED),
+        }
+
+        # Second run has nothing to fix
+        assert reconcile_payments(db, batch_size=2).fixed == 0
+    engine.dispose()
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.conf.config import settings
+from app.contrib.plugins.base_plugin import BasePlugin
+from app.contrib.plugins.cache import PLUGIN_CONFIG_VERSION_KEY, plugin_snapshot_cache
+from app.contrib.plugins.manager import PluginsManager, load_hook_argument
+from app.contrib.plugins.models import PluginConfiguration
+from app.contrib.plugins.tasks import run_plugin_hook_task
+
+
+class SyncPlugin(BasePlugin):
+    PLUGIN_ID = 'test.sync'
+    DEFAULT_ACTIVE = True
+
+    def order_created(self, order, previous_value):
+        return previous_value + [('sync', order)]
+
+
+class AsyncPlugin(BasePlugin):
+    PLUGIN_ID = 'test.async'
+    DEFAULT_ACTIVE = True
+
+    async def order_created(self, order, previous_value):
+        return previous_value + [('async', order)]
+
+    async def order_updated(self, order, previous_value):
+        return NotImplemented
+
+
+class InactivePlugin(AsyncPlugin):
+    PLUGIN_ID = 'test.inactive'
+    DEFAULT_ACTIVE = False
+
+
+class NoHooksPlugin(BasePlugin):
+    PLUGIN_ID = 'test.no-hooks'
+    DEFAULT_ACTIVE = True
+
+
+class SlowPlugin(BasePlugin):
+    PLUGIN_ID = 'test.slow'
+    DEFAULT_ACTIVE = True
+    HOOK_TIMEOUT = 0.3
+    notified: list = []
+
+    async def customer_updated(self, customer, previous_value):
+        await asyncio.sleep(customer['delay'])
+        type(self).notified.append((self.PLUGIN_ID, customer['id']))
+
+
+class OtherSlowPlugin(SlowPlugin):
+    PLUGIN_ID = 'test.other-slow'
+
+
+class SyncSlowPlugin(SlowPlugin):
+    PLUGIN_ID = 'test.sync-slow'
+
+    def customer_updated(self, customer, previous_value):
+        time.sleep(customer['delay'])
+        type(self).notified.append((self.PLUGIN_ID, customer['id']))
+
+
+class FailingPlugin(SlowPlugin):
+    PLUGIN_ID = 'test.failing'
+
+    async def customer_updated(self, customer, previous_value):
+        raise RuntimeError('webhook failed')
+
+
+class SyncConfigPlugin(BasePlugin):
+    PLUGIN_ID = 'test.sync-config'
+    DEFAULT_ACTIVE = True
+    received: list = []
+
+    def customer_updated(self, customer, previous_value):
+        type(self).received.append(customer)
+
+
+class AsyncConfigPlugin(SyncConfigPlugin):
+    PLUGIN_ID = 'test.async-config'
+
+    async def customer_updated(self, customer, previous_value):
+        type(self).received.append(customer)
+
+
+class DeferredPlugin(SlowPlugin):
+    PLUGIN_ID = 'test.deferred'
+    DEFERRED_HOOKS = ('customer_updated',)
+
+
+@pytest.fixture
+def aioredis_instance():
+    fakeredis = pytest.importorskip('fakeredis')
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    plugin_snapshot_cache.configure(redis)
+    yield redis
+    plugin_snapshot_cache.configure(None)
+
+
+@pytest.fixture
+async def async_db(tmp_path, aioredis_instance):
+    pytest.importorskip('aiosqlite')
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "db.sqlite"}')
+    async with engine.begin() as conn:
+        await conn.run_sync(PluginConfiguration.__table__.create)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+def get_manager() -> PluginsManager:
+    return PluginsManager([
+        f'{__name__}.{name}' for name in ('SyncPlugin', 'NoHooksPlugin', 'InactivePlugin', 'AsyncPlugin')
+    ])
+
+
+async def test_run_method_on_plugins_chains_active_implementations(async_db):
+    manager = get_manager()
+    run = manager._PluginsManager__run_method_on_plugins
+
+    assert await run(async_db, 'order_created', [], 1) == [('sync', 1), ('async', 1)]
+    # NotImplemented keeps previous value, missing hooks return default value
+    assert await run(async_db, 'order_updated', 'default', 1) == 'default'
+    assert await run(async_db, 'order_cancelled', 'default', 1) == 'default'
+    assert await run(async_db, 'order_created', [], 2, plugin_ids=['test.async']) == [('async', 2)]
+
+    table = manager._get_dispatch_table('order_created')
+    assert [method.__self__.PLUGIN_ID for method, _ in table] == ['test.sync', 'test.async']
+    assert [is_async for _, is_async in table] == [False, True]
+    assert manager._get_dispatch_table('order_created') is table
+
+
+async def test_save_plugin_configuration_rebuilds_dispatch_tables(async_db):
+    manager = get_manager()
+    run = manager._PluginsManager__run_method_on_plugins
+    assert await run(async_db, 'order_created', [], 1) == [('sync', 1), ('async', 1)]
+
+    await manager.save_plugin_configuration('test.inactive', {'is_active': True}, async_db)
+
+    assert await run(async_db, 'order_created', [], 1) == [('sync', 1), ('async', 1), ('async', 1)]
+
+
+async def test_plugin_snapshot_is_shared_until_version_changes(async_db, aioredis_instance, monkeypatch):
+    first, second = get_manager(), get_manager()
+    plugins = await first.get_all_plugins(async_db)
+    assert all(a is b for a, b in zip(plugins, await second.get_all_plugins(async_db), strict=True))
+    assert second._get_dispatch_table('order_created') is first._get_dispatch_table('order_created')
+
+    # Another process saved a configuration
+    await aioredis_instance.incr(PLUGIN_CONFIG_VERSION_KEY)
+    assert (await get_manager().get_all_plugins(async_db))[0] is plugins[0]
+    monkeypatch.setattr(settings, 'PLUGINS_VERSION_CHECK_SECONDS', 0)
+    assert (await get_manager().get_all_plugins(async_db))[0] is not plugins[0]
+
+
+async def test_save_plugin_configuration_bumps_version(async_db, aioredis_instance):
+    manager = get_manager()
+    await manager.save_plugin_configuration('test.sync', {'is_active': False}, async_db)
+
+    assert await aioredis_instance.get(PLUGIN_CONFIG_VERSION_KEY) == '1'
+    assert [plugin.PLUGIN_ID for plugin in await get_manager().get_plugins(async_db, active_only=True)] == [
+        'test.no-hooks', 'test.async',
+    ]
+
+
+async def test_fan_out_runs_plugins_concurrently(async_db, monkeypatch):
+    deferred = []
+    monkeypatch.setattr(run_plugin_hook_task, 'delay', lambda *args: deferred.append(args))
+    SlowPlugin.notified = []
+    manager = PluginsManager([
+        f'{__name__}.{name}'
+        for name in ('SlowPlugin', 'OtherSlowPlugin', 'SyncSlowPlugin', 'FailingPlugin', 'DeferredPlugin')
+    ])
+
+    start = time.perf_counter()
+    await manager.customer_updated(async_db, {'id': 1, 'delay': 0.1})
+    assert time.perf_counter() - start < 0.25
+    assert sorted(SlowPlugin.notified) == [('test.other-slow', 1), ('test.slow', 1), ('test.sync-slow', 1)]
+    assert deferred == [
+        (f'{__name__}.DeferredPlugin', 'customer_updated', ({'id': 1, 'delay': 0.1},), {}),
+    ]
+
+    # Plugins over their timeout are not waited for
+    start = time.perf_counter()
+    await manager.customer_updated(async_db, {'id': 2, 'delay': 0.8})
+    assert time.perf_counter() - start < 0.6
+
+
+async def test_deferred_hook_sends_primary_keys(async_db, tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    deferred = []
+    monkeypatch.setattr(run_plugin_hook_task, 'delay', lambda *args: deferred.append(args))
+    config = PluginConfiguration(identifier='test.other', name='Other', configuration=[])
+    async_db.add(config)
+    await async_db.commit()
+    manager = PluginsManager([f'{__name__}.DeferredPlugin'])
+
+    await manager.customer_updated(async_db, config)
+    [(_, _, args, kwargs)] = deferred
+    assert args == ({'__model__': 'app.contrib.plugins.models.PluginConfiguration', 'pk': str(config.id)},)
+    json.dumps([args, kwargs])
+
+    engine = create_engine(f'sqlite:///{tmp_path / "db.sqlite"}')
+    with Session(engine) as db:
+        assert load_hook_argument(db, args[0]).identifier == 'test.other'
+        assert load_hook_argument(db, {'id': 1, 'delay': 0.1}) == {'id': 1, 'delay': 0.1}
+    engine.dispose()
+
+    # Broker errors are logged, the caller goes on
+    def delay(*args):
+        raise ConnectionError('broker is down')
+
+    monkeypatch.setattr(run_plugin_hook_task, 'delay', delay)
+    await manager.customer_updated(async_db, config)
+
+
+async def test_sync_plugins_get_detached_copies(async_db):
+    from sqlalchemy.orm import object_session
+
+    SyncConfigPlugin.received = []
+    config = PluginConfiguration(identifier='test.other', name='Other', configuration=[{'name': 'key'}])
+    async_db.add(config)
+    await async_db.commit()
+    manager = PluginsManager([f'{__name__}.SyncConfigPlugin', f'{__name__}.AsyncConfigPlugin'])
+
+    await manager.customer_updated(async_db, config)
+
+    [copy, original] = SyncConfigPlugin.received
+    assert original is config
+    assert copy is not config and object_session(copy) is None
+    assert (copy.id, copy.identifier, copy.configuration) == (config.id, 'test.other', [{'name': 'key'}])
+    assert copy.configuration is not config.configuration
+
+
+async def test_no_plugins_skips_loading():
+    manager = PluginsManager([])
+    # No session, redis or plugin table is needed
+    await manager.customer_updated(None, {'id': 1})
+    assert manager.all_plugins == []
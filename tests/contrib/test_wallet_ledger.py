@@ -0,0 +1,178 @@
+import asyncio
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import Session
+
+from app.contrib.account.models import User  # noqa: F401, registers "user" table for foreign keys
+from app.contrib.payment.models import Payment  # noqa: F401, registers "payment" table for foreign keys
+from app.contrib.wallet import WalletEntryTypeChoices
+from app.contrib.wallet.exceptions import InsufficientFundsError
+from app.contrib.wallet.ledger import apply_entry, get_ledger_balance, snapshot_balances
+from app.contrib.wallet.models import Wallet, WalletEntry, WalletBalanceSnapshot
+from app.contrib.wallet.repository import wallet_repo
+
+WALLET_TABLES = (Wallet.__table__, WalletEntry.__table__, WalletBalanceSnapshot.__table__)
+
+
+@pytest.fixture
+async def async_engine(tmp_path):
+    pytest.importorskip('aiosqlite')
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "db.sqlite"}', connect_args={'timeout': 30}
+    )
+    async with engine.begin() as conn:
+        for table in WALLET_TABLES:
+            await conn.run_sync(table.create)
+    yield engine
+    await engine.dispose()
+
+
+async def create_wallet(engine, amount=Decimal(0)):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    async with AsyncSession(engine, expire_on_commit=False) as async_db:
+        wallet = await wallet_repo.get_or_create(async_db, user_id=uuid4(), currency='TMT')
+        wallet.amount = amount
+        await async_db.commit()
+    return wallet
+
+
+async def test_apply_entry_concurrent_no_lost_updates(async_engine):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    wallet = await create_wallet(async_engine)
+    amounts = [Decimal(i) / 4 for i in range(1, 51)]
+
+    async def deposit(amount):
+        async with AsyncSession(async_engine) as async_db:
+            await apply_entry(
+                async_db, wallet_id=wallet.id, amount=amount, entry_type=WalletEntryTypeChoices.deposit
+            )
+            await async_db.commit()
+
+    await asyncio.gather(*(deposit(amount) for amount in amounts))
+
+    async with AsyncSession(async_engine) as async_db:
+        db_wallet = (await async_db.execute(select(Wallet).filter(Wallet.id == wallet.id))).scalar_one()
+        assert db_wallet.amount == sum(amounts)
+        entries = (await async_db.execute(select(WalletEntry).order_by(WalletEntry.id))).scalars().all()
+        assert len(entries) == len(amounts)
+        # Balances are a running sum in commit order, so every entry saw the previous one
+        balance = Decimal(0)
+        for entry in entries:
+            balance += entry.amount
+            assert entry.balance == balance
+        assert await get_ledger_balance(async_db, wallet.id) == db_wallet.amount
+
+
+async def test_apply_entry_insufficient_funds(async_engine):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    wallet = await create_wallet(async_engine, Decimal('10.00'))
+    async with AsyncSession(async_engine) as async_db:
+        with pytest.raises(InsufficientFundsError):
+            await apply_entry(
+                async_db, wallet_id=wallet.id, amount=Decimal('-10.01'), entry_type=WalletEntryTypeChoices.withdraw
+            )
+        entry = await apply_entry(
+            async_db, wallet_id=wallet.id, amount=Decimal('-10.01'),
+            entry_type=WalletEntryTypeChoices.adjustment, allow_negative=True,
+        )
+        assert entry.balance == Decimal('-0.01')
+        await async_db.commit()
+
+
+async def test_get_or_create_returns_same_wallet(async_engine):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    user_id = uuid4()
+    async with AsyncSession(async_engine) as async_db:
+        first = await wallet_repo.get_or_create(async_db, user_id=user_id)
+        second = await wallet_repo.get_or_create(async_db, user_id=user_id)
+        assert first.id == second.id
+        await async_db.commit()
+        assert (await async_db.execute(select(func.count(Wallet.id)))).scalar_one() == 1
+
+
+def test_snapshot_balances(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "db.sqlite"}')
+    for table in WALLET_TABLES:
+        table.create(engine)
+    wallet_ids = [uuid4(), uuid4()]
+
+    def add_entries(db, wallet_id, amounts):
+        balance = db.execute(select(Wallet.amount).filter(Wallet.id == wallet_id)).scalar_one()
+        for amount in amounts:
+            balance += amount
+            db.add(WalletEntry(
+                wallet_id=wallet_id, entry_type=WalletEntryTypeChoices.deposit, amount=amount, balance=balance
+            ))
+        db.execute(Wallet.__table__.update().where(Wallet.id == wallet_id).values(amount=balance))
+        db.flush()
+
+    with Session(engine) as db:
+        db.add_all([Wallet(id=wallet_id, user_id=uuid4(), currency='TMT', amount=0) for wallet_id in wallet_ids])
+        add_entries(db, wallet_ids[0], [Decimal('1.50'), Decimal('2.25')])
+        add_entries(db, wallet_ids[1], [Decimal('5.00')])
+        assert snapshot_balances(db) == 2
+        db.commit()
+
+        assert snapshot_balances(db) == 0
+        add_entries(db, wallet_ids[0], [Decimal('-0.75')])
+        assert snapshot_balances(db) == 1
+        db.commit()
+
+        snapshots = db.execute(
+            select(WalletBalanceSnapshot.wallet_id, WalletBalanceSnapshot.entry_id, WalletBalanceSnapshot.balance)
+        ).all()
+        assert sorted((entry_id, wallet_id, balance) for wallet_id, entry_id, balance in snapshots) == [
+            (2, wallet_ids[0], Decimal('3.75')), (3, wallet_ids[1], Decimal('5.00')), (4, wallet_ids[0], Decimal('3.00')),
+        ]
+    engine.dispose()
+
+
+def test_ledger_migration_opens_existing_balances(tmp_path):
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+    from alembic.script import ScriptDirectory
+
+    from datetime import datetime, timezone
+    from sqlalchemy import event
+
+    engine = create_engine(f'sqlite:///{tmp_path / "db.sqlite"}')
+
+    # Server default of created_at is postgres now()
+    @event.listens_for(engine, 'connect')
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function('now', 0, lambda: datetime.now(timezone.utc).isoformat(' '))
+
+    Wallet.__table__.create(engine)
+    wallet_ids = [uuid4(), uuid4()]
+    with Session(engine) as db:
+        db.add_all([
+            Wallet(id=wallet_ids[0], user_id=uuid4(), currency='TMT', amount=Decimal('12.50')),
+            Wallet(id=wallet_ids[1], user_id=uuid4(), currency='TMT', amount=Decimal(0)),
+        ])
+        db.commit()
+
+    migration = ScriptDirectory('alembic').get_revision('c4d2e8f1a7b3').module
+    with engine.begin() as connection, Operations.context(MigrationContext.configure(connection)):
+        migration.upgrade()
+
+    with Session(engine) as db:
+        entries = db.execute(select(WalletEntry).order_by(WalletEntry.id)).scalars().all()
+        assert {(entry.wallet_id, entry.entry_type, entry.amount, entry.balance) for entry in entries} == {
+            (wallet_ids[0], WalletEntryTypeChoices.opening, Decimal('12.50'), Decimal('12.50')),
+            (wallet_ids[1], WalletEntryTypeChoices.opening, Decimal(0), Decimal(0)),
+        }
+        # Nothing to report as drift
+        assert snapshot_balances(db) == 2
+        assert {snapshot.balance for snapshot in db.execute(select(WalletBalanceSnapshot)).scalars()} == {
+            Decimal('12.50'), Decimal(0),
+        }
+    engine.dispose()
@@ -0,0 +1,46 @@
+import pytest
+
+from app.core.celery_app import celery_app, CELERY_QUEUES
+from app.contrib.account import tasks as account_tasks  # noqa: F401, registers tasks
+from app.contrib.export import tasks as export_tasks
+from app.contrib.file import tasks as file_tasks  # noqa: F401
+from app.contrib.order import tasks as order_tasks  # noqa: F401
+from app.contrib.payment import tasks as payment_tasks  # noqa: F401
+from app.contrib.wallet import tasks as wallet_tasks  # noqa: F401
+
+
+@pytest.mark.parametrize('task_name, queue, priority', [
+    ('app.contrib.account.tasks.send_reset_password_email_task', 'auth', 0),
+    ('app.contrib.account.tasks.send_email_verification_task', 'auth', None),
+    ('app.contrib.account.tasks.send_emails_task', 'auth', None),
+    ('app.contrib.export.tasks.export_task', 'bulk', None),
+    ('app.contrib.order.tasks.reprice_orders_shipping_task', 'bulk', None),
+    ('app.contrib.file.tasks.cleanup_expired_uploads_task', 'media', None),
+    ('app.contrib.order.tasks.notify_order_placed_task', 'celery', None),
+])
+def test_task_routes(task_name, queue, priority):
+    options = celery_app.amqp.router.route({}, task_name)
+
+    assert options['queue'].name == queue
+    assert options.get('priority') == priority
+    assert queue in CELERY_QUEUES
+
+
+def test_only_polled_tasks_keep_results():
+    assert celery_app.conf.task_ignore_result
+    assert export_tasks.export_task.ignore_result is False
+    assert celery_app.tasks['app.contrib.account.tasks.send_emails_task'].ignore_result
+
+
+@pytest.mark.parametrize('task_name', [
+    'app.contrib.export.tasks.export_task',
+    'app.contrib.order.tasks.reconcile_order_status_counters_task',
+    'app.contrib.order.tasks.reprice_orders_shipping_task',
+    'app.contrib.payment.tasks.reconcile_payments_task',
+    'app.contrib.wallet.tasks.snapshot_wallet_balances_task',
+])
+def test_bulk_tasks_outlive_global_time_limit(task_name):
+    task = celery_app.tasks[task_name]
+
+    assert task.soft_time_limit > celery_app.conf.task_soft_time_limit
+    assert task.time_limit > max(task.soft_time_limit, celery_app.conf.task_time_limit)
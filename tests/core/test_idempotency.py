@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException, UploadFile, Form
+from httpx import AsyncClient, ASGITransport
+
+from app.conf.config import settings
+from app.core.idempotency import (
+    IdempotencyMiddleware, IdempotencyStore, IDEMPOTENCY_HEADER, IDEMPOTENCY_REPLAYED_HEADER,
+)
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+def get_test_app(calls: list) -> FastAPI:
+    application = FastAPI()
+    application.add_middleware(IdempotencyMiddleware, route_names=('test-deposit', 'test-attachment'))
+    application.aioredis_instance = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    @application.post('/deposit/', name='test-deposit', status_code=201)
+    async def deposit(payload: dict):
+        calls.append(payload)
+        await asyncio.sleep(0.1)
+        if payload.get('fail'):
+            raise HTTPException(status_code=400, detail='failed')
+        return {'id': len(calls), 'amount': payload['amount']}
+
+    @application.post('/attachment/', name='test-attachment', status_code=201)
+    async def attachment(file: UploadFile, note: str = Form()):
+        calls.append(note)
+        return {'id': len(calls), 'size': len(await file.read())}
+
+    @application.post('/other/', name='test-other')
+    async def other(payload: dict):
+        calls.append(payload)
+        return {'id': len(calls)}
+
+    return application
+
+
+async def test_duplicate_requests_run_once():
+    calls = []
+    headers = {IDEMPOTENCY_HEADER: 'key-1', 'Authorization': 'Bearer user-1'}
+    async with AsyncClient(transport=ASGITransport(app=get_test_app(calls)), base_url='http://test') as client:
+        # Concurrent duplicate waits for the first response
+        first, second = await asyncio.gather(
+            client.post('/deposit/', json={'amount': 10}, headers=headers),
+            client.post('/deposit/', json={'amount': 10}, headers=headers),
+        )
+        retry = await client.post('/deposit/', json={'amount': 10}, headers=headers)
+        other_user = await client.post(
+            '/deposit/', json={'amount': 10}, headers={IDEMPOTENCY_HEADER: 'key-1', 'Authorization': 'Bearer user-2'}
+        )
+
+    assert len(calls) == 2
+    assert first.status_code == second.status_code == retry.status_code == 201
+    assert first.json() == second.json() == retry.json() == {'id': 1, 'amount': 10}
+    assert sum(IDEMPOTENCY_REPLAYED_HEADER in response.headers for response in (first, second, retry)) == 2
+    assert other_user.json()['id'] == 2
+
+
+async def test_key_reuse_and_failures():
+    calls = []
+    headers = {IDEMPOTENCY_HEADER: 'key-2'}
+    async with AsyncClient(transport=ASGITransport(app=get_test_app(calls)), base_url='http://test') as client:
+        failed = await client.post('/deposit/', json={'amount': 5, 'fail': True}, headers=headers)
+        retried = await client.post('/deposit/', json={'amount': 5, 'fail': True}, headers=headers)
+        assert failed.status_code == retried.status_code == 400
+        assert len(calls) == 2
+
+        headers = {IDEMPOTENCY_HEADER: 'key-3'}
+        assert (await client.post('/deposit/', json={'amount': 5}, headers=headers)).status_code == 201
+        reused = await client.post('/deposit/', json={'amount': 6}, headers=headers)
+        assert reused.status_code == 422
+        assert len(calls) == 3
+
+        # Routes not listed ignore the header
+        await client.post('/other/', json={}, headers=headers)
+        await client.post('/other/', json={}, headers=headers)
+        assert len(calls) == 5
+
+
+async def test_multipart_retry_with_new_boundary():
+    calls = []
+    headers = {IDEMPOTENCY_HEADER: 'key-4'}
+    async with AsyncClient(transport=ASGITransport(app=get_test_app(calls)), base_url='http://test') as client:
+        first = await client.post(
+            '/attachment/', data={'note': 'a'}, files={'file': ('a.txt', b'abc')}, headers=headers,
+        )
+        retry = await client.post(
+            '/attachment/', data={'note': 'a'}, files={'file': ('a.txt', b'abc')}, headers=headers,
+        )
+        other = await client.post(
+            '/attachment/', data={'note': 'a'}, files={'file': ('a.txt', b'abcd')}, headers=headers,
+        )
+
+    assert first.request.headers['content-type'] != retry.request.headers['content-type']
+    assert first.status_code == retry.status_code == 201
+    assert IDEMPOTENCY_REPLAYED_HEADER in retry.headers
+    assert other.status_code == 422
+    assert calls == ['a']
+
+
+async def test_lock_is_refreshed_and_released_by_owner(monkeypatch):
+    monkeypatch.setattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', 1)
+    calls = []
+    application = get_test_app(calls)
+
+    @application.post('/slow/', name='test-deposit')
+    async def slow(payload: dict):
+        calls.append(payload)
+        await asyncio.sleep(1.5)
+        return {'id': len(calls)}
+
+    headers = {IDEMPOTENCY_HEADER: 'key-5'}
+    async with AsyncClient(transport=ASGITransport(app=application), base_url='http://test') as client:
+        # The duplicate still waits after the first lock expiry
+        first, second = await asyncio.gather(
+            client.post('/slow/', json={}, headers=headers),
+            client.post('/slow/', json={}, headers=headers),
+        )
+    assert len(calls) == 1
+    assert first.json() == second.json() == {'id': 1}
+
+    store = IdempotencyStore(application.aioredis_instance)
+    token = await store.acquire('scope', 'key')
+    assert token and await store.acquire('scope', 'key') is None
+    assert not await store.release('scope', 'key', 'other-token')
+    assert await store.refresh('scope', 'key', token)
+    assert await store.release('scope', 'key', token)
+    assert not await store.refresh('scope', 'key', token)
@@ -0,0 +1,73 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from app.core import metrics
+
+pytestmark = pytest.mark.skipif(metrics.prometheus_client is None, reason="prometheus_client is not installed")
+
+
+def get_sample(name: str, **labels) -> float:
+    value = metrics.prometheus_client.REGISTRY.get_sample_value(name, labels)
+    return value or 0
+
+
+def get_test_app() -> FastAPI:
+    application = FastAPI()
+    application.add_middleware(metrics.PrometheusMiddleware)
+
+    @application.get('/items/{item_id}/', name='test-item-detail')
+    async def item_detail(item_id: int):
+        return {"id": item_id}
+
+    return application
+
+
+async def test_middleware_labels_by_route_name():
+    before = get_sample(
+        'http_request_duration_seconds_count', route='test-item-detail', method='GET', status='200'
+    )
+    unmatched_before = get_sample(
+        'http_request_duration_seconds_count', route=metrics.UNMATCHED_ROUTE, method='GET', status='404'
+    )
+    async with AsyncClient(transport=ASGITransport(app=get_test_app()), base_url='http://test') as client:
+        await client.get('/items/1/')
+        await client.get('/items/2/')
+        await client.get('/missing/')
+
+    assert get_sample(
+        'http_request_duration_seconds_count', route='test-item-detail', method='GET', status='200'
+    ) == before + 2
+    assert get_sample(
+        'http_request_duration_seconds_count', route=metrics.UNMATCHED_ROUTE, method='GET', status='404'
+    ) == unmatched_before + 1
+    assert get_sample('http_requests_in_progress', method='GET') == 0
+
+
+def test_cache_and_pool_metrics():
+    hits = get_sample('cache_requests_total', cache='test', result='hit')
+    metrics.record_cache('test', hit=True)
+    metrics.record_cache('test', hit=False)
+    assert get_sample('cache_requests_total', cache='test', result='hit') == hits + 1
+
+    metrics.observe_pools({'async': {'size': 5, 'checked_in': 3, 'checked_out': 2, 'overflow': -3}, 'sync': {}})
+    assert get_sample('db_pool_checked_out', engine='async') == 2
+    assert get_sample('db_pool_overflow', engine='async') == 0
+
+
+async def test_metrics_endpoint_requires_staff_outside_allowed_networks(monkeypatch):
+    from app.conf.config import settings
+    from app.routers.urls import router
+
+    application = FastAPI()
+    application.aioredis_instance = None
+    application.include_router(router)
+    transport = ASGITransport(app=application, client=('10.1.2.3', 123))
+    async with AsyncClient(transport=transport, base_url='http://test') as client:
+        monkeypatch.setattr(settings, 'METRICS_ALLOWED_NETWORKS', [])
+        assert (await client.get('/metrics')).status_code == 401
+
+        monkeypatch.setattr(settings, 'METRICS_ALLOWED_NETWORKS', ['127.0.0.1/32', '10.0.0.0/8'])
+        response = await client.get('/metrics')
+        assert response.status_code == 200
+        assert b'http_request_duration_seconds' in response.content
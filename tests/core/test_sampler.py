@@ -0,0 +1,35 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.core.sampler import SystemSampler, get_pool_stats
+
+
+def test_get_pool_stats():
+    engine = create_engine('sqlite://', poolclass=QueuePool, pool_size=2)
+    with engine.connect():
+        stats = get_pool_stats(engine.pool)
+    assert stats['size'] == 2
+    assert stats['checked_out'] == 1
+    assert get_pool_stats(create_engine('sqlite://', poolclass=NullPool).pool) == {}
+
+
+async def test_sampler_history_is_bounded():
+    sampler = SystemSampler(interval=0, history_size=3)
+    for _ in range(5):
+        await sampler.sample()
+    assert len(sampler.history) == 3
+    snapshot = sampler.latest()
+    assert snapshot is sampler.history[-1]
+    assert {'cpu_percent', 'memory', 'disk', 'uptime_seconds', 'process', 'pools'} <= snapshot.keys()
+
+
+async def test_sampler_start_stop():
+    sampler = SystemSampler(interval=0.01, history_size=10)
+    await sampler.start()
+    assert sampler.is_running
+    await asyncio.sleep(0.1)
+    await sampler.stop()
+    assert not sampler.is_running
+    assert sampler.latest() is not None
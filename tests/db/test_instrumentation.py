@@ -0,0 +1,40 @@
+import pytest
+
+from sqlalchemy import create_engine, text
+
+from app.db.instrumentation import enable_query_instrumentation, track_queries, get_query_stats
+
+
+def test_track_queries_counts_statements():
+    engine = create_engine('sqlite://')
+    enable_query_instrumentation(engine)
+    enable_query_instrumentation(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        with track_queries() as stats:
+            for i in range(6):
+                conn.execute(text('SELECT :value'), {'value': i})
+            conn.execute(text('SELECT 2'))
+        assert get_query_stats() is None
+
+    assert stats.count == 7
+    assert stats.duration > 0
+    candidates = stats.n_plus_one_candidates(threshold=5)
+    assert [(statement, count) for statement, count, _ in candidates] == [('SELECT ?', 6)]
+    assert stats.server_timing().startswith('db;dur=')
+    assert stats.server_timing().endswith('desc="7 queries"')
+
+
+async def test_track_queries_async_engine():
+    pytest.importorskip('aiosqlite')
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine('sqlite+aiosqlite://')
+    enable_query_instrumentation(async_engine.sync_engine)
+    with track_queries() as stats:
+        async with async_engine.connect() as conn:
+            for _ in range(3):
+                await conn.execute(text('SELECT 1'))
+    await async_engine.dispose()
+    assert stats.count == 3
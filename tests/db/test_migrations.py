@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+from app.alembic_pre_start import BASELINE_REVISION, is_known_revision
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def get_script() -> ScriptDirectory:
+    config = Config(str(ROOT / 'alembic.ini'))
+    config.set_main_option('script_location', str(ROOT / 'alembic'))
+    return ScriptDirectory.from_config(config)
+
+
+def test_migrations_form_one_chain_from_initial_schema():
+    script = get_script()
+
+    assert script.get_bases() == [BASELINE_REVISION]
+    assert len(script.get_heads()) == 1
+    assert is_known_revision(script, script.get_heads()[0])
+    # Revision of a database migrated before this repository tracked them
+    assert not is_known_revision(script, 'ae1027a6acf1')
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.contrib.file.models import File
+from app.db.instrumentation import enable_compiled_cache_stats, compiled_cache_stats, get_compiled_cache_report
+from app.db.repository import CRUDBaseSync, get_order_by
+
+
+def test_get_order_by_resolves_model_columns():
+    sort = get_order_by(File, ['-created_at', 'id'])
+    stmt = select(File.id).order_by(*sort)
+    sql = str(stmt.compile())
+    assert 'ORDER BY file.created_at DESC, file.id ASC' in sql
+
+    with pytest.raises(ValueError):
+        get_order_by(File, ['id; DROP TABLE file'])
+
+
+def test_compiled_cache_hits_per_repository():
+    engine = create_engine('sqlite://')
+    File.__table__.create(engine)
+    enable_compiled_cache_stats(engine)
+    compiled_cache_stats.clear()
+    repo = CRUDBaseSync(File)
+
+    with Session(engine) as db:
+        for i in range(3):
+            repo.get_all(db, q={'caption': f'caption {i}'}, order_by=['-created_at'])
+            repo.first(db, params={'id': i})
+
+    assert compiled_cache_stats[('File', 'miss')] == 2
+    assert compiled_cache_stats[('File', 'hit')] == 4
+    [row] = get_compiled_cache_report()
+    assert row['repository'] == 'File'
+    assert row['hit_ratio'] == 4 / 6
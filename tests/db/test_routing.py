@@ -0,0 +1,126 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.contrib.file.models import File
+from app.db.repository import CRUDBaseSync, CRUDBase
+from app.db.routing import ReplicaRouter, read_routing, get_routing_state
+from app.db import repository
+
+
+def track_engine(engine) -> list:
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+@pytest.fixture
+def engines(tmp_path, monkeypatch):
+    # One database, two engines: primary and replica
+    url = f'sqlite:///{tmp_path / "db.sqlite"}'
+    primary, replica = create_engine(url), create_engine(url)
+    File.__table__.create(primary)
+    router = ReplicaRouter()
+    monkeypatch.setattr(repository, 'replica_router', router)
+    return primary, replica, router
+
+
+def test_reads_go_to_replica_until_write(engines):
+    primary, replica, router = engines
+    router.add(async_engine=None, engine=replica, name='replica')
+    assert router.check() == {'replica': {'lag': 0.0, 'healthy': True, 'error': None}}
+    primary_statements, replica_statements = track_engine(primary), track_engine(replica)
+    repo = CRUDBaseSync(File)
+
+    with Session(primary) as db:
+        repo.count(db)
+        assert len(primary_statements) == 1 and not replica_statements
+
+        with read_routing() as state:
+            repo.count(db)
+            repo.exists(db, params={'caption': 'a'})
+            assert len(replica_statements) == 2
+
+            repo.create(db, obj_in={
+                'file_type': 'image', 'file_path': 'a.png', 'content_type': 'gallery', 'caption': 'a'
+            })
+            assert state.written
+            assert repo.exists(db, params={'caption': 'a'})
+            assert len(replica_statements) == 2
+        assert get_routing_state() is None
+
+
+def test_lagging_replica_falls_back_to_primary(engines, monkeypatch):
+    primary, replica, router = engines
+    replica_item = router.add(async_engine=None, engine=replica, name='replica')
+    replica_statements = track_engine(replica)
+    repo = CRUDBaseSync(File)
+
+    with Session(primary) as db, read_routing():
+        # Not checked yet
+        repo.count(db)
+        replica_item.lag = 10
+        monkeypatch.setattr('app.conf.config.settings.DATABASE_REPLICA_MAX_LAG', 5)
+        repo.count(db)
+    assert not replica_statements
+
+
+async def test_async_reads_go_to_replica(tmp_path, monkeypatch):
+    pytest.importorskip('aiosqlite')
+    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+    url = f'sqlite+aiosqlite:///{tmp_path / "db.sqlite"}'
+    primary, replica = create_async_engine(url), create_async_engine(url)
+    async with primary.begin() as conn:
+        await conn.run_sync(File.__table__.create)
+    router = ReplicaRouter()
+    router.add(async_engine=replica, engine=create_engine(url.replace('+aiosqlite', '')), name='replica')
+    router.check()
+    monkeypatch.setattr(repository, 'replica_router', router)
+    replica_statements = track_engine(replica.sync_engine)
+
+    async with AsyncSession(primary) as async_db:
+        with read_routing():
+            assert await CRUDBase(File).count(async_db) == 0
+    assert len(replica_statements) == 1
+    await primary.dispose()
+    await replica.dispose()
+
+
+async def test_middleware_pins_client_to_primary_after_write(monkeypatch):
+    from fastapi import FastAPI
+    from httpx import AsyncClient, ASGITransport
+
+    from app.conf.config import settings
+    from app.db.routing import DatabaseRoutingMiddleware, PRIMARY_PIN_COOKIE, mark_written
+
+    monkeypatch.setattr(settings, 'DATABASE_REPLICA_URLS', ['postgresql+asyncpg://replica/db'])
+    monkeypatch.setattr(settings, 'DATABASE_PRIMARY_PIN_SECONDS', 10)
+    application = FastAPI()
+    application.add_middleware(DatabaseRoutingMiddleware)
+
+    @application.get('/read/')
+    async def read():
+        return {'replica': get_routing_state() is not None}
+
+    @application.get('/touch/')
+    async def touch():
+        mark_written()
+        return {}
+
+    @application.post('/write/')
+    async def write():
+        return {}
+
+    async with AsyncClient(transport=ASGITransport(app=application), base_url='http://test') as client:
+        response = await client.get('/read/')
+        assert response.json() == {'replica': True} and 'set-cookie' not in response.headers
+
+        response = await client.post('/write/')
+        assert response.headers['set-cookie'].startswith(f'{PRIMARY_PIN_COOKIE}=1; Max-Age=10;')
+        # Cookie sent back keeps reads on the primary
+        assert (await client.get('/read/')).json() == {'replica': False}
+
+        client.cookies.clear()
+        assert PRIMARY_PIN_COOKIE in (await client.get('/touch/')).headers['set-cookie']
+        assert (await client.get('/read/')).json() == {'replica': False}
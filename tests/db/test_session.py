@@ -0,0 +1,34 @@
+import pytest
+
+from app.conf.config import settings
+from app.db.session import get_engine_options, get_server_settings, warmup_pool
+
+
+def test_engine_options_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'DATABASE_STATEMENT_TIMEOUT', 5000)
+    monkeypatch.setattr(settings, 'DATABASE_TASK_STATEMENT_TIMEOUT', 0)
+    monkeypatch.setattr(settings, 'DATABASE_JIT', False)
+    monkeypatch.setattr(settings, 'DATABASE_SERVER_SETTINGS', {'application_name': 'courier'})
+    monkeypatch.setattr(settings, 'DATABASE_POOL_PRE_PING', False)
+
+    assert get_server_settings() == {
+        'statement_timeout': '5000', 'jit': 'off', 'application_name': 'courier'
+    }
+    options = get_engine_options(is_async=True)
+    assert options['pool_pre_ping'] is False
+    assert options['connect_args']['server_settings']['jit'] == 'off'
+    assert 'prepared_statement_cache_size' in options['connect_args']
+    assert get_engine_options(is_async=False)['connect_args'] == {
+        # Tasks are not cut off by the request timeout
+        'options': '-c statement_timeout=0 -c jit=off -c application_name=courier'
+    }
+
+
+async def test_warmup_pool(tmp_path):
+    pytest.importorskip('aiosqlite')
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "db.sqlite"}', pool_size=3)
+    assert await warmup_pool(async_engine, 5) == 3
+    assert async_engine.pool.checkedin() == 3
+    await async_engine.dispose()
@@ -0,0 +1,29 @@
+from sqlalchemy import select, column, table
+
+from app.db.slow_query import SlowQueryLog, parameter_shape
+
+order = table('order', column('id'), column('code'))
+
+
+def test_parameter_shape():
+    assert parameter_shape({'code_1': '%A1%', 'param_1': 10}) == {'code_1': 'str', 'param_1': 'int'}
+    assert parameter_shape(None) == {}
+
+
+def test_record_aggregates_by_statement_shape():
+    log = SlowQueryLog(size=2)
+    stmt = select(order).where(order.c.code.ilike('%A1%')).limit(10)
+    log.record('CRUDOrder', 'get_all', stmt, 0.3, explain=False)
+    log.record('CRUDOrder', 'get_all', select(order).where(order.c.code.ilike('%B2%')).limit(10), 0.5, explain=False)
+    log.record('CRUDOrder', 'count', select(order.c.id), 0.25, explain=False)
+
+    top = log.top()
+    assert [(i['method'], i['count']) for i in top] == [('get_all', 2), ('count', 1)]
+    assert top[0]['total'] == 0.8
+    assert top[0]['max'] == 0.5
+    assert '%A1%' not in top[0]['statement']
+    assert len(log.entries) == 2
+
+    log.record('CRUDMessage', 'get_all', select(order.c.code), 1.0, explain=False)
+    assert len(log.aggregates) == 2
+    assert [i['repository'] for i in log.top(order_by='max')] == ['CRUDMessage', 'CRUDOrder']
@@ -0,0 +1,43 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, select, type_coerce, DECIMAL
+
+from app.db.types import MinorUnits, to_minor_money
+from app.utils.prices import MinorMoney
+
+metadata = MetaData()
+amounts = Table(
+    'amounts', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('amount', MinorUnits(12, 2)),
+    Column('plain_amount', DECIMAL(12, 2)),
+)
+
+
+def test_minor_units_round_trip():
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(amounts.insert(), [
+            {'id': 1, 'amount': 1235, 'plain_amount': Decimal('12.35')},
+            {'id': 2, 'amount': MinorMoney('0.05', 'TMT'), 'plain_amount': None},
+            {'id': 3, 'amount': None, 'plain_amount': Decimal('-1.10')},
+        ])
+        rows = conn.execute(
+            select(amounts.c.amount, type_coerce(amounts.c.plain_amount, MinorUnits())).order_by(amounts.c.id)
+        ).all()
+        stored = conn.execute(select(type_coerce(amounts.c.amount, DECIMAL(12, 2)))).scalars().all()
+
+    assert rows == [(1235, 1235), (5, None), (None, -110)]
+    assert stored[0] == Decimal('12.35')
+    assert to_minor_money(rows[0][0], 'TMT') == MinorMoney('12.35', 'TMT')
+    assert to_minor_money(None, 'TMT').minor == 0
+
+
+def test_minor_units_rejects_other_precision():
+    minor_units = MinorUnits()
+    with pytest.raises(ValueError):
+        minor_units.process_bind_param(MinorMoney('12', 'JPY'), None)
+    with pytest.raises(TypeError):
+        minor_units.process_bind_param(Decimal('12.35'), None)
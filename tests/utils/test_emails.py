@@ -0,0 +1,99 @@
+import socket
+from email import message_from_bytes
+
+import pytest
+
+from app.conf.config import settings
+from app.utils import emails as email_utils
+from app.utils.emails import (
+    SMTPConnectionPool, send_emails, get_email_verification_message, get_reset_password_message,
+)
+
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+
+
+def get_html(content: bytes) -> str:
+    part = next(part for part in message_from_bytes(content).walk() if part.get_content_type() == 'text/html')
+    return part.get_payload(decode=True).decode()
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.sessions = 0
+        self.messages = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('rejected'):
+            return '550 Mailbox unavailable'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.content))
+        return '250 Message accepted for delivery'
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    monkeypatch.setattr(settings, 'SMTP_HOST', '127.0.0.1')
+    monkeypatch.setattr(settings, 'SMTP_PORT', port)
+    monkeypatch.setattr(settings, 'SMTP_TLS', False)
+    monkeypatch.setattr(settings, 'SMTP_USER', None)
+    monkeypatch.setattr(settings, 'EMAILS_FROM_EMAIL', 'noreply@example.com')
+    monkeypatch.setattr(settings, 'EMAILS_ENABLED', True)
+    pool = SMTPConnectionPool(size=1)
+    monkeypatch.setattr(email_utils, 'smtp_pool', pool)
+    yield handler, pool
+    pool.close()
+    controller.stop()
+
+
+def test_send_emails_reuses_connection(smtp_server):
+    handler, _ = smtp_server
+    messages = [get_email_verification_message(f'user{i}@example.com', f'{i:06}') for i in range(3)]
+
+    assert send_emails(messages) == []
+    assert send_emails([get_reset_password_message('user0@example.com', '123456')]) == []
+
+    assert handler.sessions == 1
+    assert [rcpt_tos for rcpt_tos, _ in handler.messages] == [
+        ['user0@example.com'], ['user1@example.com'], ['user2@example.com'], ['user0@example.com'],
+    ]
+    assert '000001' in get_html(handler.messages[1][1])
+
+
+def test_send_emails_reconnects_dropped_connection(smtp_server, monkeypatch):
+    handler, pool = smtp_server
+    assert send_emails([get_email_verification_message('user@example.com', '111111')]) == []
+
+    # Connection dropped while idle, NOOP finds it dead
+    pool._idle[0]._client.sock.shutdown(socket.SHUT_RDWR)
+    monkeypatch.setattr(settings, 'SMTP_KEEPALIVE_SECONDS', 0)
+
+    assert send_emails([get_email_verification_message('user@example.com', '222222')]) == []
+    assert handler.sessions == 2
+    assert len(handler.messages) == 2
+
+
+def test_send_emails_returns_failed_messages(smtp_server):
+    handler, _ = smtp_server
+    missing = dict(get_email_verification_message('user1@example.com', '111111'), template_name='missing.html')
+    rejected = get_email_verification_message('rejected@example.com', '222222')
+    messages = [
+        get_email_verification_message('user0@example.com', '000000'), missing, rejected,
+        get_email_verification_message('user3@example.com', '333333'),
+    ]
+
+    assert send_emails(messages) == [missing, rejected]
+    assert [rcpt_tos for rcpt_tos, _ in handler.messages] == [['user0@example.com'], ['user3@example.com']]
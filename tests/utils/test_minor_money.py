@@ -0,0 +1,66 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from app.utils.prices import (
+    Money, MinorMoney, MoneyRange, TaxedMoney, fixed_discount, percentage_discount,
+    flat_tax, quantize_price, sum as sum_prices,
+)
+
+
+def test_minor_money_creation():
+    money = MinorMoney(Decimal('12.345'), 'TMT')
+    assert money.minor == 1235
+    assert money.amount == Decimal('12.35')
+    assert MinorMoney(None, 'TMT').minor == 0
+    assert MinorMoney(Decimal('12.5'), 'JPY').minor == 13
+    assert MinorMoney.from_minor(1050, 'TMT') == Money(Decimal('10.50'), 'TMT')
+    assert repr(MinorMoney.from_minor(5, 'TMT')) == "MinorMoney('0.05', 'TMT')"
+
+
+def test_minor_money_arithmetic():
+    a = MinorMoney(Decimal('10.50'), 'TMT')
+    b = MinorMoney(Decimal('0.75'), 'TMT')
+    assert isinstance(a + b, MinorMoney) and (a + b).minor == 1125
+    assert isinstance(a - b, MinorMoney) and (a - b).minor == 975
+    assert isinstance(a * 3, MinorMoney) and (3 * a).minor == 3150
+    assert a / b == Decimal(14)
+    assert b < a and not a < b
+    # Decimal results keep full precision like Money
+    assert a * Decimal('0.333') == Money(Decimal('10.50') * Decimal('0.333'), 'TMT')
+    assert not isinstance(a * Decimal('0.333'), MinorMoney)
+
+    # Plain Money operands are accepted from both sides
+    assert isinstance(Money(Decimal('1.25'), 'TMT') + a, MinorMoney)
+    assert (Money(Decimal('11'), 'TMT') - a).minor == 50
+    assert Money(Decimal('0.001'), 'TMT') + a == Money(Decimal('10.501'), 'TMT')
+
+    with pytest.raises(ValueError):
+        a + MinorMoney(1, 'USD')
+    with pytest.raises(ValueError):
+        Money(1, 'USD') - a
+
+
+def test_minor_money_with_price_types():
+    net = MinorMoney(Decimal('10.00'), 'TMT')
+    gross = MinorMoney(Decimal('11.50'), 'TMT')
+    taxed = TaxedMoney(net=net, gross=gross) * 2
+    assert taxed.tax == Money(Decimal('3.00'), 'TMT')
+    assert net in MoneyRange(MinorMoney(0, 'TMT'), gross)
+    assert sum_prices([net, gross, net]) == Money(Decimal('31.50'), 'TMT')
+    assert quantize_price(net, 'TMT') is net
+    assert flat_tax(net, Decimal('0.15')).gross == gross
+
+
+def test_minor_money_discounts_match_money():
+    rng = random.Random(3)
+    for _ in range(500):
+        amount = Decimal(rng.randint(0, 10 ** 6)) / 100
+        percentage = Decimal(rng.choice(['0', '1', '12.5', '33', '99.99', '100']))
+        fixed = Money(Decimal(rng.randint(0, 10 ** 5)) / 100, 'TMT')
+
+        expected = fixed_discount(percentage_discount(Money(amount, 'TMT'), percentage), fixed)
+        result = fixed_discount(percentage_discount(MinorMoney(amount, 'TMT'), percentage), fixed)
+        assert isinstance(result, MinorMoney)
+        assert result == expected
@@ -0,0 +1,34 @@
+import pytest
+
+from app.utils.file import RELEASE_DIR, get_release_path, find_release_path
+
+
+@pytest.fixture
+def release_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / RELEASE_DIR
+
+
+def test_get_release_path():
+    assert get_release_path('ios', '1.2') == 'ios/1.2/release-ios.zip'
+    assert get_release_path('android', '1.2') == 'android/1.2/release-apk.zip'
+
+
+def test_find_release_path_reads_legacy_ios_name(release_dir):
+    assert find_release_path('ios', '1.0') is None
+
+    legacy = release_dir / 'ios' / '1.0' / 'release-ios.zip.zip'
+    legacy.parent.mkdir(parents=True)
+    legacy.write_bytes(b'zip')
+    assert find_release_path('ios', '1.0') == 'ios/1.0/release-ios.zip.zip'
+
+    (release_dir / 'ios' / '1.0' / 'release-ios.zip').write_bytes(b'zip')
+    assert find_release_path('ios', '1.0') == 'ios/1.0/release-ios.zip'
+
+
+def test_find_release_path_android(release_dir):
+    path = release_dir / 'android' / '2.0' / 'release-apk.zip'
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b'zip')
+    assert find_release_path('android', '2.0') == 'android/2.0/release-apk.zip'
+    assert find_release_path('android', '2.1') is None